@@ -54,4 +54,17 @@ from app.endpoints.auth import Auth
 from app.endpoints.friends import Friends
 from app.endpoints.stats import Stats
 from app.endpoints.gps import GPS
-from app.endpoints.membership import Membership
\ No newline at end of file
+from app.endpoints.gps import Recording
+from app.endpoints.gps import Segments
+from app.endpoints.membership import Membership
+from app.endpoints.gps import pointStore, schemaMigration
+
+
+@app.before_request
+def migrate_legacy_points():
+    # The legacy journey.points column is moved to point_blob on the first request; if that
+    # fails, only the journey routes are refused until pack_points.py is run
+    if pointStore.legacy_schema() and not schemaMigration.migrate_legacy_schema():
+        view = app.view_functions.get(request.endpoint)
+        if view is not None and view.__module__.startswith('app.endpoints.gps'):
+            return jsonify({'status': 503, 'message': 'Database migration required: run python pack_points.py'}), 503
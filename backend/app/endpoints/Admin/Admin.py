@@ -6,6 +6,7 @@ from datetime import datetime
 from sqlalchemy.exc import IntegrityError
 from constants import MembershipPriceMonthly, MembershipPriceAnnually
 from app.endpoints.Admin.revenuePrediction import generateFutureRevenueData
+from app.endpoints.gps import thumbnails, resampling, vectorTiles, elevationProfile, pointStore
 
 bcrypt = Bcrypt(app)
 def add_cors_headers(response=None):
@@ -259,6 +260,19 @@ class AdminRoutes:
             related_journeys = models.Journey.query.filter_by(userId=userId).all()
             for journey in related_journeys:
                 db.session.delete(journey)
+            # The blobs are only deleted once no journey row refers to them
+            db.session.flush()
+            pointStore.release(db.session, [journey.pointsHash for journey in related_journeys])
+            thumbnails.discard_thumbnails([journey.id for journey in related_journeys])
+            resampling.cache.discard([journey.id for journey in related_journeys])
+            elevationProfile.cache.discard([journey.id for journey in related_journeys])
+            vectorTiles.cache.discard([userId])
+            models.HeatmapTile.query.filter_by(userId=userId).delete()
+            models.IdempotencyKey.query.filter_by(userId=userId).delete()
+            for recording in models.Recording.query.filter_by(userId=userId).all():
+                db.session.delete(recording)
+            for segment in models.Segment.query.filter_by(creatorId=userId).all():
+                db.session.delete(segment)
 
             related_friendships = models.Friendship.query.filter(
                 (models.Friendship.requester_id == userId) | 
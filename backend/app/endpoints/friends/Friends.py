@@ -1,7 +1,8 @@
 from app import (app, db, models, get_jwt_identity, jwt_required)
 from flask import request, jsonify, Response
 from typing import Tuple
-import json
+from app.endpoints.gps.GPS import GPSRoutes
+from app.endpoints.gps import contentNegotiation
 
 class FriendshipRoutes:
     """
@@ -289,27 +290,46 @@ class FriendshipRoutes:
         if friend_user.isPrivate:
             return jsonify({'status': 'error', 'message': 'Friend\'s account is private'}), 403
 
-        journeys = models.Journey.query.filter_by(userId=friend_user.id).all()
+        point_format, precision, error_message = GPSRoutes.parse_point_format(request.args)
+        if error_message:
+            return jsonify({'status': 'error', 'message': error_message}), 400
+
+        lod, error_message = GPSRoutes.parse_lod(request.args)
+        if error_message:
+            return jsonify({'status': 'error', 'message': error_message}), 400
+
+        media_type = contentNegotiation.negotiate()
+        typed = contentNegotiation.is_binary(media_type)
+
+        query = models.Journey.query.filter_by(userId=friend_user.id)
+        if lod:
+            query = query.options(db.defer(models.Journey.points))
+
+        journeys = query.all()
+        point_arrays = GPSRoutes.journey_point_arrays(journeys, lod)
         journeys_data = [{
             'id': journey.id,
             'name': journey.name,
             'type': journey.type,
             'totalDistance': journey.totalDistance,
+            'computedDistance': journey.computedDistance,
             'elevation': {
                 'avg': journey.avgEle,
                 'min': journey.minEle,
                 'max': journey.maxEle,
+                'gain': journey.elevationGain,
+                'loss': journey.elevationLoss,
             },
-            'points': json.loads(journey.points) if journey.points else [],
+            **GPSRoutes.point_fields(point_arrays[journey.id], point_format, precision, typed),
             'startTime': journey.startTime.strftime('%H:%M:%S') if journey.startTime else None,
             'endTime': journey.endTime.strftime('%H:%M:%S') if journey.endTime else None,
             'dateCreated': journey.dateCreated.strftime('%d-%m-%Y') if journey.dateCreated else None,
         } for journey in journeys]
 
-        return jsonify({
+        return contentNegotiation.make_response({
             "status": 200,
             "data": journeys_data
-        }), 200
+        }, media_type)
 
 
     @app.route('/privacy_status', methods=['GET'])
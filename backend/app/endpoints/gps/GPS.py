@@ -1,9 +1,25 @@
 from app import (app, db, models, get_jwt_identity, jwt_required)
-from flask import request, jsonify, make_response
+from flask import request, jsonify, Response, stream_with_context, json
 from typing import Tuple
-from datetime import datetime
-import json
-import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+import base64
+import hashlib
+import math
+from app.endpoints.gps.pointCodec import (encode_points, decode_points, point_count, points_to_array,
+                                          points_to_dicts, encode_times, decode_times)
+from app.endpoints.gps.gpxExport import generate_gpx
+from app.endpoints.gps.pointValidation import (validate_point_array, validate_timed_point_array,
+                                               validate_array, validate_times)
+from app.endpoints.gps.trackImport import parse_track
+from app.endpoints.gps import (heatmap, dataVersion, segmentMatching, thumbnails, splits, resampling,
+                               vectorTiles, webMercator, contentNegotiation, elevationProfile, pointStore,
+                               idempotency)
+from app.endpoints.gps.zipStream import stream_zip, safe_filename
+from app.endpoints.gps.spatialIndex import bounding_box, parse_bbox, candidate_ids, passes_through
+from app.endpoints.gps.trackProcessing import (build_lod_pyramid, lod_for_tolerance, track_metrics,
+                                               LOD_TOLERANCES)
+from app.endpoints.gps.polyline import (encode_polyline, PRECISIONS, DEFAULT_PRECISION,
+                                        ELEVATION_PRECISION)
 
 class GPSRoutes:
     """
@@ -11,140 +27,1080 @@ class GPSRoutes:
 
     Attributes
     ----------
-    None
+    POINTS_PAGE_SIZE : int
+        Default page size of /journey/<id>/points.
+    MAX_POINTS_PAGE_SIZE : int
+        Largest page size /journey/<id>/points will return.
+    MAX_BATCH_SIZE : int
+        Largest number of journeys /create_journeys_batch and /delete_journeys accept.
+    JOURNEYS_PAGE_SIZE : int
+        Default page size of /get_journeys_of_user when paging with a cursor.
+    MAX_JOURNEYS_PAGE_SIZE : int
+        Largest page size /get_journeys_of_user will return.
+    EXPORT_BATCH_SIZE : int
+        Number of journeys /export/journeys.zip reads from the database at a time.
 
     Methods
     -------
     validate_points(points) -> json:
         Returns if the points are valid or not.
+    parse_point_format(args) -> tuple:
+        Reads the requested points output format from the query string.
+    point_fields(array, point_format, precision) -> dict:
+        Serializes the points of a journey in the requested format.
+    parse_lod(args) -> tuple:
+        Reads the requested level of detail from the query string.
+    journey_point_arrays(journeys, lod) -> dict:
+        Loads the points of several journeys at a level of detail.
+    filter_journeys(query, args) -> tuple:
+        Applies the from, to and type query parameters to a journey query.
+    parse_journey_page(args) -> tuple:
+        Reads the journey page size and cursor from the query string.
+    encode_journey_cursor(journey) -> str:
+        Builds the cursor of the page following a journey.
+    journey_from_data(userId, data) -> tuple:
+        Validates the data of a journey and builds it.
+    store_points(journey, points) -> None:
+        Runs the write-time processing of a journey track.
+    delete_journeys(userId, journeyIds) -> list:
+        Deletes journeys of a user and everything derived from them.
+    can_view_journey(user, journey) -> bool:
+        Returns if a user may see a journey.
     getJourneys(userId) -> json:
         returns the journeys of a user.
+    getJourneyPoints(journeyId) -> json:
+        returns one page of the points of a journey.
+    getJourneysWithin() -> json:
+        returns the journeys of a user that pass through a bounding box.
+    getHeatmapTile(z, x, y) -> json:
+        returns one tile of the heatmap of a user.
+    getJourneysGeoJSON() -> geojson:
+        returns the journeys of a user as a GeoJSON FeatureCollection.
+    getJourneysTile(z, x, y) -> mvt:
+        returns one Mapbox Vector Tile of the journeys of a user.
     createJourney() -> json:
         creates a journey for a user.
+    createJourneysBatch() -> json:
+        creates several journeys for a user in one transaction.
+    importJourney() -> json:
+        creates a journey for a user from an uploaded GPX or TCX file.
     deleteJourney(journeyId) -> json:
         deletes a particular journey.
+    deleteJourneys() -> json:
+        deletes several journeys of a user in one transaction.
     updateJourney(journeyId) -> json:
         updates the data of a particular journey.
+    getJourneyThumbnail(journeyId) -> png:
+        returns a small image of the track of a journey.
+    getJourneySplits(journeyId) -> json:
+        returns the pace per kilometre or mile of a journey.
+    getJourneyResampled(journeyId) -> json:
+        returns the track of a journey interpolated at a fixed distance spacing.
+    getElevationProfile(journeyId) -> json:
+        returns the downsampled elevation against distance chart of a journey.
+    exportJourneys() -> zip:
+        returns every journey of a user as GPX files in a ZIP archive.
     """
 
+    # Default and maximum number of points returned by /journey/<id>/points
+    POINTS_PAGE_SIZE = 1000
+    MAX_POINTS_PAGE_SIZE = 10000
+
+    # Maximum number of journeys accepted by /create_journeys_batch and /delete_journeys
+    MAX_BATCH_SIZE = 500
+
+    # Default and maximum number of journeys per page of /get_journeys_of_user
+    JOURNEYS_PAGE_SIZE = 20
+    MAX_JOURNEYS_PAGE_SIZE = 100
+
+    # Rows fetched per round trip by /export/journeys.zip
+    EXPORT_BATCH_SIZE = 50
+
     def validate_points(points):
         """
-        Validates that each item in the points list contains exactly 'lat', 'lon', and 'ele' keys.
+        Validates that each item in the points list contains exactly 'lat', 'lon', and 'ele' keys
+        with finite numerical values, and that lat and lon are within range.
+
+        Parameters:
+        - points (list): The list of point dictionaries to validate.
+
+        Returns:
+        - (bool, str): Tuple containing a boolean indicating if the validation passed,
+                    and a string with an error message if it failed. The message names the
+                    index of the first invalid point.
+        """
+        array, error_message = validate_point_array(points)
+        return array is not None, error_message
+
+    def parse_point_format(args):
+        """
+        Reads the `format` and `precision` query parameters used by journey listings.
+
+        Parameters:
+        - args (MultiDict): The request query parameters.
+
+        Returns:
+        - (str, int, str): Tuple containing the point format ('json' or 'polyline'), the
+                    polyline precision, and an error message if the parameters are invalid.
+        """
+        point_format = args.get('format', 'json')
+        if point_format not in ('json', 'polyline'):
+            return None, None, "Invalid format. Must be json or polyline"
+
+        precision = args.get('precision', DEFAULT_PRECISION, type=int)
+        if precision not in PRECISIONS:
+            return None, None, "Invalid precision. Must be 5 or 6"
+
+        return point_format, precision, ""
+
+    def point_fields(array, point_format, precision, typed=False) -> dict:
+        """
+        Serializes a decoded points array for a journey response.
+
+        Parameters:
+        - array (np.ndarray): The (n, 3) lat, lon, ele points of the journey.
+        - point_format (str): 'json' for a list of {lat, lon, ele} objects, or 'polyline'
+                    for Google encoded polylines.
+        - precision (int): The polyline coordinate precision.
+        - typed (bool): For the binary response formats, 'json' points are kept as the
+                    array itself and sent as a typed float array (see contentNegotiation.py).
+
+        Returns:
+        - dict: The fields to merge into the journey object.
+        """
+        if point_format == 'polyline':
+            return {
+                'polyline': encode_polyline(array[:, :2], precision),
+                'elevationPolyline': encode_polyline(array[:, 2], ELEVATION_PRECISION),
+                'precision': precision,
+                'elevationPrecision': ELEVATION_PRECISION,
+            }
+        if typed:
+            return {'points': array}
+        return {'points': points_to_dicts(array)}
+
+    def parse_lod(args):
+        """
+        Reads the `lod` or `tolerance` query parameters used by journey listings.
+
+        Parameters:
+        - args (MultiDict): The request query parameters. `lod` picks a level directly
+                    (0 is the full track). `tolerance` picks the coarsest level whose
+                    simplification tolerance in metres does not exceed it.
+
+        Returns:
+        - (int, str): Tuple containing the level of detail, and an error message if the
+                    parameters are invalid.
+        """
+        if 'tolerance' in args:
+            tolerance = args.get('tolerance', type=float)
+            if tolerance is None or tolerance < 0:
+                return None, "Invalid tolerance. Must be a non-negative number of metres"
+            return lod_for_tolerance(tolerance), ""
+
+        lod = args.get('lod', 0, type=int)
+        if lod is None or not 0 <= lod <= len(LOD_TOLERANCES):
+            return None, f"Invalid lod. Must be between 0 and {len(LOD_TOLERANCES)}"
+        return lod, ""
+
+    def journey_point_arrays(journeys, lod) -> dict:
+        """
+        Loads the points of several journeys at a level of detail.
+
+        Parameters:
+        - journeys (list): The journeys to load points for.
+        - lod (int): The level of detail, 0 for the full track.
+
+        Returns:
+        - dict: Maps each journey id to an (n, 3) array of lat, lon, ele.
+        """
+        if lod == 0:
+            return {journey.id: journey.point_array for journey in journeys}
+
+        rows = models.JourneyLOD.query.filter(
+            models.JourneyLOD.journeyId.in_([journey.id for journey in journeys]),
+            models.JourneyLOD.level == lod).all()
+        arrays = {row.journeyId: decode_points(row.points) for row in rows}
+
+        # Journeys saved before LOD levels were introduced only have the full track
+        for journey in journeys:
+            if journey.id not in arrays:
+                arrays[journey.id] = journey.point_array
+        return arrays
+
+    def journey_properties(journey) -> dict:
+        """
+        The summary of a journey attached to its map features.
+
+        Parameters:
+        - journey (Journey): The journey.
+
+        Returns:
+        - dict: The name, type, totalDistance and dateCreated of the journey.
+        """
+        return {
+            'name': journey.name,
+            'type': journey.type,
+            'totalDistance': journey.totalDistance,
+            'dateCreated': journey.dateCreated.strftime('%d-%m-%Y') if journey.dateCreated else None,
+        }
+
+    def geojson_feature(journey, array) -> dict:
+        """
+        Builds the GeoJSON Feature of a journey.
+
+        Parameters:
+        - journey (Journey): The journey.
+        - array (np.ndarray): The (n, 3) lat, lon, ele points to use as its geometry.
+
+        Returns:
+        - dict: A Feature with a LineString of [lon, lat, ele] positions (a Point for a single
+                    point, null without points) and the journey summary as properties.
+        """
+        coordinates = array[:, [1, 0, 2]].tolist()
+        if len(coordinates) >= 2:
+            geometry = {'type': 'LineString', 'coordinates': coordinates}
+        elif coordinates:
+            geometry = {'type': 'Point', 'coordinates': coordinates[0]}
+        else:
+            geometry = None
+        return {'type': 'Feature', 'id': journey.id, 'geometry': geometry,
+                'properties': GPSRoutes.journey_properties(journey)}
+
+    def filter_journeys(query, args):
+        """
+        Applies the `from`, `to` and `type` query parameters of journey listings to a
+        journey query, so the filtering happens in SQL.
+
+        Parameters:
+        - query (Query): The journey query.
+        - args (MultiDict): The request query parameters. `from` and `to` are inclusive
+                    YYYY-MM-DD dates compared with dateCreated, `type` is Run, Walk or Cycle.
+
+        Returns:
+        - (Query, str): Tuple containing the filtered query (None if the parameters are
+                    invalid), and an error message if they are invalid.
+        """
+        try:
+            if args.get('from'):
+                start = datetime.strptime(args['from'], '%Y-%m-%d')
+                query = query.filter(models.Journey.dateCreated >= start)
+            if args.get('to'):
+                end = datetime.strptime(args['to'], '%Y-%m-%d') + timedelta(days=1)
+                query = query.filter(models.Journey.dateCreated < end)
+        except ValueError:
+            return None, "Invalid date format. Must be YYYY-MM-DD"
+
+        if args.get('type'):
+            if args['type'] not in ['Run', 'Walk', 'Cycle']:
+                return None, "Invalid journey type. Must be Run, Walk, or Cycle"
+            query = query.filter(models.Journey.type == args['type'])
+
+        return query, ""
+
+    def parse_journey_page(args):
+        """
+        Reads the `limit` and `cursor` query parameters of /get_journeys_of_user.
+
+        Parameters:
+        - args (MultiDict): The request query parameters. The listing is paged when either
+                    is given; `cursor` is the `nextCursor` of the previous page.
+
+        Returns:
+        - (int, tuple, str): Tuple containing the page size (None when not paging), the
+                    (dateCreated, id) the page starts after (None for the first page), and
+                    an error message if the parameters are invalid.
+        """
+        if 'limit' not in args and 'cursor' not in args:
+            return None, None, ""
+
+        limit = args.get('limit', GPSRoutes.JOURNEYS_PAGE_SIZE, type=int)
+        if limit < 1:
+            return None, None, "Invalid limit. Must be a positive integer"
+        limit = min(limit, GPSRoutes.MAX_JOURNEYS_PAGE_SIZE)
+
+        cursor = args.get('cursor')
+        if not cursor:
+            return limit, None, ""
+        try:
+            date_text, journey_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('ascii').split('|')
+            return limit, (datetime.fromisoformat(date_text), int(journey_id)), ""
+        except ValueError:
+            return None, None, "Invalid cursor"
+
+    def encode_journey_cursor(journey) -> str:
+        """
+        Builds the opaque cursor for the page after a journey in the (dateCreated, id)
+        ordering of /get_journeys_of_user.
+
+        Parameters:
+        - journey (Journey): The last journey of a page.
+
+        Returns:
+        - str: The URL safe cursor.
+        """
+        key = f'{journey.dateCreated.isoformat()}|{journey.id}'
+        return base64.urlsafe_b64encode(key.encode('ascii')).decode('ascii')
+
+    def journey_from_data(userId, data):
+        """
+        Validates the JSON body of a journey and builds the Journey for it, running the
+        write-time processing of its points and adding them to the user's heatmap. The
+        journey itself is not added to the session.
+
+        Parameters:
+        - userId (int): The owner of the journey.
+        - data (dict): The journey fields, as sent to /create_journey.
+
+        Returns:
+        - (Journey, str): Tuple containing the new journey (None if the data is invalid),
+                    and an error message if it is invalid.
+        """
+        if not isinstance(data, dict):
+            return None, 'Journey data must be an object'
+
+        points = data.get('points')
+        if points is None:
+            return None, 'Missing field: points'
+
+        points, times, error_message = validate_timed_point_array(points)
+        if points is None:
+            return None, f'Invalid points data: {error_message}'
+
+        try:
+            name = data['name']
+            journey_type = data['type']
+            if journey_type not in ['Run', 'Walk', 'Cycle']:
+                return None, 'Invalid journey type. Must be Run, Walk, or Cycle'
+            totalDistance = data.get('totalDistance')
+
+            startTime = datetime.strptime(data['startTime'], '%H:%M:%S').time()
+            endTime = datetime.strptime(data['endTime'], '%H:%M:%S').time()
+            dateCreated = datetime.strptime(data['dateCreated'], '%Y-%m-%d').date()
+        except KeyError as e:
+            return None, f'Missing field: {str(e)}'
+        except (TypeError, ValueError) as e:
+            return None, 'Invalid date/time format'
+
+        journey = models.Journey(
+            userId=userId,
+            name=name,
+            type=journey_type,
+            totalDistance=totalDistance,
+            startTime=startTime,
+            endTime=endTime,
+            dateCreated=dateCreated
+        )
+        GPSRoutes.store_points(journey, points, times)
+        heatmap.apply_track(db.session, userId, journey.point_array, 1)
+        if journey.totalDistance is None:
+            journey.totalDistance = journey.computedDistance
+
+        return journey, ""
+
+    def store_points(journey, points, times=None) -> None:
+        """
+        Runs the write-time processing of a journey track: packs the points (stored once per
+        distinct track, see pointStore.py) and their timestamps, bumps the journey version,
+        derives the distance and elevation summary, the moving time and fastest kilometre and
+        the bounding box, rebuilds the simplified LOD levels stored next to them and matches
+        the track against the segments.
+
+        Parameters:
+        - journey (Journey): The journey being created or updated.
+        - points (list or np.ndarray): The validated points of the track.
+        - times (np.ndarray, optional): The validated Unix epoch milliseconds of every point.
+        """
+        array = points_to_array(points)
+        pointStore.attach(journey, encode_points(array))
+        journey.times = encode_times(times) if times is not None else None
+        journey.version = (journey.version or 0) + 1
+
+        if times is not None:
+            km_splits = splits.split_times(array, times, 'km')
+            journey.movingTime = km_splits['movingTime']
+            fastest = km_splits['fastest']
+            journey.fastestKmPace = km_splits['splits'][fastest]['pace'] if fastest is not None else None
+        else:
+            journey.movingTime = journey.fastestKmPace = None
+
+        metrics = track_metrics(array)
+        journey.computedDistance = metrics['distance']
+        journey.elevationGain = metrics['elevationGain']
+        journey.elevationLoss = metrics['elevationLoss']
+        journey.avgEle = metrics['avgEle']
+        journey.minEle = metrics['minEle']
+        journey.maxEle = metrics['maxEle']
+        journey.minLat, journey.maxLat, journey.minLon, journey.maxLon = bounding_box(array)
+
+        journey.lods = [
+            models.JourneyLOD(level=level, tolerance=tolerance, points=encode_points(simplified))
+            for level, tolerance, simplified in build_lod_pyramid(array)
+        ]
+        journey.efforts = [
+            models.SegmentEffort(segmentId=segmentId, startIndex=start, endIndex=end, distance=distance)
+            for segmentId, start, end, distance in segmentMatching.match_track(db.session, array)
+        ]
+
+    def delete_journeys(userId, journeyIds) -> list:
+        """
+        Deletes journeys of a user with set-based statements, together with their LOD levels,
+        segment efforts, their references to their point blobs and their contribution to the
+        user's heatmap. Only the points of the deleted journeys are read. The changes are not
+        committed.
+
+        Parameters:
+        - userId (int): The owner of the journeys. Journeys of other users are ignored.
+        - journeyIds (list): The ids of the journeys to delete.
+
+        Returns:
+        - list: The ids of the journeys that were deleted.
+        """
+        rows = db.session.query(models.Journey.id, models.Journey.points, models.Journey.pointsHash).filter(
+            models.Journey.id.in_(journeyIds), models.Journey.userId == userId).all()
+        if not rows:
+            return []
+
+        deleted = [row.id for row in rows]
+        dataVersion.bump(userId)
+        for row in rows:
+            heatmap.apply_track(db.session, userId, decode_points(row.points), -1)
+
+        models.JourneyLOD.query.filter(models.JourneyLOD.journeyId.in_(deleted)).delete(synchronize_session=False)
+        models.SegmentEffort.query.filter(models.SegmentEffort.journeyId.in_(deleted)).delete(synchronize_session=False)
+        models.Journey.query.filter(models.Journey.id.in_(deleted), models.Journey.userId == userId).delete(synchronize_session='fetch')
+        pointStore.release(db.session, [row.pointsHash for row in rows])
+        thumbnails.discard_thumbnails(deleted)
+        resampling.cache.discard(deleted)
+        elevationProfile.cache.discard(deleted)
+        return deleted
+
+    def can_view_journey(user, journey) -> bool:
+        """
+        Returns if a user may see a journey: their own, or one of a friend whose account is
+        not private.
+
+        Parameters:
+        - user (User): The authenticated user.
+        - journey (Journey): The journey.
+
+        Returns:
+        - bool: True if the journey can be shown to the user.
+        """
+        if journey.userId == user.id:
+            return True
+
+        owner = db.session.get(models.User, journey.userId)
+        if owner is None or owner.isPrivate:
+            return False
+        return models.Friendship.query.filter(
+            ((models.Friendship.requester_id == user.id) & (models.Friendship.addressee_id == owner.id)) |
+            ((models.Friendship.requester_id == owner.id) & (models.Friendship.addressee_id == user.id)),
+            models.Friendship.status == 'accepted').first() is not None
+
+    @app.route("/get_journeys_of_user", methods=["GET"])
+    @jwt_required()
+    def getJourneys() -> Tuple[dict, int]:
+        """
+        Returns all the journeys of a user.
+
+        Parameters
+        ----------
+        format : str, optional
+            Query parameter, 'json' (default) or 'polyline'. With 'polyline' the points are
+            returned as a Google encoded polyline plus an encoded elevation stream.
+        precision : int, optional
+            Query parameter, polyline precision of 5 (default) or 6.
+        include_points : str, optional
+            Query parameter, 'false' returns only the journey summaries. The points column
+            is then never loaded from the database.
+        lod : int, optional
+            Query parameter, level of detail of the returned points, 0 (default) for the
+            full track up to the coarsest precomputed simplification.
+        tolerance : float, optional
+            Query parameter, alternative to lod. Picks the coarsest level simplified with
+            at most this tolerance in metres.
+        from, to : str, optional
+            Query parameters, inclusive YYYY-MM-DD bounds on dateCreated.
+        type : str, optional
+            Query parameter, only returns journeys of this type.
+        limit : int, optional
+            Query parameter, pages the journeys newest first (by dateCreated, then id),
+            at most MAX_JOURNEYS_PAGE_SIZE per page.
+        cursor : str, optional
+            Query parameter, the nextCursor of the previous page.
+
+        Returns
+        -------
+        Json
+            A JSON object that contains the userId and an array of all
+            the journeys that belong to the user. When paging, nextCursor is the cursor
+            of the next page, or null on the last page.
+
+        Notes
+        -----
+        If there are no journeys that belong to the user a 404 error will be sent as there was no
+        journey data found. If the journey data exists, it is returned with a response of 200.
+        The response carries an ETag of the user's data version; a matching If-None-Match
+        is answered with 304 before any journey is loaded. Clients may ask for
+        application/msgpack or application/cbor in the Accept header, in which 'json' points
+        are sent as typed float arrays (see contentNegotiation.py).
+
+        Exceptions
+        ----------
+        None.
+
+        """
+
+        current_user_email = get_jwt_identity()
+        user = models.User.query.filter_by(email=current_user_email).first()
+        if not user:
+            return jsonify({'status': 404, 'message': 'User not found'}), 404
+
+        media_type = contentNegotiation.negotiate()
+        etag = contentNegotiation.variant_etag(dataVersion.current_etag(user), media_type)
+        not_modified = dataVersion.not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        point_format, precision, error_message = GPSRoutes.parse_point_format(request.args)
+        if error_message:
+            return jsonify({'status': 400, 'message': error_message}), 400
+
+        lod, error_message = GPSRoutes.parse_lod(request.args)
+        if error_message:
+            return jsonify({'status': 400, 'message': error_message}), 400
+
+        typed = contentNegotiation.is_binary(media_type)
+        include_points = request.args.get('include_points', 'true').lower() != 'false'
+
+        limit, after, error_message = GPSRoutes.parse_journey_page(request.args)
+        if error_message:
+            return jsonify({'status': 400, 'message': error_message}), 400
+
+        query, error_message = GPSRoutes.filter_journeys(
+            models.Journey.query.filter_by(userId=user.id), request.args)
+        if error_message:
+            return jsonify({'status': 400, 'message': error_message}), 400
+
+        # Keyset pagination, newest first, served by the (userId, dateCreated, id) index
+        if limit is not None:
+            order = db.tuple_(models.Journey.dateCreated, models.Journey.id)
+            if after is not None:
+                query = query.filter(order < after)
+            query = query.order_by(models.Journey.dateCreated.desc(), models.Journey.id.desc()).limit(limit + 1)
+
+        if not include_points:
+            query = query.options(db.defer(models.Journey.points, raiseload=True))
+        elif lod:
+            query = query.options(db.defer(models.Journey.points))
+
+        journeys = query.all()
+        next_cursor = None
+        if limit is not None and len(journeys) > limit:
+            journeys = journeys[:limit]
+            next_cursor = GPSRoutes.encode_journey_cursor(journeys[-1])
+
+        point_arrays = GPSRoutes.journey_point_arrays(journeys, lod) if include_points else {}
+        journey_data = []
+        for journey in journeys:
+            point_data = GPSRoutes.point_fields(point_arrays[journey.id], point_format, precision, typed) if include_points else {}
+            journey_data.append({
+                'id': journey.id,
+                'name': journey.name,
+                'type': journey.type,
+                'totalDistance': journey.totalDistance,
+                'computedDistance': journey.computedDistance,
+                'elevation': {
+                    'avg': journey.avgEle,
+                    'min': journey.minEle,
+                    'max': journey.maxEle,
+                    'gain': journey.elevationGain,
+                    'loss': journey.elevationLoss,
+                },
+                **point_data,
+                'startTime': journey.startTime.strftime('%H:%M:%S') if journey.startTime else None,
+                'endTime': journey.endTime.strftime('%H:%M:%S') if journey.endTime else None,
+                'dateCreated': journey.dateCreated.strftime('%d-%m-%Y') if journey.dateCreated else None,
+            })
+
+        if journey_data:
+            payload = {'status': 200, 'data': journey_data}
+            if limit is not None:
+                payload['nextCursor'] = next_cursor
+            return contentNegotiation.make_response(payload, media_type, etag)
+        else:
+            return jsonify({'status': 404, 'message': 'No journeys found for given userId'}), 404
+
+    @app.route("/journey/<int:journeyId>/points", methods=["GET"])
+    @jwt_required()
+    def getJourneyPoints(journeyId) -> Tuple[dict, int]:
+        """
+        Returns one page of the points of a journey.
+
+        Parameters
+        ----------
+        journeyId : int
+            The journey whose points you want.
+        offset : int, optional
+            Query parameter, index of the first point to return. Defaults to 0.
+        limit : int, optional
+            Query parameter, maximum number of points to return. Defaults to
+            POINTS_PAGE_SIZE and is capped at MAX_POINTS_PAGE_SIZE.
+        format, precision : optional
+            Query parameters, same as for /get_journeys_of_user.
+
+        Returns
+        -------
+        Json
+            A JSON object with the page of points, the offset and limit used, and the
+            total number of points in the journey.
+
+        Notes
+        -----
+        Only the bytes of the requested range are read out of an uncompressed track (see
+        pointStore.read_points). A compressed track is restored whole for every page.
+
+        Exceptions
+        ----------
+        None.
+
+        """
+        current_user_email = get_jwt_identity()
+        current_user = models.User.query.filter_by(email=current_user_email).first()
+        if not current_user:
+            return jsonify({'status': 404, 'message': 'User not found'}), 404
+
+        journey = db.session.get(models.Journey, journeyId, options=[db.defer(models.Journey.points)])
+        if not journey:
+            return jsonify({'status': 404, 'message': 'Journey not found'}), 404
+
+        if journey.userId != current_user.id:
+            return jsonify({'status': 403, 'message': 'Forbidden: You do not have permission to access this journey'}), 403
+
+        offset = request.args.get('offset', 0, type=int)
+        limit = request.args.get('limit', GPSRoutes.POINTS_PAGE_SIZE, type=int)
+        if offset < 0 or limit < 1:
+            return jsonify({'status': 400, 'message': 'Invalid offset or limit'}), 400
+        limit = min(limit, GPSRoutes.MAX_POINTS_PAGE_SIZE)
+
+        point_format, precision, error_message = GPSRoutes.parse_point_format(request.args)
+        if error_message:
+            return jsonify({'status': 400, 'message': error_message}), 400
+
+        page = pointStore.read_points(db.session, journey.pointsHash, offset, offset + limit)
+        if page is None:
+            page = decode_points(journey.points, offset, offset + limit), point_count(journey.points)
+        points, total = page
+
+        return jsonify({'status': 200, 'data': {
+            'id': journey.id,
+            'offset': offset,
+            'limit': limit,
+            'total': total,
+            **GPSRoutes.point_fields(points, point_format, precision),
+        }}), 200
+
+    @app.route("/journeys/within", methods=["GET"])
+    @jwt_required()
+    def getJourneysWithin() -> Tuple[dict, int]:
+        """
+        Returns the journeys of a user that pass through a map area.
+
+        Parameters
+        ----------
+        bbox : str
+            Query parameter, 'west,south,east,north' in degrees.
+
+        Returns
+        -------
+        Json
+            A JSON object with the summaries (without points) of the journeys whose track
+            passes through the box, and their bounding boxes.
+
+        Notes
+        -----
+        Candidates are found through the spatial index on the journey bounding boxes, so
+        only their points are decoded for the exact test.
+
+        Exceptions
+        ----------
+        None.
+
+        """
+        current_user_email = get_jwt_identity()
+        user = models.User.query.filter_by(email=current_user_email).first()
+        if not user:
+            return jsonify({'status': 404, 'message': 'User not found'}), 404
+
+        bbox, error_message = parse_bbox(request.args.get('bbox'))
+        if error_message:
+            return jsonify({'status': 400, 'message': error_message}), 400
+
+        ids = candidate_ids(db.session, user.id, bbox)
+        journeys = models.Journey.query.filter(models.Journey.id.in_(ids)).order_by(models.Journey.id).all() if ids else []
+
+        journey_data = [{
+            'id': journey.id,
+            'name': journey.name,
+            'type': journey.type,
+            'totalDistance': journey.totalDistance,
+            'dateCreated': journey.dateCreated.strftime('%d-%m-%Y') if journey.dateCreated else None,
+            'bbox': [journey.minLon, journey.minLat, journey.maxLon, journey.maxLat],
+        } for journey in journeys if passes_through(journey.point_array, bbox)]
+
+        return jsonify({'status': 200, 'data': journey_data}), 200
+
+    @app.route("/heatmap/<int:z>/<int:x>/<int:y>", methods=["GET"])
+    @jwt_required()
+    def getHeatmapTile(z, x, y) -> Tuple[dict, int]:
+        """
+        Returns one XYZ tile of the heatmap of every journey of a user.
+
+        Parameters
+        ----------
+        z : int
+            The zoom level, between heatmap.MIN_ZOOM and heatmap.MAX_ZOOM.
+        x : int
+            The tile column.
+        y : int
+            The tile row.
+
+        Returns
+        -------
+        Json
+            A JSON object with the grid of journey counts of the tile, one list per row from
+            north to south, and its largest count.
+
+        Notes
+        -----
+        The tiles are kept up to date when journeys are created, updated or deleted, so this
+        is a single row lookup.
+
+        Exceptions
+        ----------
+        None.
+
+        """
+        current_user_email = get_jwt_identity()
+        user = models.User.query.filter_by(email=current_user_email).first()
+        if not user:
+            return jsonify({'status': 404, 'message': 'User not found'}), 404
+
+        error_message = webMercator.tile_error(z, x, y, heatmap.MIN_ZOOM, heatmap.MAX_ZOOM)
+        if error_message:
+            return jsonify({'status': 400, 'message': error_message}), 400
+
+        tile = models.HeatmapTile.query.filter_by(userId=user.id, zoom=z, x=x, y=y).first()
+        counts = heatmap.tile_counts(tile)
+
+        return jsonify({'status': 200, 'data': {
+            'z': z,
+            'x': x,
+            'y': y,
+            'size': heatmap.GRID_SIZE,
+            'max': int(counts.max()),
+            'counts': counts.tolist(),
+        }}), 200
+
+    @app.route("/journeys.geojson", methods=["GET"])
+    @jwt_required()
+    def getJourneysGeoJSON() -> Tuple[Response, int]:
+        """
+        Returns the journeys of a user as a GeoJSON FeatureCollection.
+
+        Parameters
+        ----------
+        lod, tolerance : optional
+            Query parameters, level of detail of the tracks, same as for /get_journeys_of_user.
+        from, to, type : str, optional
+            Query parameters, filter the journeys, same as for /get_journeys_of_user.
+
+        Returns
+        -------
+        GeoJSON
+            A FeatureCollection (application/geo+json) with one Feature per journey, in id
+            order, that map libraries can use as a source directly.
+
+        Notes
+        -----
+        The response carries an ETag of the user's data version; a matching If-None-Match
+        is answered with 304 before any journey is loaded.
+
+        Exceptions
+        ----------
+        None.
+
+        """
+        current_user_email = get_jwt_identity()
+        user = models.User.query.filter_by(email=current_user_email).first()
+        if not user:
+            return jsonify({'status': 404, 'message': 'User not found'}), 404
+
+        etag = dataVersion.current_etag(user)
+        not_modified = dataVersion.not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        lod, error_message = GPSRoutes.parse_lod(request.args)
+        if error_message:
+            return jsonify({'status': 400, 'message': error_message}), 400
+
+        query, error_message = GPSRoutes.filter_journeys(
+            models.Journey.query.filter_by(userId=user.id), request.args)
+        if error_message:
+            return jsonify({'status': 400, 'message': error_message}), 400
+        if lod:
+            query = query.options(db.defer(models.Journey.points))
+
+        journeys = query.order_by(models.Journey.id).all()
+        point_arrays = GPSRoutes.journey_point_arrays(journeys, lod)
+        collection = {
+            'type': 'FeatureCollection',
+            'features': [GPSRoutes.geojson_feature(journey, point_arrays[journey.id]) for journey in journeys],
+        }
+        response = Response(json.dumps(collection), mimetype='application/geo+json')
+        return dataVersion.with_etag(response, etag), 200
+
+    @app.route("/tiles/journeys/<int:z>/<int:x>/<int:y>.mvt", methods=["GET"])
+    @jwt_required()
+    def getJourneysTile(z, x, y) -> Tuple[Response, int]:
+        """
+        Returns one XYZ vector tile of the journeys of a user.
+
+        Parameters
+        ----------
+        z : int
+            The zoom level, between vectorTiles.MIN_ZOOM and vectorTiles.MAX_ZOOM.
+        x : int
+            The tile column.
+        y : int
+            The tile row.
+
+        Returns
+        -------
+        MVT
+            A Mapbox Vector Tile with a 'journeys' layer of one line feature per journey
+            that crosses the tile, with its name, type, totalDistance and dateCreated. The
+            body is empty when no journey crosses the tile.
+
+        Notes
+        -----
+        Tracks are clipped to the tile and quantized to its grid, read at the LOD level that
+        matches the zoom (see vectorTiles.py). Only journeys whose bounding box intersects
+        the tile are loaded, through the spatial index. Tiles are cached in memory per user
+        data version and carry an ETag of it.
+
+        Exceptions
+        ----------
+        None.
+
+        """
+        current_user_email = get_jwt_identity()
+        user = models.User.query.filter_by(email=current_user_email).first()
+        if not user:
+            return jsonify({'status': 404, 'message': 'User not found'}), 404
+
+        error_message = webMercator.tile_error(z, x, y, vectorTiles.MIN_ZOOM, vectorTiles.MAX_ZOOM)
+        if error_message:
+            return jsonify({'status': 400, 'message': error_message}), 400
+
+        etag = dataVersion.current_etag(user)
+        not_modified = dataVersion.not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        version = user.dataVersion or 0
+        tile = vectorTiles.cache.get((user.id, version, z, x, y))
+        if tile is None:
+            ids = candidate_ids(db.session, user.id, vectorTiles.tile_bbox(z, x, y))
+            lod = lod_for_tolerance(vectorTiles.simplify_tolerance(z))
+            journeys = []
+            if ids:
+                journeys = models.Journey.query.filter(models.Journey.id.in_(ids)).options(
+                    db.defer(models.Journey.points)).order_by(models.Journey.id).all()
+            point_arrays = GPSRoutes.journey_point_arrays(journeys, lod)
+
+            features = []
+            for journey in journeys:
+                parts = vectorTiles.track_parts(point_arrays[journey.id], z, x, y)
+                if parts:
+                    features.append((journey.id, GPSRoutes.journey_properties(journey), parts))
+            tile = vectorTiles.encode_tile(features)
+            vectorTiles.cache.put((user.id, version, z, x, y), tile)
+
+        response = Response(tile, mimetype=vectorTiles.MEDIA_TYPE)
+        return dataVersion.with_etag(response, etag), 200
+
+    @app.route("/create_journey", methods=["POST"])
+    @jwt_required()
+    def createJourney() -> Tuple[dict, int]:
+        """
+        Creates a journey for a user.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        Json
+            A JSON object that contains a message related to the creation of the data.
+
+        Notes
+        -----
+        The format of the date/time variables must be handled with caution as the table only
+        accepts a particular data/time format. A response of 201 is returned if the data is
+        created successfully, else a code of 400 is returned (Incorrect data).
+
+        The elevation summary (avg, min, max, gain and loss) and computedDistance are derived
+        from the points on the server, so a client-supplied elevation is ignored. totalDistance
+        defaults to computedDistance when it is not supplied.
+
+        A request with an Idempotency-Key header is only processed once: retries with the same
+        key get the original response back without the journey being validated or stored
+        again (see idempotency.py).
+
+        Exceptions
+        ----------
+        ValueError
+            Raised when the startTime, endTime or dateCreated variables are not in the correct
+            format.
+
+        """
+        current_user_email = get_jwt_identity()
+        user = models.User.query.filter_by(email=current_user_email).first()
+        if not user:
+            return jsonify({'status': 404, 'message': 'User not found'}), 404
 
-        Parameters:
-        - points (list): The list of point dictionaries to validate.
+        key, error_message = idempotency.request_key()
+        if error_message:
+            return jsonify({'status': 400, 'message': error_message}), 400
+        body_hash = idempotency.request_hash() if key is not None else None
+        if key is not None:
+            replayed = idempotency.replay(user.id, key, body_hash)
+            if replayed:
+                return replayed
 
-        Returns:
-        - (bool, str): Tuple containing a boolean indicating if the validation passed,
-                    and a string with an error message if it failed.
-        """
-        if points != []:
-            required_keys = {'lat', 'lon', 'ele'}
-            for point in points:
-                point_keys = set(point.keys())
-                if point_keys != required_keys:
-                    missing_keys = required_keys - point_keys
-                    extra_keys = point_keys - required_keys
-                    error_message = []
-                    if missing_keys:
-                        error_message.append(f"Missing keys: {', '.join(missing_keys)}")
-                    if extra_keys:
-                        error_message.append(f"Extra keys: {', '.join(extra_keys)}")
-                    return False, '; '.join(error_message)
-
-                # Check that all values are numerical
-                for key in required_keys:
-                    value = point[key]
-                    if not isinstance(value, (int, float)):
-                        return False, f"Invalid value for {key}: {value}. Must be a numerical value."
-
-            return True, ""
-        return False, "No data provided"
+        journey, error_message = GPSRoutes.journey_from_data(user.id, request.get_json())
+        if journey is None:
+            return jsonify({'status': 400, 'message': error_message}), 400
 
-    @app.route("/get_journeys_of_user", methods=["GET"])
+        db.session.add(journey)
+        dataVersion.bump(user.id)
+        db.session.flush()
+        payload = {'status': 201, 'message': 'Journey created successfully', 'id': journey.id}
+        if key is not None:
+            idempotency.remember(user.id, key, body_hash, payload, 201)
+            replayed = idempotency.commit_or_replay(user.id, key, body_hash)
+            if replayed:
+                return replayed
+        else:
+            db.session.commit()
+
+        return jsonify(payload), 201
+
+    @app.route("/create_journeys_batch", methods=["POST"])
     @jwt_required()
-    def getJourneys() -> Tuple[dict, int]:
+    def createJourneysBatch() -> Tuple[dict, int]:
         """
-        Returns all the journeys of a user.
+        Creates several journeys for a user in one transaction.
 
         Parameters
         ----------
-        userId : int
-            The user for which you want to query the journeys.
+        journeys : list
+            JSON body field, a list of journeys in the same format as /create_journey.
 
         Returns
         -------
         Json
-            A JSON object that contains the userId and an array of all
-            the journeys that belong to the user.
+            A JSON object with one result per journey, in the order they were sent. Each
+            result holds the index, a status (201 or 400), and the new journey id or an
+            error message.
 
         Notes
         -----
-        If there are no journeys that belong to the user a 404 error will be sent as there was no
-        journey data found. If the journey data exists, it is returned with a response of 200.
+        Every journey is validated first, then all valid journeys are inserted together and
+        committed once. The response is 201 if every journey was created, 207 if only some
+        were, and 400 if none were.
 
         Exceptions
         ----------
         None.
 
         """
-
         current_user_email = get_jwt_identity()
         user = models.User.query.filter_by(email=current_user_email).first()
         if not user:
             return jsonify({'status': 404, 'message': 'User not found'}), 404
 
-        journeys = models.Journey.query.filter_by(userId=user.id).all()
-        journey_data = []
-        for journey in journeys:
-            points = json.loads(journey.points) if journey.points else []
-
-            journey_data.append({
-                'id': journey.id,
-                'name': journey.name,
-                'type': journey.type,
-                'totalDistance': journey.totalDistance,
-                'elevation': {
-                    'avg': journey.avgEle,
-                    'min': journey.minEle,
-                    'max': journey.maxEle,
-                },
-                'points': points,
-                'startTime': journey.startTime.strftime('%H:%M:%S') if journey.startTime else None,
-                'endTime': journey.endTime.strftime('%H:%M:%S') if journey.endTime else None,
-                'dateCreated': journey.dateCreated.strftime('%d-%m-%Y') if journey.dateCreated else None,
-            })
-
-        if journey_data:
-            return jsonify({'status': 200, 'data': journey_data}), 200
+        data = request.get_json()
+        items = data.get('journeys') if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            return jsonify({'status': 400, 'message': 'Missing field: journeys'}), 400
+        if len(items) > GPSRoutes.MAX_BATCH_SIZE:
+            return jsonify({'status': 400, 'message': f'Too many journeys. At most {GPSRoutes.MAX_BATCH_SIZE} per batch'}), 400
+
+        results = []
+        journeys = []
+        for index, item in enumerate(items):
+            journey, error_message = GPSRoutes.journey_from_data(user.id, item)
+            if journey is None:
+                results.append({'index': index, 'status': 400, 'message': error_message})
+            else:
+                results.append({'index': index, 'status': 201})
+                journeys.append((index, journey))
+
+        if journeys:
+            db.session.add_all([journey for _, journey in journeys])
+            dataVersion.bump(user.id)
+            db.session.commit()
+            for index, journey in journeys:
+                results[index]['id'] = journey.id
+
+        if len(journeys) == len(items):
+            status = 201
+        elif journeys:
+            status = 207
         else:
-            return jsonify({'status': 404, 'message': 'No journeys found for given userId'}), 404
+            status = 400
 
-    @app.route("/create_journey", methods=["POST"])
+        return jsonify({'status': status, 'created': len(journeys), 'results': results}), status
+
+    @app.route("/import_journey", methods=["POST"])
     @jwt_required()
-    def createJourney() -> Tuple[dict, int]:
+    def importJourney() -> Tuple[dict, int]:
         """
-        Creates a journey for a user.
+        Creates a journey for a user from an uploaded GPX 1.1 or TCX file.
 
         Parameters
         ----------
-        None.
+        file : file
+            Multipart form field holding the GPX or TCX file.
+        name, type : str, optional
+            Form fields overriding the track name and the activity type read from the file.
+        startTime, endTime : str, optional
+            Form fields in '%H:%M:%S' format, required when the file has no timestamps.
+        dateCreated : str, optional
+            Form field in '%Y-%m-%d' format, required when the file has no timestamps.
 
         Returns
         -------
         Json
-            A JSON object that contains a message related to the creation of the data.
+            A JSON object that contains a message, the id of the new journey and the number
+            of points imported.
 
         Notes
         -----
-        The format of the date/time variables must be handled with caution as the table only
-        accepts a particular data/time format. A response of 201 is returned if the data is
-        created successfully, else a code of 400 is returned (Incorrect data).
+        The file is parsed incrementally and each track point is discarded from the XML tree
+        once read, so memory use does not grow with the size of the file beyond the packed
+        points themselves. The points then go through the same validation and storage as
+        /create_journey.
 
         Exceptions
         ----------
         ValueError
-            Raised when the startTime, endTime or dateCreated variables are not in the correct
+            Raised when the file is not valid XML or the date/time fields are in the wrong
             format.
 
         """
@@ -153,57 +1109,67 @@ class GPSRoutes:
         if not user:
             return jsonify({'status': 404, 'message': 'User not found'}), 404
 
-        data = request.get_json()
+        upload = request.files.get('file')
+        if upload is None:
+            return jsonify({'status': 400, 'message': 'Missing field: file'}), 400
 
-        points = data.get('points')
-        if points is None:
-            return jsonify({'status': 400, 'message': 'Missing field: points'}), 400
+        try:
+            track = parse_track(upload.stream)
+        except ValueError as e:
+            return jsonify({'status': 400, 'message': str(e)}), 400
 
-        valid, error_message = GPSRoutes.validate_points(points)
-        if not valid:
+        error_message = validate_array(track['points'])
+        if error_message:
             return jsonify({'status': 400, 'message': f'Invalid points data: {error_message}'}), 400
 
-        try:
-            name = data['name']
-            journey_type = data['type']
-            if journey_type not in ['Run', 'Walk', 'Cycle']:
-                return jsonify({'status': 400, 'message': 'Invalid journey type. Must be Run, Walk, or Cycle'}), 400
-            totalDistance = data['totalDistance']
-            elevation = data['elevation']
-            avgEle = elevation['avg']
-            minEle = elevation['min']
-            maxEle = elevation['max']
-            points = json.dumps(data['points'])
+        # Files with timestamps missing on some points, or out of order, are imported without them
+        times = validate_times(track['times'])[0] if track['times'] is not None else None
 
-        except KeyError as e:
-            return jsonify({'status': 400, 'message': f'Missing field: {str(e)}'}), 400
+        name = request.form.get('name') or track['name'] or upload.filename or 'Imported journey'
+        journey_type = request.form.get('type') or track['type']
+        if journey_type is None:
+            return jsonify({'status': 400, 'message': 'Missing field: type'}), 400
+        if journey_type not in ['Run', 'Walk', 'Cycle']:
+            return jsonify({'status': 400, 'message': 'Invalid journey type. Must be Run, Walk, or Cycle'}), 400
 
         try:
-            startTime = datetime.strptime(data['startTime'], '%H:%M:%S').time()
-            endTime = datetime.strptime(data['endTime'], '%H:%M:%S').time()
-            dateCreated = datetime.strptime(data['dateCreated'], '%Y-%m-%d').date()
+            if 'startTime' in request.form:
+                startTime = datetime.strptime(request.form['startTime'], '%H:%M:%S').time()
+            else:
+                startTime = track['startTime'].time() if track['startTime'] else None
+            if 'endTime' in request.form:
+                endTime = datetime.strptime(request.form['endTime'], '%H:%M:%S').time()
+            else:
+                endTime = track['endTime'].time() if track['endTime'] else None
+            if 'dateCreated' in request.form:
+                dateCreated = datetime.strptime(request.form['dateCreated'], '%Y-%m-%d').date()
+            else:
+                dateCreated = track['startTime'].date() if track['startTime'] else None
         except ValueError as e:
             return jsonify({'status': 400, 'message': 'Invalid date/time format'}), 400
 
+        for field, value in (('startTime', startTime), ('endTime', endTime), ('dateCreated', dateCreated)):
+            if value is None:
+                return jsonify({'status': 400, 'message': f'Missing field: {field}'}), 400
+
         journey = models.Journey(
             userId=user.id,
             name=name,
             type=journey_type,
-            totalDistance=totalDistance,
-            avgEle=avgEle,
-            minEle=minEle,
-            maxEle=maxEle,
-            points=points,
             startTime=startTime,
             endTime=endTime,
             dateCreated=dateCreated
         )
+        GPSRoutes.store_points(journey, track['points'], times)
+        heatmap.apply_track(db.session, user.id, journey.point_array, 1)
+        journey.totalDistance = journey.computedDistance
 
         db.session.add(journey)
+        dataVersion.bump(user.id)
         db.session.commit()
 
-
-        return jsonify({'status': 201, 'message': 'Journey created successfully'}), 201
+        return jsonify({'status': 201, 'message': 'Journey imported successfully',
+                        'id': journey.id, 'points': len(track['points'])}), 201
 
     @app.route("/delete_journey/<int:journeyId>", methods=["DELETE"])
     @jwt_required()
@@ -223,8 +1189,46 @@ class GPSRoutes:
 
         Notes
         -----
+        Only the journey being deleted is read; the ownership check is part of the
+        DELETE statement.
+
+        Exceptions
+        ----------
         None.
 
+        """
+        current_user_email = get_jwt_identity()
+        user = models.User.query.filter_by(email=current_user_email).first()
+        if not user:
+            return jsonify({'status': 404, 'message': 'User not found'}), 404
+
+        if not GPSRoutes.delete_journeys(user.id, [journeyId]):
+            return {'status': 404, 'message': 'Journey not found'}, 404
+        db.session.commit()
+        return {'status': 200, 'message': 'Journey deleted successfully'}, 200
+
+    @app.route("/delete_journeys", methods=["POST"])
+    @jwt_required()
+    def deleteJourneys() -> Tuple[dict, int]:
+        """
+        Deletes several journeys of a user in one transaction.
+
+        Parameters
+        ----------
+        ids : list
+            JSON body field, the ids of the journeys to delete.
+
+        Returns
+        -------
+        Json
+            A JSON object with the ids that were deleted and the ids that were not found
+            (or belong to another user).
+
+        Notes
+        -----
+        The journeys are removed with one DELETE statement and committed once. The response
+        is 404 if none of the journeys were found.
+
         Exceptions
         ----------
         None.
@@ -234,14 +1238,22 @@ class GPSRoutes:
         user = models.User.query.filter_by(email=current_user_email).first()
         if not user:
             return jsonify({'status': 404, 'message': 'User not found'}), 404
-        journeys = models.Journey.query.filter_by(userId=user.id).all()
 
-        for journey in journeys:
-            if journeyId == journey.id:
-                db.session.delete(journey)
-                db.session.commit()
-                return {'status': 200, 'message': 'Journey deleted successfully'}, 200
-        return {'status': 404, 'message': 'Journey not found'}, 404
+        data = request.get_json()
+        journeyIds = data.get('ids') if isinstance(data, dict) else None
+        if (not isinstance(journeyIds, list) or not journeyIds
+                or not all(type(journeyId) is int for journeyId in journeyIds)):
+            return jsonify({'status': 400, 'message': 'Missing field: ids must be a list of journey ids'}), 400
+        if len(journeyIds) > GPSRoutes.MAX_BATCH_SIZE:
+            return jsonify({'status': 400, 'message': f'Too many journeys. At most {GPSRoutes.MAX_BATCH_SIZE} per batch'}), 400
+
+        deleted = GPSRoutes.delete_journeys(user.id, journeyIds)
+        if not deleted:
+            return jsonify({'status': 404, 'message': 'Journeys not found'}), 404
+        db.session.commit()
+
+        not_found = sorted(set(journeyIds) - set(deleted))
+        return jsonify({'status': 200, 'deleted': sorted(deleted), 'notFound': not_found}), 200
 
     @app.route("/update_journey/<int:journeyId>", methods=["PUT"])
     @jwt_required()
@@ -253,15 +1265,23 @@ class GPSRoutes:
         ----------
         journeyId : int
             The journey that you want to update.
+        name, type, totalDistance : optional
+            JSON body fields, the new values.
+        points : list, optional
+            JSON body field, the new track, in the same format as /create_journey.
 
         Returns
         -------
         Json
-            A JSON object that contains information about the changes made to journey.
+            A JSON object that contains information about the changes made to journey. Body
+            fields that were not applied are listed under 'ignored'.
 
         Notes
         -----
-        None.
+        The elevation summary (avg, min, max, gain and loss) is derived from the points, as
+        in /create_journey, so an elevation field is ignored and reported as such; it changes
+        with the points. New points without a totalDistance reset it to the computed
+        distance, as in /create_journey.
 
         Exceptions
         ----------
@@ -292,22 +1312,16 @@ class GPSRoutes:
             journey.type = data['type']
         if 'totalDistance' in data:
             journey.totalDistance = data['totalDistance']
-        if 'elevation' in data:
-            elevation = data['elevation']
-            if 'avg' in elevation:
-                journey.avgEle = elevation['avg']
-            if 'min' in elevation:
-                journey.minEle = elevation['min']
-            if 'max' in elevation:
-                journey.maxEle = elevation['max']
-
         # Validate points directly from the request JSON
         if 'points' in data:
-            points = data['points']
-            valid, error_message = GPSRoutes.validate_points(points)
-            if not valid:
+            points, times, error_message = validate_timed_point_array(data['points'])
+            if points is None:
                 return jsonify({'status': 400, 'message': f'Invalid points data: {error_message}'}), 400
-            journey.points = json.dumps(points)
+            heatmap.apply_track(db.session, journey.userId, journey.point_array, -1)
+            GPSRoutes.store_points(journey, points, times)
+            heatmap.apply_track(db.session, journey.userId, journey.point_array, 1)
+            if 'totalDistance' not in data:
+                journey.totalDistance = journey.computedDistance
 
         try:
             if 'startTime' in data:
@@ -319,8 +1333,12 @@ class GPSRoutes:
         except ValueError as e:
             return jsonify({'status': 400, 'message': 'Invalid date/time format'}), 400
 
+        dataVersion.bump(current_user.id)
         db.session.commit()
 
+        if 'elevation' in data:
+            return jsonify({'status': 200, 'message': 'Journey updated successfully; elevation is derived from the points and was ignored',
+                            'ignored': ['elevation']}), 200
         return jsonify({'status': 200, 'message': 'Journey updated successfully'}), 200
     
     @app.route("/convert_journey_to_gpx/<int:journeyId>", methods=["GET"])
@@ -337,7 +1355,14 @@ class GPSRoutes:
         Returns
         -------
         Response
-            GPX data.
+            GPX data, streamed in chunks of points so memory use does not grow with the
+            length of the track. A matching If-None-Match is answered with 304 once the
+            journey is found to belong to the user.
+
+        Notes
+        -----
+        The ETag covers the user's data version and the creator name written into the file,
+        so renaming the user changes it too.
         """
 
         current_user_email = get_jwt_identity()
@@ -353,26 +1378,307 @@ class GPSRoutes:
         if journey.userId != current_user.id:
             return jsonify({'status': 403, 'message': 'Forbidden: You do not have permission to access this journey'}), 403
 
-        gpx = ET.Element('gpx', version='1.1', creator=current_user.first_name)
+        creator = hashlib.sha1((current_user.first_name or '').encode('utf-8')).hexdigest()[:8]
+        etag = f'{dataVersion.current_etag(current_user)}-{creator}'
+        not_modified = dataVersion.not_modified(etag)
+        if not_modified:
+            return not_modified
 
-        metadata = ET.SubElement(gpx, 'metadata')
-        ET.SubElement(metadata, 'name').text = journey.name
-        ET.SubElement(metadata, 'time').text = journey.dateCreated.isoformat()
+        gpx_data = generate_gpx(journey.name, journey.type, current_user.first_name,
+                                journey.dateCreated.isoformat(), journey.points, times_blob=journey.times)
 
-        trk = ET.SubElement(gpx, 'trk')
-        ET.SubElement(trk, 'name').text = journey.name
-        ET.SubElement(trk, 'type').text = journey.type
+        response = Response(stream_with_context(gpx_data))
+        response.headers["Content-Type"] = "application/gpx+xml"
 
-        trkseg = ET.SubElement(trk, 'trkseg')
+        return dataVersion.with_etag(response, etag), 200
 
-        points = json.loads(journey.points)
-        for point in points:
-            trkpt = ET.SubElement(trkseg, 'trkpt', lat=str(point['lat']), lon=str(point['lon']))
-            ET.SubElement(trkpt, 'ele').text = str(point['ele'])
+    @app.route("/journey/<int:journeyId>/thumbnail.png", methods=["GET"])
+    @jwt_required()
+    def getJourneyThumbnail(journeyId) -> Response:
+        """
+        Returns a small image of the track of a journey.
 
-        gpx_data = ET.tostring(gpx, encoding='utf-8', method='xml').decode('utf-8')
+        Parameters
+        ----------
+        journeyId : int
+            The journey, of the user or of one of their friends whose account is not private.
+        size : int, optional
+            Query parameter, width and height of the image in pixels, between
+            thumbnails.MIN_SIZE and thumbnails.MAX_SIZE. Defaults to thumbnails.DEFAULT_SIZE.
 
-        response = make_response(gpx_data)
-        response.headers["Content-Type"] = "application/gpx+xml"
+        Returns
+        -------
+        Response
+            A PNG image of the track on a transparent background, with its start and end
+            marked. A matching If-None-Match is answered with 304.
+
+        Notes
+        -----
+        Images are cached on disk by journey version, points hash and size (see
+        thumbnails.py), so a journey is only drawn again after its points change. The track
+        is drawn from the coarsest LOD level that is still finer than a pixel.
+
+        Exceptions
+        ----------
+        None.
+
+        """
+        current_user_email = get_jwt_identity()
+        user = models.User.query.filter_by(email=current_user_email).first()
+        if not user:
+            return jsonify({'status': 404, 'message': 'User not found'}), 404
+
+        size = request.args.get('size', thumbnails.DEFAULT_SIZE, type=int)
+        if not thumbnails.MIN_SIZE <= size <= thumbnails.MAX_SIZE:
+            return jsonify({'status': 400, 'message': f'Invalid size. Must be between {thumbnails.MIN_SIZE} and {thumbnails.MAX_SIZE}'}), 400
+
+        journey = db.session.get(models.Journey, journeyId)
+        if not journey:
+            return jsonify({'status': 404, 'message': 'Journey not found'}), 404
+        if not GPSRoutes.can_view_journey(user, journey):
+            return jsonify({'status': 403, 'message': 'Forbidden: You do not have permission to access this journey'}), 403
+
+        etag = f'{journey.id}-{journey.version}-{journey.pointsHash}-{size}'
+        not_modified = dataVersion.not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        image = thumbnails.cached_thumbnail(journey.id, journey.version, journey.pointsHash, size)
+        if image is None:
+            lod = lod_for_tolerance(thumbnails.track_extent(journey) / size)
+            array = GPSRoutes.journey_point_arrays([journey], lod)[journey.id]
+            image = thumbnails.render_thumbnail(array, size)
+            thumbnails.store_thumbnail(journey.id, journey.version, journey.pointsHash, size, image)
+
+        return dataVersion.with_etag(Response(image, mimetype='image/png'), etag)
+
+    @app.route("/journey/<int:journeyId>/splits", methods=["GET"])
+    @jwt_required()
+    def getJourneySplits(journeyId) -> Tuple[dict, int]:
+        """
+        Returns the splits of a journey whose points have timestamps.
+
+        Parameters
+        ----------
+        journeyId : int
+            The journey, of the user or of one of their friends whose account is not private.
+        unit : str, optional
+            Query parameter, 'km' (default) or 'mile'.
+
+        Returns
+        -------
+        Json
+            A JSON object with the distance, elapsed and moving time, average and moving pace
+            of the journey, and the duration and pace of every split with the indices of the
+            fastest and slowest full split. Times are in seconds, paces in seconds per unit.
+
+        Notes
+        -----
+        Split boundaries are interpolated between points, see splits.py.
+
+        Exceptions
+        ----------
+        None.
+
+        """
+        current_user_email = get_jwt_identity()
+        user = models.User.query.filter_by(email=current_user_email).first()
+        if not user:
+            return jsonify({'status': 404, 'message': 'User not found'}), 404
+
+        unit = request.args.get('unit', splits.DEFAULT_UNIT)
+        if unit not in splits.UNITS:
+            return jsonify({'status': 400, 'message': f"Invalid unit. Must be one of: {', '.join(splits.UNITS)}"}), 400
+
+        journey = db.session.get(models.Journey, journeyId)
+        if not journey:
+            return jsonify({'status': 404, 'message': 'Journey not found'}), 404
+        if not GPSRoutes.can_view_journey(user, journey):
+            return jsonify({'status': 403, 'message': 'Forbidden: You do not have permission to access this journey'}), 403
+
+        times = decode_times(journey.times)
+        if times is None:
+            return jsonify({'status': 400, 'message': 'Journey has no timestamps'}), 400
+
+        data = splits.split_times(journey.point_array, times, unit)
+        data['id'] = journey.id
+        return jsonify({'status': 200, 'data': data}), 200
+
+    @app.route("/journey/<int:journeyId>/resample", methods=["GET"])
+    @jwt_required()
+    def getJourneyResampled(journeyId) -> Tuple[dict, int]:
+        """
+        Returns the track of a journey interpolated at a fixed spacing along its distance.
+
+        Parameters
+        ----------
+        journeyId : int
+            The journey, of the user or of one of their friends whose account is not private.
+        step : float
+            Query parameter, the spacing of the samples in metres, at least
+            resampling.MIN_STEP_M.
+
+        Returns
+        -------
+        Json
+            A JSON object with parallel lists of distance, lat, lon and ele (and time, in Unix
+            epoch seconds, when the points have timestamps), sampled at 0, step, 2 * step, ...
+            and at the end of the track. A matching If-None-Match is answered with 304.
+
+        Notes
+        -----
+        Responses are cached in memory per journey version, points hash and step (see
+        resampling.py).
+
+        Exceptions
+        ----------
+        None.
+
+        """
+        current_user_email = get_jwt_identity()
+        user = models.User.query.filter_by(email=current_user_email).first()
+        if not user:
+            return jsonify({'status': 404, 'message': 'User not found'}), 404
+
+        step = request.args.get('step', type=float)
+        if step is None or not math.isfinite(step) or step < resampling.MIN_STEP_M:
+            return jsonify({'status': 400, 'message': f'Invalid step. Must be a number of metres, at least {resampling.MIN_STEP_M:g}'}), 400
+
+        journey = db.session.get(models.Journey, journeyId)
+        if not journey:
+            return jsonify({'status': 404, 'message': 'Journey not found'}), 404
+        if not GPSRoutes.can_view_journey(user, journey):
+            return jsonify({'status': 403, 'message': 'Forbidden: You do not have permission to access this journey'}), 403
+
+        etag = f'{journey.id}-{journey.version}-{journey.pointsHash}-{step!r}'
+        not_modified = dataVersion.not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        key = (journey.id, journey.version, journey.pointsHash, step)
+        body = resampling.cache.get(key)
+        if body is None:
+            distance = journey.computedDistance or 0.0
+            if distance / step >= resampling.MAX_SAMPLES:
+                return jsonify({'status': 400, 'message': f'Step too small. At most {resampling.MAX_SAMPLES} samples are returned'}), 400
+
+            data = resampling.resample_track(journey.point_array, step, decode_times(journey.times))
+            data.update({'id': journey.id, 'step': step})
+            body = json.dumps({'status': 200, 'data': data})
+            resampling.cache.put(key, body)
+
+        return dataVersion.with_etag(Response(body, mimetype='application/json'), etag), 200
+
+    @app.route("/journey/<int:journeyId>/elevation_profile", methods=["GET"])
+    @jwt_required()
+    def getElevationProfile(journeyId) -> Tuple[dict, int]:
+        """
+        Returns the elevation against distance chart of a journey, downsampled to a fixed size.
+
+        Parameters
+        ----------
+        journeyId : int
+            The journey, of the user or of one of their friends whose account is not private.
+        points : int, optional
+            Query parameter, the largest number of points of the chart, between
+            elevationProfile.MIN_POINTS and elevationProfile.MAX_POINTS. Defaults to
+            elevationProfile.DEFAULT_POINTS.
+
+        Returns
+        -------
+        Json
+            A JSON object with parallel lists of distance along the track (metres) and ele,
+            picked with Largest-Triangle-Three-Buckets, plus the total distance and number of
+            points of the track. A matching If-None-Match is answered with 304.
+
+        Notes
+        -----
+        Responses are cached in memory per journey version, points hash and number of
+        points (see elevationProfile.py).
+
+        Exceptions
+        ----------
+        None.
+
+        """
+        current_user_email = get_jwt_identity()
+        user = models.User.query.filter_by(email=current_user_email).first()
+        if not user:
+            return jsonify({'status': 404, 'message': 'User not found'}), 404
+
+        points = elevationProfile.DEFAULT_POINTS
+        if 'points' in request.args:
+            points = request.args.get('points', type=int)
+        if points is None or not elevationProfile.MIN_POINTS <= points <= elevationProfile.MAX_POINTS:
+            return jsonify({'status': 400, 'message': f'Invalid points. Must be between {elevationProfile.MIN_POINTS} and {elevationProfile.MAX_POINTS}'}), 400
+
+        journey = db.session.get(models.Journey, journeyId)
+        if not journey:
+            return jsonify({'status': 404, 'message': 'Journey not found'}), 404
+        if not GPSRoutes.can_view_journey(user, journey):
+            return jsonify({'status': 403, 'message': 'Forbidden: You do not have permission to access this journey'}), 403
+
+        etag = f'{journey.id}-{journey.version}-{journey.pointsHash}-profile-{points}'
+        not_modified = dataVersion.not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        key = (journey.id, journey.version, journey.pointsHash, points)
+        body = elevationProfile.cache.get(key)
+        if body is None:
+            data = elevationProfile.elevation_profile(journey.point_array, points)
+            data.update({'id': journey.id, 'points': points})
+            body = json.dumps({'status': 200, 'data': data})
+            elevationProfile.cache.put(key, body)
+
+        return dataVersion.with_etag(Response(body, mimetype='application/json'), etag), 200
+
+    @app.route("/export/journeys.zip", methods=["GET"])
+    @jwt_required()
+    def exportJourneys() -> Response:
+        """
+        Exports every journey of a user.
+
+        Parameters
+        ----------
+        None.
+
+        Returns
+        -------
+        Response
+            A ZIP archive with one GPX file per journey, named after its id and name, in id
+            order. The archive is streamed as it is built.
+
+        Notes
+        -----
+        Journeys are read EXPORT_BATCH_SIZE rows at a time with yield_per, each GPX file is
+        produced by generate_gpx a chunk of points at a time and compressed as it is written
+        (see zipStream.py), so memory use does not depend on the number of journeys or the
+        length of their tracks.
+
+        Exceptions
+        ----------
+        None.
+
+        """
+        current_user_email = get_jwt_identity()
+        user = models.User.query.filter_by(email=current_user_email).first()
+        if not user:
+            return jsonify({'status': 404, 'message': 'User not found'}), 404
 
-        return response, 200
\ No newline at end of file
+        creator = user.first_name
+        rows = db.session.execute(
+            db.select(models.Journey.id, models.Journey.name, models.Journey.type, models.Journey.dateCreated,
+                      models.Journey.points, models.Journey.times)
+            .where(models.Journey.userId == user.id).order_by(models.Journey.id)
+            .execution_options(yield_per=GPSRoutes.EXPORT_BATCH_SIZE))
+
+        def members():
+            for row in rows:
+                yield (f'{row.id}-{safe_filename(row.name)}.gpx', row.dateCreated,
+                       generate_gpx(row.name, row.type, creator, row.dateCreated.isoformat(), row.points,
+                                    times_blob=row.times))
+
+        response = Response(stream_with_context(stream_zip(members())), mimetype='application/zip')
+        response.headers['Content-Disposition'] = 'attachment; filename="journeys.zip"'
+        return response
@@ -0,0 +1,346 @@
+from app import (app, db, models, get_jwt_identity, jwt_required)
+from flask import request, jsonify
+from typing import Tuple
+from datetime import datetime
+import numpy as np
+from sqlalchemy.exc import IntegrityError
+from app.endpoints.gps.GPS import GPSRoutes
+from app.endpoints.gps import heatmap, dataVersion
+from app.endpoints.gps.pointCodec import encode_points, decode_points, encode_times, decode_times
+from app.endpoints.gps.pointValidation import validate_timed_point_array, validate_times
+
+class RecordingRoutes:
+    """
+    Class for recording a journey live, a chunk of points at a time.
+
+    Attributes
+    ----------
+    MAX_CHUNK_POINTS : int
+        Largest number of points accepted per append.
+
+    Methods
+    -------
+    get_recording(recordingId) -> tuple:
+        Loads a recording of the authenticated user.
+    recording_summary(recording) -> dict:
+        Serializes the progress of a recording.
+    next_seq(recording) -> int:
+        Returns the sequence number following the last chunk of a recording.
+    missing_seqs(recording) -> list:
+        Returns the sequence numbers of the chunks missing from a recording.
+    startRecording() -> json:
+        starts a recording for a user.
+    getRecording(recordingId) -> json:
+        returns the progress of a recording, e.g. to resume it.
+    appendRecording(recordingId) -> json:
+        appends a chunk of points to a recording.
+    finishRecording(recordingId) -> json:
+        turns a recording into a journey.
+    """
+
+    # Maximum number of points accepted by /recording/<id>/append
+    MAX_CHUNK_POINTS = 10000
+
+    def get_recording(recordingId):
+        """
+        Loads a recording of the authenticated user.
+
+        Parameters:
+        - recordingId (int): The recording to load.
+
+        Returns:
+        - (Recording, tuple): Tuple containing the recording (None if it cannot be used),
+                    and the error response to return otherwise.
+        """
+        current_user_email = get_jwt_identity()
+        user = models.User.query.filter_by(email=current_user_email).first()
+        if not user:
+            return None, (jsonify({'status': 404, 'message': 'User not found'}), 404)
+
+        recording = db.session.get(models.Recording, recordingId)
+        if not recording:
+            return None, (jsonify({'status': 404, 'message': 'Recording not found'}), 404)
+        if recording.userId != user.id:
+            return None, (jsonify({'status': 403, 'message': 'Forbidden: You do not have permission to access this recording'}), 403)
+
+        return recording, None
+
+    def recording_summary(recording) -> dict:
+        """
+        Serializes the progress of a recording.
+
+        Parameters:
+        - recording (Recording): The recording.
+
+        Returns:
+        - dict: The id, name, type, start, number of points and the sequence number of the
+                    last chunk received (None before the first chunk).
+        """
+        last_seq = db.session.query(db.func.max(models.RecordingChunk.seq)).filter(
+            models.RecordingChunk.recordingId == recording.id).scalar()
+        return {
+            'id': recording.id,
+            'name': recording.name,
+            'type': recording.type,
+            'startedAt': recording.startedAt.strftime('%Y-%m-%d %H:%M:%S'),
+            'pointCount': recording.pointCount,
+            'lastSeq': last_seq,
+        }
+
+    def next_seq(recording) -> int:
+        """
+        Returns the sequence number following the last chunk of a recording.
+
+        Parameters:
+        - recording (Recording): The recording.
+
+        Returns:
+        - int: One more than the last seq, or 0 for a recording without chunks.
+        """
+        last_seq = db.session.query(db.func.max(models.RecordingChunk.seq)).filter(
+            models.RecordingChunk.recordingId == recording.id).scalar()
+        return 0 if last_seq is None else last_seq + 1
+
+    def missing_seqs(recording) -> list:
+        """
+        Returns the sequence numbers of the chunks missing from a recording.
+
+        Parameters:
+        - recording (Recording): The recording.
+
+        Returns:
+        - list: The seqs between 0 and the last chunk that were never received, in order.
+        """
+        received = {chunk.seq for chunk in recording.chunks}
+        return [seq for seq in range(max(received, default=-1) + 1) if seq not in received]
+
+    @app.route("/recording/start", methods=["POST"])
+    @jwt_required()
+    def startRecording() -> Tuple[dict, int]:
+        """
+        Starts recording a journey.
+
+        Parameters
+        ----------
+        name : str
+            JSON body field, the name of the journey.
+        type : str
+            JSON body field, Run, Walk or Cycle.
+
+        Returns
+        -------
+        Json
+            A JSON object with the id of the new recording.
+
+        Notes
+        -----
+        The start of the recording becomes the start time and date of the journey.
+
+        Exceptions
+        ----------
+        None.
+
+        """
+        current_user_email = get_jwt_identity()
+        user = models.User.query.filter_by(email=current_user_email).first()
+        if not user:
+            return jsonify({'status': 404, 'message': 'User not found'}), 404
+
+        data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({'status': 400, 'message': 'No data provided'}), 400
+        for field in ('name', 'type'):
+            if field not in data:
+                return jsonify({'status': 400, 'message': f'Missing field: {field}'}), 400
+        if data['type'] not in ['Run', 'Walk', 'Cycle']:
+            return jsonify({'status': 400, 'message': 'Invalid journey type. Must be Run, Walk, or Cycle'}), 400
+
+        recording = models.Recording(userId=user.id, name=data['name'], type=data['type'],
+                                     startedAt=datetime.now(), pointCount=0)
+        db.session.add(recording)
+        db.session.commit()
+
+        return jsonify({'status': 201, 'message': 'Recording started', 'id': recording.id}), 201
+
+    @app.route("/recording/<int:recordingId>", methods=["GET"])
+    @jwt_required()
+    def getRecording(recordingId) -> Tuple[dict, int]:
+        """
+        Returns the progress of a recording.
+
+        Parameters
+        ----------
+        recordingId : int
+            The recording.
+
+        Returns
+        -------
+        Json
+            A JSON object with the recording, its number of points and the sequence number
+            of the last chunk received, so a client can resume after losing its state.
+
+        Notes
+        -----
+        None.
+
+        Exceptions
+        ----------
+        None.
+
+        """
+        recording, error_response = RecordingRoutes.get_recording(recordingId)
+        if error_response:
+            return error_response
+
+        return jsonify({'status': 200, 'data': RecordingRoutes.recording_summary(recording)}), 200
+
+    @app.route("/recording/<int:recordingId>/append", methods=["POST"])
+    @jwt_required()
+    def appendRecording(recordingId) -> Tuple[dict, int]:
+        """
+        Appends a chunk of points to a recording.
+
+        Parameters
+        ----------
+        recordingId : int
+            The recording.
+        points : list
+            JSON body field, the new points, in the same format as /create_journey,
+            optionally with a time on every point.
+        seq : int, optional
+            JSON body field, the sequence number of the chunk. A chunk that was already
+            received is not stored again, so failed uploads can be retried safely.
+            Defaults to one more than the last chunk.
+
+        Returns
+        -------
+        Json
+            A JSON object with the number of points in the recording so far.
+
+        Notes
+        -----
+        The chunk is stored as its own row, so the cost of an append depends only on the
+        size of the chunk, not on the length of the recording. Chunks received twice are
+        detected by the unique (recordingId, seq) index, so concurrent retries are safe too;
+        appends without a seq that race each other get a 409 and should be retried with one.
+
+        Exceptions
+        ----------
+        None.
+
+        """
+        recording, error_response = RecordingRoutes.get_recording(recordingId)
+        if error_response:
+            return error_response
+
+        data = request.get_json()
+        if not isinstance(data, dict) or 'points' not in data:
+            return jsonify({'status': 400, 'message': 'Missing field: points'}), 400
+
+        points, times, error_message = validate_timed_point_array(data['points'])
+        if points is None:
+            return jsonify({'status': 400, 'message': f'Invalid points data: {error_message}'}), 400
+        if len(points) > RecordingRoutes.MAX_CHUNK_POINTS:
+            return jsonify({'status': 400, 'message': f'Too many points. At most {RecordingRoutes.MAX_CHUNK_POINTS} per chunk'}), 400
+
+        seq = data.get('seq')
+        if seq is None:
+            seq = RecordingRoutes.next_seq(recording)
+        elif type(seq) is not int or seq < 0:
+            return jsonify({'status': 400, 'message': 'Invalid seq. Must be a non-negative integer'}), 400
+
+        db.session.add(models.RecordingChunk(recordingId=recording.id, seq=seq, points=encode_points(points),
+                                             times=encode_times(times) if times is not None else None))
+        recording.pointCount = models.Recording.pointCount + len(points)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # The unique (recordingId, seq) index rejects a chunk that is already stored,
+            # including when retries of the same chunk arrive at the same time
+            db.session.rollback()
+            if data.get('seq') is None:
+                return jsonify({'status': 409, 'message': 'Another chunk was appended at the same time. Retry with a seq'}), 409
+            return jsonify({'status': 200, 'message': 'Chunk already received',
+                            'seq': seq, 'pointCount': recording.pointCount}), 200
+
+        return jsonify({'status': 200, 'message': 'Points appended',
+                        'seq': seq, 'pointCount': recording.pointCount}), 200
+
+    @app.route("/recording/<int:recordingId>/finish", methods=["POST"])
+    @jwt_required()
+    def finishRecording(recordingId) -> Tuple[dict, int]:
+        """
+        Turns a recording into a journey.
+
+        Parameters
+        ----------
+        recordingId : int
+            The recording.
+        endTime : str, optional
+            JSON body field, HH:MM:SS. Defaults to now.
+        totalDistance : float, optional
+            JSON body field. Defaults to the distance computed from the points.
+
+        Returns
+        -------
+        Json
+            A JSON object with the id of the new journey.
+
+        Notes
+        -----
+        The chunks are joined in seq order and go through the same processing as
+        /create_journey (summary fields, LOD levels, bounding box and heatmap). Their seqs
+        must run from 0 without gaps; otherwise a 409 lists the missing ones, which can still
+        be appended. The timestamps are kept if every chunk had them and they never go back
+        in time. The recording is deleted once the journey is created.
+
+        Exceptions
+        ----------
+        None.
+
+        """
+        recording, error_response = RecordingRoutes.get_recording(recordingId)
+        if error_response:
+            return error_response
+
+        data = request.get_json(silent=True) or {}
+        try:
+            endTime = datetime.strptime(data['endTime'], '%H:%M:%S').time() if 'endTime' in data else datetime.now().time()
+        except (TypeError, ValueError):
+            return jsonify({'status': 400, 'message': 'Invalid date/time format'}), 400
+
+        if not recording.chunks:
+            return jsonify({'status': 400, 'message': 'No points recorded'}), 400
+        # A lost chunk would otherwise become a straight line in the journey
+        missing = RecordingRoutes.missing_seqs(recording)
+        if missing:
+            return jsonify({'status': 409, 'message': f'Missing chunks: {", ".join(map(str, missing))}',
+                            'missing': missing}), 409
+        points = np.concatenate([decode_points(chunk.points) for chunk in recording.chunks])
+        # The journey only keeps timestamps if every chunk had them, in order
+        times = None
+        if all(chunk.times for chunk in recording.chunks):
+            times = np.concatenate([decode_times(chunk.times) for chunk in recording.chunks])
+            times = validate_times(times / 1000.0)[0]
+
+        journey = models.Journey(
+            userId=recording.userId,
+            name=recording.name,
+            type=recording.type,
+            totalDistance=data.get('totalDistance'),
+            startTime=recording.startedAt.time(),
+            endTime=endTime,
+            dateCreated=recording.startedAt
+        )
+        GPSRoutes.store_points(journey, points, times)
+        heatmap.apply_track(db.session, recording.userId, journey.point_array, 1)
+        if journey.totalDistance is None:
+            journey.totalDistance = journey.computedDistance
+
+        db.session.add(journey)
+        db.session.delete(recording)
+        dataVersion.bump(recording.userId)
+        db.session.commit()
+
+        return jsonify({'status': 201, 'message': 'Journey created successfully',
+                        'id': journey.id, 'points': len(points)}), 201
@@ -0,0 +1,203 @@
+from app import (app, db, models, get_jwt_identity, jwt_required)
+from flask import request, jsonify
+from typing import Tuple
+from app.endpoints.gps import segmentMatching
+from app.endpoints.gps.pointCodec import encode_points, points_to_dicts
+from app.endpoints.gps.pointValidation import validate_point_array
+from app.endpoints.gps.spatialIndex import bounding_box
+from app.endpoints.gps.trackProcessing import segment_distances
+
+class SegmentRoutes:
+    """
+    Class for segments, stretches of path that journeys are matched against.
+
+    Methods
+    -------
+    effort_data(effort, journey) -> dict:
+        Serializes an effort on a segment.
+    createSegment() -> json:
+        creates a segment and matches the existing journeys against it.
+    getSegment(segmentId) -> json:
+        returns a segment and the efforts of the user on it.
+    getJourneyEfforts(journeyId) -> json:
+        returns the segment efforts of a journey.
+    """
+
+    def effort_data(effort, journey) -> dict:
+        """
+        Serializes an effort on a segment.
+
+        Parameters:
+        - effort (SegmentEffort): The effort.
+        - journey (Journey): The journey the effort is part of.
+
+        Returns:
+        - dict: The effort with the segment, the journey and its date.
+        """
+        return {
+            'id': effort.id,
+            'segmentId': effort.segmentId,
+            'journeyId': effort.journeyId,
+            'journeyName': journey.name,
+            'dateCreated': journey.dateCreated.strftime('%d-%m-%Y') if journey.dateCreated else None,
+            'startIndex': effort.startIndex,
+            'endIndex': effort.endIndex,
+            'distance': effort.distance,
+        }
+
+    @app.route("/segments", methods=["POST"])
+    @jwt_required()
+    def createSegment() -> Tuple[dict, int]:
+        """
+        Creates a segment.
+
+        Parameters
+        ----------
+        name : str
+            JSON body field, the name of the segment.
+        points : list
+            JSON body field, the path of the segment, in the same format as /create_journey.
+
+        Returns
+        -------
+        Json
+            A JSON object with the id of the new segment and the number of efforts of the user
+            found on it.
+
+        Notes
+        -----
+        The journeys of every user are matched against the new segment before it is
+        returned; only journeys whose bounding box is near the segment are read. Journeys
+        created later are matched when they are stored. Only the user's own efforts are
+        counted in the response, as other users' journeys may be private.
+
+        Exceptions
+        ----------
+        None.
+
+        """
+        current_user_email = get_jwt_identity()
+        user = models.User.query.filter_by(email=current_user_email).first()
+        if not user:
+            return jsonify({'status': 404, 'message': 'User not found'}), 404
+
+        data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({'status': 400, 'message': 'No data provided'}), 400
+        for field in ('name', 'points'):
+            if field not in data:
+                return jsonify({'status': 400, 'message': f'Missing field: {field}'}), 400
+
+        points, error_message = validate_point_array(data['points'])
+        if points is None:
+            return jsonify({'status': 400, 'message': f'Invalid points data: {error_message}'}), 400
+        if len(points) < 2:
+            return jsonify({'status': 400, 'message': 'A segment needs at least 2 points'}), 400
+        distance = float(segment_distances(points).sum())
+        if distance < segmentMatching.MIN_SEGMENT_LENGTH_M:
+            return jsonify({'status': 400, 'message': f'Segment too short. Must be at least {segmentMatching.MIN_SEGMENT_LENGTH_M:g} metres'}), 400
+
+        segment = models.Segment(creatorId=user.id, name=data['name'], points=encode_points(points),
+                                 distance=distance)
+        segment.minLat, segment.maxLat, segment.minLon, segment.maxLon = bounding_box(points)
+        db.session.add(segment)
+        db.session.flush()
+
+        efforts = segmentMatching.backfill_segment(db.session, segment)[user.id]
+        db.session.commit()
+
+        return jsonify({'status': 201, 'message': 'Segment created successfully',
+                        'id': segment.id, 'efforts': efforts}), 201
+
+    @app.route("/segments/<int:segmentId>", methods=["GET"])
+    @jwt_required()
+    def getSegment(segmentId) -> Tuple[dict, int]:
+        """
+        Returns a segment and the efforts of the user on it.
+
+        Parameters
+        ----------
+        segmentId : int
+            The segment.
+
+        Returns
+        -------
+        Json
+            A JSON object with the segment, its path, and the efforts of the user on it from
+            the shortest distance to the longest.
+
+        Notes
+        -----
+        None.
+
+        Exceptions
+        ----------
+        None.
+
+        """
+        current_user_email = get_jwt_identity()
+        user = models.User.query.filter_by(email=current_user_email).first()
+        if not user:
+            return jsonify({'status': 404, 'message': 'User not found'}), 404
+
+        segment = db.session.get(models.Segment, segmentId)
+        if not segment:
+            return jsonify({'status': 404, 'message': 'Segment not found'}), 404
+
+        rows = db.session.query(models.SegmentEffort, models.Journey).join(
+            models.Journey, models.SegmentEffort.journeyId == models.Journey.id).filter(
+            models.SegmentEffort.segmentId == segment.id, models.Journey.userId == user.id).order_by(
+            models.SegmentEffort.distance, models.SegmentEffort.id).all()
+
+        return jsonify({'status': 200, 'data': {
+            'id': segment.id,
+            'name': segment.name,
+            'creatorId': segment.creatorId,
+            'distance': segment.distance,
+            'bbox': [segment.minLon, segment.minLat, segment.maxLon, segment.maxLat],
+            'points': points_to_dicts(segment.point_array),
+            'efforts': [SegmentRoutes.effort_data(effort, journey) for effort, journey in rows],
+        }}), 200
+
+    @app.route("/journey/<int:journeyId>/efforts", methods=["GET"])
+    @jwt_required()
+    def getJourneyEfforts(journeyId) -> Tuple[dict, int]:
+        """
+        Returns the segment efforts of a journey.
+
+        Parameters
+        ----------
+        journeyId : int
+            The journey.
+
+        Returns
+        -------
+        Json
+            A JSON object with the efforts of the journey in the order they were made,
+            each with the name of its segment.
+
+        Notes
+        -----
+        None.
+
+        Exceptions
+        ----------
+        None.
+
+        """
+        current_user_email = get_jwt_identity()
+        user = models.User.query.filter_by(email=current_user_email).first()
+        if not user:
+            return jsonify({'status': 404, 'message': 'User not found'}), 404
+
+        journey = db.session.get(models.Journey, journeyId)
+        if not journey:
+            return jsonify({'status': 404, 'message': 'Journey not found'}), 404
+        if journey.userId != user.id:
+            return jsonify({'status': 403, 'message': 'Forbidden: You do not have permission to access this journey'}), 403
+
+        efforts = sorted(journey.efforts, key=lambda effort: (effort.startIndex, effort.id))
+        return jsonify({'status': 200, 'data': [
+            dict(SegmentRoutes.effort_data(effort, journey), segmentName=effort.segment.name)
+            for effort in efforts
+        ]}), 200
@@ -0,0 +1,126 @@
+from datetime import date
+import cbor2
+import msgpack
+import numpy as np
+from flask import request, jsonify, Response
+from werkzeug.http import http_date
+from app.endpoints.gps import dataVersion
+
+"""
+Content Negotiation Description:
+
+Endpoints that return many journeys can also answer in MessagePack or CBOR, picked from the
+Accept header of the request; JSON stays the default, including for clients that send no
+Accept header or only accept other types. Error responses are always JSON.
+
+In the binary formats the points of a journey are one typed array of little-endian float64
+values, lat, lon, ele for every point in turn, instead of a list of objects, which is much
+smaller and can be read on the client without parsing numbers:
+
+    - CBOR: a byte string with the RFC 8746 tag 86 (float64, little-endian typed array).
+    - MessagePack: a bin value, as the format has no typed arrays.
+
+The encoding itself is done by the msgpack and cbor2 packages. Dates are sent as the same
+HTTP date strings as in JSON. Integers too large for MessagePack (outside -2^63 to 2^64 - 1)
+make the request fail with 406 Not Acceptable, while CBOR sends them as bignums. The ETag of a
+response names its format, so caches never serve one format for another.
+"""
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+CBOR = 'application/cbor'
+
+# Media types that may be asked for, in order of preference on ties; the legacy MessagePack
+# type is answered with the registered one
+MEDIA_TYPES = (JSON, MSGPACK, 'application/x-msgpack', CBOR)
+
+# RFC 8746 tag of a little-endian float64 typed array
+CBOR_FLOAT64_LE_TAG = 86
+
+
+def negotiate() -> str:
+    """Returns the media type the current request should be answered with."""
+    media_type = request.accept_mimetypes.best_match(MEDIA_TYPES, default=JSON)
+    return MSGPACK if media_type == 'application/x-msgpack' else media_type
+
+
+def is_binary(media_type: str) -> bool:
+    """True for the formats that carry points as typed arrays."""
+    return media_type != JSON
+
+
+def variant_etag(etag: str, media_type: str) -> str:
+    """The ETag of a response in a given format."""
+    return etag if media_type == JSON else f'{etag}-{media_type.rsplit("/", 1)[1]}'
+
+
+def make_response(payload, media_type: str, etag: str = None):
+    """
+    Serializes a response payload.
+
+    Parameters
+    ----------
+    payload : dict
+        The response body. Point arrays (np.ndarray) are only allowed in the binary formats.
+    media_type : str
+        The negotiated media type.
+    etag : str
+        The ETag of the response (see variant_etag), or None.
+
+    Returns
+    -------
+    (Response, int)
+        The response, which varies on the Accept header, and its status: 200, or 406 when the
+        payload cannot be represented in the format.
+    """
+    try:
+        if media_type == MSGPACK:
+            response = Response(pack_msgpack(payload), mimetype=MSGPACK)
+        elif media_type == CBOR:
+            response = Response(pack_cbor(payload), mimetype=CBOR)
+        else:
+            response = jsonify(payload)
+    except OverflowError:
+        response = jsonify({'status': 406, 'message': f'The response cannot be encoded as {media_type}, request JSON instead'})
+        response.vary.add('Accept')
+        return response, 406
+    response.vary.add('Accept')
+    return (dataVersion.with_etag(response, etag) if etag else response), 200
+
+
+def _float64_le(array: np.ndarray) -> bytes:
+    return np.ascontiguousarray(array, dtype='<f8').tobytes()
+
+
+def _plain(value):
+    """Copies a payload with its dates as HTTP date strings and NumPy scalars as Python values."""
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if isinstance(value, date):
+        return http_date(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def pack_msgpack(value) -> bytes:
+    """Encodes a value in MessagePack; raises OverflowError for integers out of its range."""
+    def typed_array(item):
+        if isinstance(item, np.ndarray):
+            return _float64_le(item)
+        # Integers the format cannot hold are handed back here
+        if isinstance(item, int):
+            raise OverflowError(f'Integer {item} out of range for MessagePack')
+        raise TypeError(f'Cannot encode {type(item).__name__} in MessagePack')
+    return msgpack.packb(_plain(value), default=typed_array, use_bin_type=True)
+
+
+def pack_cbor(value) -> bytes:
+    """Encodes a value in CBOR."""
+    def typed_array(encoder, item):
+        if not isinstance(item, np.ndarray):
+            raise TypeError(f'Cannot encode {type(item).__name__} in CBOR')
+        encoder.encode(cbor2.CBORTag(CBOR_FLOAT64_LE_TAG, _float64_le(item)))
+    return cbor2.dumps(_plain(value), default=typed_array)
@@ -0,0 +1,76 @@
+import hashlib
+from flask import request, Response
+from app import models
+
+"""
+Data Version Description:
+
+Every user has a dataVersion counter that is incremented in the same transaction as any
+write to their journeys. Responses that only depend on a user's journeys carry a strong
+ETag derived from that counter, the user, the path and the query string, so a client that
+sends the ETag back in If-None-Match gets a 304 without the journeys being loaded.
+
+The counter is bumped by the write endpoints themselves, next to the commit, with a single
+UPDATE statement.
+"""
+
+
+def bump(userId) -> None:
+    """
+    Increments the data version of a user. The change is not committed.
+
+    Parameters
+    ----------
+    userId : int
+        The user whose journeys changed.
+    """
+    models.User.query.filter_by(id=userId).update(
+        {models.User.dataVersion: models.User.dataVersion + 1}, synchronize_session=False)
+
+
+def current_etag(user) -> str:
+    """
+    Builds the strong ETag of the current request for a user's data.
+
+    Parameters
+    ----------
+    user : User
+        The user whose data the response is built from.
+
+    Returns
+    -------
+    str
+        The unquoted ETag value.
+    """
+    variant = request.path + '?' + '&'.join(sorted(f'{key}={value}' for key, value in request.args.items(multi=True)))
+    digest = hashlib.sha1(variant.encode('utf-8')).hexdigest()[:16]
+    return f'{user.id}-{user.dataVersion or 0}-{digest}'
+
+
+def not_modified(etag):
+    """
+    Answers a conditional GET whose If-None-Match matches the ETag.
+
+    Parameters
+    ----------
+    etag : str
+        The ETag of the response that would be sent.
+
+    Returns
+    -------
+    tuple or None
+        A 304 response, or None when the full response has to be built.
+    """
+    if request.if_none_match and request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response, 304
+    return None
+
+
+def with_etag(response, etag):
+    """Adds the ETag and revalidation headers to a response and returns it."""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
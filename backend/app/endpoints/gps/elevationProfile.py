@@ -0,0 +1,107 @@
+import numpy as np
+from app.endpoints.gps.trackProcessing import cumulative_distances
+from app.endpoints.gps.lruCache import LRUCache
+
+"""
+Elevation Profile Description:
+
+The elevation against distance chart of a journey, reduced to a fixed number of points with
+Largest-Triangle-Three-Buckets (LTTB) downsampling. The first and last points are kept and the
+points in between are split into equal buckets; from every bucket LTTB keeps the point that
+forms the largest triangle with the point kept from the previous bucket and the average of the
+next bucket, so climbs, summits and dips survive where plain decimation would skip them.
+
+The areas of all points of a bucket are computed at once with NumPy; only the walk over the
+buckets is a Python loop, as every choice depends on the previous one.
+
+Serialized responses are kept in an in-process LRU cache (see lruCache.py) keyed by journey
+id, journey version, points hash and number of points.
+"""
+
+DEFAULT_POINTS = 500
+MIN_POINTS = 3
+MAX_POINTS = 5000
+
+# Number of responses kept in memory
+CACHE_SIZE = 256
+
+# Decimals kept in the output (1 cm of distance, 1 mm of elevation)
+DISTANCE_DECIMALS = 2
+ELE_DECIMALS = 3
+
+cache = LRUCache(CACHE_SIZE)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Picks the points of a series to keep with Largest-Triangle-Three-Buckets.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        The increasing x values of the series.
+    y : np.ndarray
+        The y values of the series.
+    threshold : int
+        The number of points to keep, at least MIN_POINTS.
+
+    Returns
+    -------
+    np.ndarray
+        The increasing indices of the kept points, every point when the series is not longer
+        than the threshold.
+    """
+    count = len(x)
+    if count <= threshold:
+        return np.arange(count)
+
+    # Bucket i holds the points edges[i] to edges[i + 1] - 1
+    buckets = threshold - 2
+    edges = (np.arange(buckets + 1) * ((count - 2) / buckets)).astype(np.int64) + 1
+    edges[-1] = count - 1
+    sizes = np.diff(edges)
+
+    # The third corner of the triangles of a bucket is the average of the next bucket, or
+    # the last point for the last bucket
+    next_x = np.append((np.add.reduceat(x[1:-1], edges[:-1] - 1) / sizes)[1:], x[-1])
+    next_y = np.append((np.add.reduceat(y[1:-1], edges[:-1] - 1) / sizes)[1:], y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, count - 1
+    previous = 0
+    for bucket in range(buckets):
+        start, stop = edges[bucket], edges[bucket + 1]
+        ax, ay, cx, cy = x[previous], y[previous], next_x[bucket], next_y[bucket]
+        # Twice the triangle areas, as a linear function of the bucket's points
+        areas = np.abs(y[start:stop] * (ax - cx) + x[start:stop] * (cy - ay) + (cx * ay - ax * cy))
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def elevation_profile(array: np.ndarray, points: int) -> dict:
+    """
+    Builds the downsampled elevation profile of a track.
+
+    Parameters
+    ----------
+    array : np.ndarray
+        The (n, 3) lat, lon, ele points.
+    points : int
+        The largest number of points of the profile.
+
+    Returns
+    -------
+    dict
+        Parallel lists of distance along the track (metres) and elevation, plus the total
+        distance and the number of points of the track.
+    """
+    distances = cumulative_distances(array)
+    elevations = array[:, 2]
+    keep = lttb(distances, elevations, points)
+    return {
+        'distance': np.round(distances[keep], DISTANCE_DECIMALS).tolist(),
+        'ele': np.round(elevations[keep], ELE_DECIMALS).tolist(),
+        'totalDistance': round(float(distances[-1]), DISTANCE_DECIMALS) if len(distances) else 0.0,
+        'trackPoints': len(array),
+    }
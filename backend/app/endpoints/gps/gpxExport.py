@@ -0,0 +1,64 @@
+from xml.sax.saxutils import escape, quoteattr
+import numpy as np
+from app.endpoints.gps.pointCodec import decode_points, decode_times, point_count
+
+"""
+GPX Export Description:
+
+Streams a journey as a GPX 1.1 document. The packed track is decoded CHUNK_SIZE points at a
+time and every chunk is written as one string of <trkpt> elements, so memory use does not
+grow with the length of the track and the first bytes can be sent before the rest of the
+track has been decoded. Tracks with per-point timestamps get a <time> in every <trkpt>.
+"""
+
+CHUNK_SIZE = 2000
+
+GPX_NAMESPACE = 'http://www.topografix.com/GPX/1/1'
+
+
+def generate_gpx(name, journey_type, creator, time, blob, chunk_size=CHUNK_SIZE, times_blob=None):
+    """
+    Yields a GPX document for a journey piece by piece.
+
+    Parameters
+    ----------
+    name : str
+        The journey name, used for the metadata and the track.
+    journey_type : str
+        The journey type (Run, Walk or Cycle).
+    creator : str
+        The creator attribute of the document.
+    time : str
+        ISO formatted metadata time.
+    blob : bytes
+        The stored points of the journey.
+    chunk_size : int
+        Number of points decoded and written per chunk.
+    times_blob : bytes, optional
+        The stored per-point timestamps of the journey, if any.
+
+    Yields
+    ------
+    str
+        Consecutive parts of the GPX document.
+    """
+    yield (
+        f'<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<gpx version="1.1" creator={quoteattr(creator or "")} xmlns="{GPX_NAMESPACE}">'
+        f'<metadata><name>{escape(name)}</name><time>{escape(time)}</time></metadata>'
+        f'<trk><name>{escape(name)}</name><type>{escape(journey_type)}</type><trkseg>'
+    )
+
+    total = point_count(blob)
+    times = decode_times(times_blob)
+    for start in range(0, total, chunk_size):
+        points = decode_points(blob, start, start + chunk_size)
+        if times is None:
+            yield ''.join([f'<trkpt lat="{lat}" lon="{lon}"><ele>{ele}</ele></trkpt>'
+                           for lat, lon, ele in points.tolist()])
+        else:
+            stamps = np.datetime_as_string(times[start:start + chunk_size].astype('datetime64[ms]'), unit='ms')
+            yield ''.join([f'<trkpt lat="{lat}" lon="{lon}"><ele>{ele}</ele><time>{stamp}Z</time></trkpt>'
+                           for (lat, lon, ele), stamp in zip(points.tolist(), stamps.tolist())])
+
+    yield '</trkseg></trk></gpx>'
@@ -0,0 +1,172 @@
+import numpy as np
+from sqlalchemy import tuple_
+from app import models
+from app.endpoints.gps.trackProcessing import segment_distances
+from app.endpoints.gps import webMercator
+
+"""
+Heatmap Description:
+
+Every user has a personal heatmap of where they have been, stored as count grids on the
+standard XYZ tile scheme (see webMercator.py). A tile is split into GRID_SIZE x GRID_SIZE
+cells and each cell counts the journeys that pass through it, so a journey adds 1 to every
+cell it touches however many times it crosses it. Tracks only touch a few cells of most
+tiles, so a tile stores (cell, count) pairs for its nonzero cells (CELL_DTYPE, 6 bytes each)
+rather than the whole grid.
+
+The tiles are maintained incrementally: a journey is rasterized at every zoom level when it is
+created, subtracted again before its points change or it is deleted, and only the tiles it
+touches are read and written. Serving a tile is a single indexed row lookup, independent of
+the number of journeys.
+
+Consecutive points closer than MAX_GAP_M are joined by a line; larger gaps (e.g. a paused
+recording), and steps across the antimeridian, which would otherwise be drawn the long way
+round the world, only mark the points on both sides.
+"""
+
+GRID_SIZE = 64
+MIN_ZOOM = 0
+MAX_ZOOM = 16
+MAX_GAP_M = 500.0
+
+# A stored cell: its flat index (row * GRID_SIZE + column) and its journey count
+CELL_DTYPE = np.dtype([('cell', '<u2'), ('count', '<i4')])
+
+
+def tile_cells(array: np.ndarray, zoom: int) -> dict:
+    """
+    Rasterizes a track at one zoom level.
+
+    Parameters
+    ----------
+    array : np.ndarray
+        An (n, 3) array of lat, lon, ele.
+    zoom : int
+        The tile zoom level.
+
+    Returns
+    -------
+    dict
+        Maps the (x, y) of every tile the track touches to the unique flat indices
+        (row * GRID_SIZE + column) of the cells it touches in that tile.
+    """
+    if len(array) == 0:
+        return {}
+
+    world = GRID_SIZE << zoom
+    px, py = webMercator.project(array, world)
+
+    # Sample every joined segment at least once per cell it crosses
+    steps = np.ceil(np.maximum(np.abs(np.diff(px)), np.abs(np.diff(py)))).astype(np.int64)
+    steps[segment_distances(array) > MAX_GAP_M] = 1
+    steps[np.abs(np.diff(array[:, 1])) > 180] = 1
+    steps = np.maximum(steps, 1)
+    segment = np.repeat(np.arange(len(steps)), steps)
+    t = np.arange(len(segment)) - np.repeat(np.cumsum(steps) - steps, steps)
+    t = t / steps[segment]
+    px = np.append(px[segment] + (px[segment + 1] - px[segment]) * t, px[-1])
+    py = np.append(py[segment] + (py[segment + 1] - py[segment]) * t, py[-1])
+
+    gx = np.clip(px.astype(np.int64), 0, world - 1)
+    gy = np.clip(py.astype(np.int64), 0, world - 1)
+    cells = np.unique(gy * world + gx)
+    gx, gy = cells % world, cells // world
+
+    tiles = (gy // GRID_SIZE) * (1 << zoom) + gx // GRID_SIZE
+    flat = (gy % GRID_SIZE) * GRID_SIZE + gx % GRID_SIZE
+    order = np.argsort(tiles, kind='stable')
+    tiles, flat = tiles[order], flat[order]
+    keys, starts = np.unique(tiles, return_index=True)
+    return {(int(key % (1 << zoom)), int(key >> zoom)): group
+            for key, group in zip(keys, np.split(flat, starts[1:]))}
+
+
+def apply_track(session, userId, array: np.ndarray, sign: int, batch_size=300) -> None:
+    """
+    Adds (sign=1) or subtracts (sign=-1) a track to or from a user's heatmap tiles.
+
+    Parameters
+    ----------
+    session : Session
+        The database session. The changes are not committed.
+    userId : int
+        The owner of the track.
+    array : np.ndarray
+        An (n, 3) array of lat, lon, ele.
+    sign : int
+        1 when the track is added, -1 when it is removed.
+    batch_size : int
+        Number of tiles loaded per query.
+    """
+    changes = {(zoom, x, y): cells
+               for zoom in range(MIN_ZOOM, MAX_ZOOM + 1)
+               for (x, y), cells in tile_cells(array, zoom).items()}
+    if not changes:
+        return
+
+    keys = list(changes)
+    existing = {}
+    for start in range(0, len(keys), batch_size):
+        position = tuple_(models.HeatmapTile.zoom, models.HeatmapTile.x, models.HeatmapTile.y)
+        tiles = models.HeatmapTile.query.filter(
+            models.HeatmapTile.userId == userId,
+            position.in_(keys[start:start + batch_size])).all()
+        existing.update({(tile.zoom, tile.x, tile.y): tile for tile in tiles})
+
+    for key, cells in changes.items():
+        tile = existing.get(key)
+        if tile is None:
+            if sign < 0:
+                continue
+            tile = models.HeatmapTile(userId=userId, zoom=key[0], x=key[1], y=key[2])
+            session.add(tile)
+            counts = np.zeros(GRID_SIZE * GRID_SIZE, dtype=np.int32)
+        else:
+            counts = unpack_counts(tile.counts)
+
+        counts[cells] += sign
+        np.maximum(counts, 0, out=counts)
+        if counts.any():
+            tile.counts = pack_counts(counts)
+        else:
+            session.delete(tile)
+
+
+def pack_counts(counts: np.ndarray) -> bytes:
+    """Encodes the nonzero cells of a flat count grid as (cell, count) pairs."""
+    cells = np.flatnonzero(counts)
+    pairs = np.empty(len(cells), dtype=CELL_DTYPE)
+    pairs['cell'] = cells
+    pairs['count'] = counts[cells]
+    return pairs.tobytes()
+
+
+def unpack_counts(blob: bytes) -> np.ndarray:
+    """Decodes stored (cell, count) pairs into a writable flat count grid."""
+    pairs = np.frombuffer(blob, dtype=CELL_DTYPE)
+    counts = np.zeros(GRID_SIZE * GRID_SIZE, dtype=np.int32)
+    counts[pairs['cell']] = pairs['count']
+    return counts
+
+
+def tile_counts(tile) -> np.ndarray:
+    """The (GRID_SIZE, GRID_SIZE) count grid of a stored tile, or zeros when there is none."""
+    if tile is None:
+        return np.zeros((GRID_SIZE, GRID_SIZE), dtype=np.int32)
+    return unpack_counts(tile.counts).reshape(GRID_SIZE, GRID_SIZE)
+
+
+def rebuild_user(session, userId) -> int:
+    """
+    Recomputes a user's heatmap from all of their journeys, e.g. after a migration.
+
+    Returns
+    -------
+    int
+        The number of journeys rasterized.
+    """
+    models.HeatmapTile.query.filter_by(userId=userId).delete()
+    journeys = models.Journey.query.filter_by(userId=userId).order_by(models.Journey.id).all()
+    for journey in journeys:
+        apply_track(session, userId, journey.point_array, 1)
+    return len(journeys)
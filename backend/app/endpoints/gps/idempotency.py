@@ -0,0 +1,124 @@
+import hashlib
+from datetime import datetime, timedelta
+from flask import request, jsonify, Response, json
+from sqlalchemy.exc import IntegrityError
+from app import db, models
+
+"""
+Idempotency Description:
+
+Clients on flaky networks retry uploads whose response they never received. A request that
+carries an Idempotency-Key header is answered once: its response is stored in the
+idempotency_key table in the same transaction as the data it created, and a retry with the
+same key gets that response again, marked with an Idempotent-Replayed header, without the body
+being validated or anything being written.
+
+Keys are scoped to the user and kept for KEY_TTL. Reusing a key with a different request body
+is answered with 422. When a retry arrives while the first request is still being processed,
+the unique index on (userId, key) makes the second commit fail; it is rolled back and answered
+with the response of the first.
+"""
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+KEY_TTL = timedelta(hours=24)
+
+
+def request_key():
+    """
+    Reads the Idempotency-Key header of the current request.
+
+    Returns
+    -------
+    (str, str)
+        Tuple containing the key (None when the header is absent or invalid), and an error
+        message if it is invalid.
+    """
+    key = request.headers.get(HEADER)
+    if key is None:
+        return None, ""
+    if not 0 < len(key) <= MAX_KEY_LENGTH:
+        return None, f"Invalid {HEADER}. Must be 1 to {MAX_KEY_LENGTH} characters"
+    return key, ""
+
+
+def request_hash() -> str:
+    """The SHA-256 of the raw body of the current request."""
+    return hashlib.sha256(request.get_data()).hexdigest()
+
+
+def replay(userId: int, key: str, body_hash: str):
+    """
+    Answers a retried request from the stored response.
+
+    Parameters
+    ----------
+    userId : int
+        The user sending the request.
+    key : str
+        The Idempotency-Key of the request.
+    body_hash : str
+        The request_hash of the request.
+
+    Returns
+    -------
+    tuple or None
+        The stored response, a 422 if the key was used for a different request, or None when
+        the request has to be processed.
+    """
+    record = models.IdempotencyKey.query.filter_by(userId=userId, key=key).first()
+    if record is None or record.createdAt < datetime.now() - KEY_TTL:
+        return None
+    if record.requestHash != body_hash:
+        return jsonify({'status': 422, 'message': f'{HEADER} was already used for a different request'}), 422
+    response = Response(record.body, status=record.status, mimetype='application/json')
+    response.headers[REPLAYED_HEADER] = 'true'
+    return response, record.status
+
+
+def remember(userId: int, key: str, body_hash: str, payload: dict, status: int) -> None:
+    """
+    Stores the response to a request with an Idempotency-Key, replacing an expired use of the
+    key. The change is not committed, so it is saved with the data the request created.
+
+    Parameters
+    ----------
+    userId : int
+        The user sending the request.
+    key : str
+        The Idempotency-Key of the request.
+    body_hash : str
+        The request_hash of the request.
+    payload : dict
+        The JSON response body.
+    status : int
+        The response status code.
+    """
+    models.IdempotencyKey.query.filter(
+        models.IdempotencyKey.userId == userId,
+        (models.IdempotencyKey.key == key) | (models.IdempotencyKey.createdAt < datetime.now() - KEY_TTL)
+    ).delete(synchronize_session=False)
+    db.session.add(models.IdempotencyKey(userId=userId, key=key, requestHash=body_hash, status=status,
+                                         body=json.dumps(payload)))
+
+
+def commit_or_replay(userId: int, key: str, body_hash: str):
+    """
+    Commits the session. If a concurrent request with the same key committed first, the
+    changes are rolled back and that request's response is returned instead.
+
+    Returns
+    -------
+    tuple or None
+        The response of the concurrent request, or None when the commit succeeded.
+    """
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        replayed = replay(userId, key, body_hash) if key is not None else None
+        if replayed is None:
+            raise
+        return replayed
+    return None
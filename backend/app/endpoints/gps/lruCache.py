@@ -0,0 +1,67 @@
+import threading
+import weakref
+from collections import OrderedDict
+
+"""
+LRU Cache Description:
+
+A small thread-safe in-process cache of derived responses (resampled series, elevation
+profiles, vector tiles), keyed by tuples whose first item is the owner of the entry: a journey
+or user id. The rest of the key must change whenever the cached data would, e.g. a version
+number. Entries of deleted owners are discarded explicitly, as their ids may be reused, and
+every cache is cleared when the tables are dropped (see clear_all).
+"""
+
+_caches = weakref.WeakSet()
+
+
+class LRUCache:
+    """
+    A bounded mapping that evicts the least recently used entry when full.
+
+    Attributes:
+    - size (int): The largest number of entries kept.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        _caches.add(self)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple):
+        """Returns a cached value, marking it as recently used, or None."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: tuple, value) -> None:
+        """Caches a value, evicting the least recently used one if the cache is full."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def discard(self, owners) -> None:
+        """Forgets the entries of some owners (the first item of their keys), e.g. when they are deleted."""
+        owners = set(owners)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in owners]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """Forgets every entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+def clear_all(*args, **kw):
+    """Clears every cache, e.g. when the tables are dropped."""
+    for cache in list(_caches):
+        cache.clear()
@@ -0,0 +1,215 @@
+import json
+import struct
+import numpy as np
+from sqlalchemy.types import TypeDecorator, LargeBinary
+
+"""
+Point Codec Description:
+
+Journey tracks are stored in the `points` column as a packed, columnar binary blob
+instead of a JSON list of {lat, lon, ele} dictionaries.
+
+Layout (little-endian):
+    header : 4 byte magic b'PTS1' followed by a uint32 point count
+    lat    : int32[count], degrees scaled by COORD_SCALE (fixed point)
+    lon    : int32[count], degrees scaled by COORD_SCALE (fixed point)
+    ele    : float32[count], metres
+
+Rows written before the packed format was introduced hold JSON text. decode_points
+detects these and parses them, so old rows stay readable until they are migrated
+with pack_points.py.
+
+Optional per-point timestamps are stored in the separate `times` column, delta encoded:
+    header : 4 byte magic b'TMS1', uint32 point count, int64 time of the first point
+             (Unix epoch milliseconds)
+    deltas : uint32[count - 1], milliseconds since the previous point
+"""
+
+MAGIC = b'PTS1'
+HEADER = struct.Struct('<4sI')
+
+# 1e7 keeps about 1cm of precision and +-180 degrees still fits in an int32
+COORD_SCALE = 10_000_000
+
+# float32 elevations are rounded back to this many decimals when decoded
+ELE_DECIMALS = 3
+
+TIMES_MAGIC = b'TMS1'
+TIMES_HEADER = struct.Struct('<4sIq')
+
+# Longest gap between two timestamps that fits a delta (about 49 days)
+MAX_TIME_DELTA_MS = 2 ** 32 - 1
+
+
+def points_to_array(points) -> np.ndarray:
+    """
+    Converts a list of {lat, lon, ele} dictionaries (or an existing array) into an
+    (n, 3) float64 array of lat, lon, ele.
+    """
+    if isinstance(points, np.ndarray):
+        return np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    if not points:
+        return np.empty((0, 3), dtype=np.float64)
+    return np.array([(p['lat'], p['lon'], p['ele']) for p in points], dtype=np.float64)
+
+
+def encode_points(points) -> bytes:
+    """
+    Packs points into the columnar binary format.
+
+    Parameters
+    ----------
+    points : list or np.ndarray
+        A list of {lat, lon, ele} dictionaries or an (n, 3) array.
+
+    Returns
+    -------
+    bytes
+        The packed blob.
+    """
+    array = points_to_array(points)
+    lat_lon = np.rint(array[:, :2] * COORD_SCALE).astype('<i4')
+    ele = array[:, 2].astype('<f4')
+    return b''.join((
+        HEADER.pack(MAGIC, len(array)),
+        lat_lon[:, 0].tobytes(),
+        lat_lon[:, 1].tobytes(),
+        ele.tobytes(),
+    ))
+
+
+def is_packed(blob) -> bool:
+    """Returns True if the blob is in the packed binary format."""
+    return isinstance(blob, (bytes, bytearray, memoryview)) and bytes(blob[:4]) == MAGIC
+
+
+def point_count(blob) -> int:
+    """Returns the number of points in a stored value, reading only the header of packed blobs."""
+    if not blob:
+        return 0
+    if is_packed(blob):
+        return HEADER.unpack_from(blob, 0)[1]
+    return len(decode_points(blob))
+
+
+def decode_points(blob, start=0, stop=None) -> np.ndarray:
+    """
+    Decodes a stored points value into an (n, 3) float64 array of lat, lon, ele.
+
+    Parameters
+    ----------
+    blob : bytes or str
+        A packed blob, or legacy JSON text (as str or bytes).
+    start : int
+        Index of the first point to decode.
+    stop : int, optional
+        Index one past the last point to decode, defaults to the end of the track.
+
+    Returns
+    -------
+    np.ndarray
+        The decoded points. An empty (0, 3) array is returned for empty values.
+        Packed blobs only have the requested range read out of the buffer.
+    """
+    if not blob:
+        return np.empty((0, 3), dtype=np.float64)
+
+    if not is_packed(blob):
+        if isinstance(blob, (bytes, bytearray, memoryview)):
+            blob = bytes(blob).decode('utf-8')
+        return points_to_array(json.loads(blob))[start:stop]
+
+    _, count = HEADER.unpack_from(blob, 0)
+    start, stop, _ = slice(start, stop).indices(count)
+    length = max(0, stop - start)
+    offset = HEADER.size + 4 * start
+    lat = np.frombuffer(blob, dtype='<i4', count=length, offset=offset)
+    lon = np.frombuffer(blob, dtype='<i4', count=length, offset=offset + 4 * count)
+    ele = np.frombuffer(blob, dtype='<f4', count=length, offset=offset + 8 * count)
+
+    array = np.empty((length, 3), dtype=np.float64)
+    array[:, 0] = lat
+    array[:, 1] = lon
+    array[:, :2] /= COORD_SCALE
+    array[:, 2] = np.round(ele.astype(np.float64), ELE_DECIMALS)
+    return array
+
+
+def points_to_dicts(array: np.ndarray) -> list:
+    """Converts an (n, 3) points array back into a list of {lat, lon, ele} dictionaries."""
+    return [{'lat': lat, 'lon': lon, 'ele': ele} for lat, lon, ele in array.tolist()]
+
+
+def encode_times(times) -> bytes:
+    """
+    Packs per-point timestamps into the delta encoded format.
+
+    Parameters
+    ----------
+    times : np.ndarray
+        Unix epoch milliseconds, one per point, never decreasing and at most
+        MAX_TIME_DELTA_MS apart (see pointValidation.validate_times).
+
+    Returns
+    -------
+    bytes
+        The packed blob.
+    """
+    times = np.asarray(times, dtype=np.int64)
+    first = int(times[0]) if len(times) else 0
+    return TIMES_HEADER.pack(TIMES_MAGIC, len(times), first) + np.diff(times).astype('<u4').tobytes()
+
+
+def decode_times(blob):
+    """
+    Decodes a stored times value.
+
+    Parameters
+    ----------
+    blob : bytes
+        A packed times blob, or None for a track without timestamps.
+
+    Returns
+    -------
+    np.ndarray or None
+        The int64 Unix epoch milliseconds of every point, or None.
+    """
+    if not blob:
+        return None
+    _, count, first = TIMES_HEADER.unpack_from(blob, 0)
+    times = np.empty(count, dtype=np.int64)
+    if count:
+        times[0] = first
+        times[1:] = np.frombuffer(blob, dtype='<u4', count=count - 1, offset=TIMES_HEADER.size)
+        np.cumsum(times, out=times)
+    return times
+
+
+class PackedPoints(TypeDecorator):
+    """
+    Column type of the packed tracks (PointBlob.points, JourneyLOD.points, ...).
+
+    Values are always exposed as bytes. Legacy rows stored as JSON text are returned
+    as utf-8 bytes so decode_points can tell them apart from packed blobs. When
+    POINTS_COMPRESSION is set, packed blobs are compressed on the way in, and compressed
+    blobs are always restored to the packed format on the way out (see pointCompression.py).
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if isinstance(value, str):
+            return value.encode('utf-8')
+        if is_packed(value):
+            from app.endpoints.gps import pointCompression
+            if pointCompression.compression_codec():
+                return pointCompression.compress_for_storage(value)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, str):
+            return value.encode('utf-8')
+        if value is not None and bytes(value[:4]) == b'PTZ1':
+            from app.endpoints.gps import pointCompression
+            return pointCompression.decompress_from_storage(value)
+        return value
@@ -0,0 +1,287 @@
+import struct
+import zlib
+from datetime import datetime
+import numpy as np
+from flask import current_app, has_app_context
+from sqlalchemy import text
+from app import db
+from app.endpoints.gps.pointCodec import HEADER, MAGIC, is_packed, ELE_DECIMALS
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+"""
+Point Compression Description:
+
+Optional compressed storage for packed point blobs (see pointCodec.py), enabled with the
+POINTS_COMPRESSION setting in config.py. The PackedPoints column type compresses blobs as they
+are written and restores the plain packed format as they are read, so the rest of the
+application never sees the compressed form. Rows written with compression turned off, or
+before it was turned on, stay readable.
+
+Layout (little-endian):
+    header  : 4 byte magic b'PTZ1', uint32 point count, uint8 codec, uint32 dictionary id
+    payload : the compressed columns
+
+The columns are lat and lon in the fixed point units of the packed format and elevation in
+millimetres, all int32. Each column is delta encoded (the first value is kept as is), the
+deltas are zigzag encoded so small negative steps become small numbers, and the bytes are
+split into planes (all lowest bytes first), which leaves long runs of zero bytes that
+compress very well.
+
+The payload is compressed with zstd when the zstandard package is installed, and with zlib
+otherwise. Both can use a dictionary trained from existing tracks, stored in the
+point_dictionary table; a blob records the id of the dictionary it was compressed with (0 for
+none). Use compress_points.py to train a dictionary and re-encode existing rows.
+
+The column type itself does not query the database for every blob: the newest dictionary of
+a codec and the dictionaries used for reading are looked up once and kept for the life of the
+process. A process keeps compressing with the dictionary it first found until it is restarted;
+its blobs stay readable everywhere, as every blob names its dictionary.
+"""
+
+PTZ_MAGIC = b'PTZ1'
+PTZ_HEADER = struct.Struct('<4sIBI')
+
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODEC_NAMES = {CODEC_ZLIB: 'zlib', CODEC_ZSTD: 'zstd'}
+
+ZLIB_LEVEL = 9
+ZSTD_LEVEL = 12
+
+# zlib only uses the last 32 KiB of a dictionary
+DICTIONARY_SIZE = 32 * 1024
+
+ELE_SCALE = 10 ** ELE_DECIMALS
+
+# Dictionaries never change once stored, so they are cached by id for the life of the process
+_dictionaries = {}
+
+# The newest dictionary id per codec, looked up once per process; store_dictionary forgets it
+_newest_ids = {}
+
+
+def is_compressed(blob) -> bool:
+    """Returns True if the blob is a compressed points blob."""
+    return isinstance(blob, (bytes, bytearray, memoryview)) and bytes(blob[:4]) == PTZ_MAGIC
+
+
+def available_codec(name='zstd') -> int:
+    """Returns the codec to use for a requested name, falling back to zlib without zstandard."""
+    if name == 'zstd' and zstandard is not None:
+        return CODEC_ZSTD
+    return CODEC_ZLIB
+
+
+def delta_encode(blob) -> bytes:
+    """
+    Turns a packed points blob into the uncompressed payload of a compressed blob.
+
+    Parameters
+    ----------
+    blob : bytes
+        A blob in the packed format.
+
+    Returns
+    -------
+    bytes
+        The delta, zigzag and byte plane encoded columns.
+    """
+    _, count = HEADER.unpack_from(blob, 0)
+    lat_lon = np.frombuffer(blob, dtype='<i4', count=2 * count, offset=HEADER.size)
+    ele = np.frombuffer(blob, dtype='<f4', count=count, offset=HEADER.size + 8 * count)
+    ele_mm = np.rint(np.round(ele.astype(np.float64), ELE_DECIMALS) * ELE_SCALE).astype('<i4')
+
+    columns = np.concatenate((lat_lon, ele_mm)).reshape(3, count)
+    deltas = np.empty_like(columns)
+    if count:
+        deltas[:, 0] = columns[:, 0]
+        # int32 arithmetic wraps, which the running sum in delta_decode undoes exactly
+        np.subtract(columns[:, 1:], columns[:, :-1], out=deltas[:, 1:])
+    zigzag = ((deltas << 1) ^ (deltas >> 31)).astype('<u4')
+    return zigzag.view(np.uint8).reshape(-1, 4).T.tobytes()
+
+
+def delta_decode(payload: bytes, count: int) -> bytes:
+    """Turns the uncompressed payload of a compressed blob back into a packed points blob."""
+    planes = np.frombuffer(payload, dtype=np.uint8).reshape(4, 3 * count)
+    zigzag = np.ascontiguousarray(planes.T).view('<u4').reshape(3, count)
+    deltas = ((zigzag >> 1).astype('<i4') ^ -(zigzag & 1).astype('<i4'))
+    columns = np.cumsum(deltas, axis=1, dtype='<i4')
+    ele = (columns[2] / ELE_SCALE).astype('<f4')
+    return b''.join((HEADER.pack(MAGIC, count), columns[:2].tobytes(), ele.tobytes()))
+
+
+def compress_blob(blob, codec: int, dictionary: bytes = None, dictionary_id: int = 0) -> bytes:
+    """
+    Compresses a packed points blob.
+
+    Parameters
+    ----------
+    blob : bytes
+        A blob in the packed format.
+    codec : int
+        CODEC_ZSTD or CODEC_ZLIB.
+    dictionary : bytes, optional
+        A dictionary trained for the codec.
+    dictionary_id : int
+        The id of the dictionary, recorded in the blob so it can be decompressed.
+
+    Returns
+    -------
+    bytes
+        The compressed blob.
+    """
+    _, count = HEADER.unpack_from(blob, 0)
+    payload = delta_encode(blob)
+    if codec == CODEC_ZSTD:
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        compressed = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dict_data).compress(payload)
+    else:
+        compressor = zlib.compressobj(ZLIB_LEVEL, zdict=dictionary) if dictionary else zlib.compressobj(ZLIB_LEVEL)
+        compressed = compressor.compress(payload) + compressor.flush()
+    return PTZ_HEADER.pack(PTZ_MAGIC, count, codec, dictionary_id if dictionary else 0) + compressed
+
+
+def decompress_blob(blob, dictionary: bytes = None) -> bytes:
+    """
+    Restores the packed points blob of a compressed blob.
+
+    Parameters
+    ----------
+    blob : bytes
+        A compressed blob.
+    dictionary : bytes, optional
+        The dictionary named in the blob header, if any.
+
+    Returns
+    -------
+    bytes
+        The blob in the packed format.
+
+    Exceptions
+    ----------
+    ValueError
+        Raised when the blob uses zstd and the zstandard package is not installed.
+    """
+    _, count, codec, _ = PTZ_HEADER.unpack_from(blob, 0)
+    compressed = bytes(blob[PTZ_HEADER.size:])
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("Points were compressed with zstd but zstandard is not installed")
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        payload = zstandard.ZstdDecompressor(dict_data=dict_data).decompress(compressed)
+    else:
+        decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+        payload = decompressor.decompress(compressed) + decompressor.flush()
+    return delta_decode(payload, count)
+
+
+def blob_dictionary_id(blob) -> int:
+    """The id of the dictionary a compressed blob was written with (0 for none)."""
+    return PTZ_HEADER.unpack_from(blob, 0)[3]
+
+
+def train_dictionary(blobs, codec: int, size: int = DICTIONARY_SIZE) -> bytes:
+    """
+    Trains a compression dictionary from sample tracks.
+
+    Parameters
+    ----------
+    blobs : list
+        Sample blobs in the packed format.
+    codec : int
+        CODEC_ZSTD or CODEC_ZLIB.
+    size : int
+        The size of the dictionary in bytes.
+
+    Returns
+    -------
+    bytes
+        The dictionary. For zlib, which has no trainer, it is the end of the concatenated
+        samples, as zlib looks for matches in the last bytes of the dictionary first.
+    """
+    samples = [delta_encode(blob) for blob in blobs if is_packed(blob)]
+    if codec == CODEC_ZSTD:
+        try:
+            return zstandard.train_dictionary(size, samples).as_bytes()
+        except zstandard.ZstdError:
+            # Too few samples to train on; fall back to raw sample content
+            pass
+    return b''.join(samples)[-size:]
+
+
+def store_dictionary(connection, codec: int, dictionary: bytes) -> int:
+    """
+    Saves a dictionary in the point_dictionary table, making it the one new blobs of that
+    codec are compressed with.
+
+    Returns
+    -------
+    int
+        The id of the new dictionary.
+    """
+    result = connection.execute(
+        text('INSERT INTO point_dictionary (codec, data, "createdAt") VALUES (:codec, :data, :createdAt)'),
+        {'codec': codec, 'data': dictionary, 'createdAt': datetime.now()})
+    _newest_ids.pop(codec, None)
+    return result.lastrowid
+
+
+def clear_dictionary_cache(*args, **kw):
+    """Forgets the cached dictionaries, e.g. when the tables are dropped."""
+    _dictionaries.clear()
+    _newest_ids.clear()
+
+
+def load_dictionary(connection, dictionary_id: int):
+    """Returns the bytes of a stored dictionary, caching it for later calls."""
+    if dictionary_id not in _dictionaries:
+        row = connection.execute(
+            text('SELECT data FROM point_dictionary WHERE id = :id'), {'id': dictionary_id}).first()
+        if row is None:
+            raise ValueError(f"Points dictionary {dictionary_id} not found")
+        _dictionaries[dictionary_id] = bytes(row[0])
+    return _dictionaries[dictionary_id]
+
+
+def current_dictionary_id(connection, codec: int) -> int:
+    """The id of the newest dictionary for a codec, or 0 if none has been trained."""
+    if codec not in _newest_ids:
+        _newest_ids[codec] = connection.execute(
+            text('SELECT max(id) FROM point_dictionary WHERE codec = :codec'), {'codec': codec}).scalar() or 0
+    return _newest_ids[codec]
+
+
+def compression_codec():
+    """The codec new blobs are compressed with under the POINTS_COMPRESSION setting, or None."""
+    if not has_app_context():
+        return None
+    name = current_app.config.get('POINTS_COMPRESSION')
+    return available_codec(name) if name else None
+
+
+def _dictionary(dictionary_id: int):
+    """A dictionary by id (None for 0), only using the session when it is not cached yet."""
+    if not dictionary_id:
+        return None
+    if dictionary_id in _dictionaries:
+        return _dictionaries[dictionary_id]
+    return load_dictionary(db.session.connection(), dictionary_id)
+
+
+def compress_for_storage(blob) -> bytes:
+    """Compresses a packed blob with the configured codec and its newest dictionary."""
+    codec = compression_codec()
+    dictionary_id = _newest_ids.get(codec)
+    if dictionary_id is None:
+        dictionary_id = current_dictionary_id(db.session.connection(), codec)
+    return compress_blob(blob, codec, _dictionary(dictionary_id), dictionary_id)
+
+
+def decompress_from_storage(blob) -> bytes:
+    """Restores a compressed blob read from the database, loading its dictionary if needed."""
+    return decompress_blob(blob, _dictionary(blob_dictionary_id(blob)))
@@ -0,0 +1,163 @@
+import hashlib
+import numpy as np
+from collections import Counter
+from sqlalchemy import bindparam, inspect, func, select, type_coerce, LargeBinary
+from sqlalchemy.orm.attributes import set_committed_value
+from app import db, models
+from app.endpoints.gps.pointCodec import HEADER, MAGIC, is_packed, decode_points
+
+"""
+Point Store Description:
+
+Journey tracks are stored once per distinct content in the point_blob table, keyed by the
+SHA-256 of their canonical packed encoding (see pointCodec.py, which quantizes every
+coordinate, so equal tracks always encode to equal bytes). Journeys refer to their blob by
+hash, and Journey.points reads it back through a correlated subquery, so queries can select,
+defer and stream the points as if they were a column of the journey.
+
+Every blob counts the journeys referring to it. attach() takes a reference on the new blob
+before releasing the old one, and release() deletes the blobs nobody refers to any more, all
+with set-based statements in the caller's transaction. A retried upload, a journey copied to
+another account or a track saved again unchanged therefore costs one reference and no
+storage. The hash is computed before compression, so it does not depend on
+POINTS_COMPRESSION.
+
+read_points() pages through an uncompressed blob with substr(), so only the bytes of the
+requested points are sent to Python; compressed blobs have to be restored whole.
+
+Databases created before point_blob still have the NOT NULL journey.points column, which is
+no longer written, so no journey could be created in them. legacy_schema() is True until the
+tracks are moved out of it and it is dropped, which the app does on its first request (see
+schemaMigration.py).
+"""
+
+# Set once the database is known to be migrated (see legacy_schema)
+_migrated = False
+
+
+def content_hash(blob: bytes) -> str:
+    """The hex SHA-256 of a packed track, its key in point_blob."""
+    return hashlib.sha256(blob).hexdigest()
+
+
+def acquire(session, blob: bytes) -> str:
+    """
+    Takes a reference on the blob of a packed track, storing it if it is new.
+
+    Parameters
+    ----------
+    session : Session
+        The database session. The change is not committed.
+    blob : bytes
+        The packed track.
+
+    Returns
+    -------
+    str
+        The hash of the blob.
+    """
+    table = models.PointBlob.__table__
+    key = content_hash(blob)
+    with session.no_autoflush:
+        # The UPDATE takes the write lock, so the blob cannot be inserted concurrently
+        # between the two statements on SQLite
+        updated = session.execute(
+            table.update().where(table.c.hash == key).values(refCount=table.c.refCount + 1)).rowcount
+        if not updated:
+            session.execute(table.insert().values(hash=key, points=blob, refCount=1))
+    return key
+
+
+def release(session, hashes) -> None:
+    """
+    Drops references on blobs, deleting the blobs no journey refers to any more.
+
+    Parameters
+    ----------
+    session : Session
+        The database session. The change is not committed.
+    hashes : iterable
+        The hash of every reference to drop, once per journey; None values are ignored.
+    """
+    counts = Counter(key for key in hashes if key)
+    if not counts:
+        return
+    table = models.PointBlob.__table__
+    with session.no_autoflush:
+        session.execute(
+            table.update().where(table.c.hash == bindparam('key'))
+            .values(refCount=table.c.refCount - bindparam('count')),
+            [{'key': key, 'count': count} for key, count in counts.items()])
+        session.execute(table.delete().where(table.c.hash.in_(list(counts)), table.c.refCount <= 0))
+
+
+def attach(journey, blob: bytes) -> None:
+    """
+    Sets the points of a journey, moving its reference from its previous blob to this one.
+
+    Parameters
+    ----------
+    journey : Journey
+        The journey, new or stored.
+    blob : bytes
+        The packed track.
+    """
+    key = acquire(db.session, blob)
+    release(db.session, [journey.pointsHash])
+    journey.pointsHash = key
+    # Journey.points is read through the hash; make the new track visible without a reload
+    set_committed_value(journey, 'points', blob)
+
+
+def read_points(session, key, start=0, stop=None):
+    """
+    Reads a range of points of a stored track, taking only its bytes out of the database.
+
+    Parameters
+    ----------
+    session : Session
+        The database session.
+    key : str
+        The hash of the blob.
+    start : int
+        Index of the first point to read.
+    stop : int, optional
+        Index one past the last point to read, defaults to the end of the track.
+
+    Returns
+    -------
+    tuple or None
+        The (n, 3) array of lat, lon, ele and the number of points of the whole track, or
+        None when the blob is missing or compressed.
+    """
+    table = models.PointBlob.__table__
+    raw_points = type_coerce(table.c.points, LargeBinary)
+
+    def part(offset, length):
+        # substr() is 1-based
+        return func.substr(raw_points, offset + 1, length, type_=LargeBinary)
+
+    header = session.execute(select(part(0, HEADER.size)).where(table.c.hash == key)).scalar()
+    if header is None or not is_packed(header):
+        return None
+    _, count = HEADER.unpack(bytes(header))
+    start, stop, _ = slice(start, stop).indices(count)
+    length = max(0, stop - start)
+    if not length:
+        return np.empty((0, 3), dtype=np.float64), count
+
+    offset = HEADER.size + 4 * start
+    columns = session.execute(select(
+        part(offset, 4 * length), part(offset + 4 * count, 4 * length), part(offset + 8 * count, 4 * length)
+    ).where(table.c.hash == key)).one()
+    return decode_points(HEADER.pack(MAGIC, length) + b''.join(bytes(column) for column in columns)), count
+
+
+def legacy_schema() -> bool:
+    """True while the database still has the journey.points column of before point_blob."""
+    global _migrated
+    if not _migrated:
+        inspector = inspect(db.engine)
+        _migrated = not (inspector.has_table('journey')
+                         and 'points' in {column['name'] for column in inspector.get_columns('journey')})
+    return not _migrated
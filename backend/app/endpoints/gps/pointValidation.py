@@ -0,0 +1,245 @@
+from itertools import chain
+from operator import itemgetter
+import numpy as np
+from app.endpoints.gps.pointCodec import MAX_TIME_DELTA_MS
+
+"""
+Point Validation Description:
+
+Batched validation of the `points` payload of a journey. The payload is checked and
+converted to an (n, 3) float64 array of lat, lon, ele in a handful of bulk operations:
+
+    - every point is a dictionary with exactly the keys lat, lon and ele
+    - every value is an int or float (bools and strings are rejected)
+    - no value is NaN or infinite
+    - lat is within [-90, 90], lon within [-180, 180] and ele within [-MAX_ELE, MAX_ELE]
+      metres, so it fits the float32 and millimetre encodings of the stored tracks
+
+Only when a bulk check fails is the payload scanned point by point, to report the index
+and reason of the first bad point.
+
+validate_timed_point_array additionally accepts a `time` key (Unix epoch seconds) on every
+point, from 0 to MAX_TIME (the end of year 9999, the last time a datetime can hold). Times must
+never decrease along the track.
+"""
+
+REQUIRED_KEYS = ('lat', 'lon', 'ele')
+TIME_KEY = 'time'
+TIMED_KEYS = REQUIRED_KEYS + (TIME_KEY,)
+NUMERIC_TYPES = {int, float}
+
+# Largest accepted elevation (or depth) in metres
+MAX_ELE = 100000
+
+# Latest accepted time, 9999-12-31T23:59:59Z in Unix epoch seconds
+MAX_TIME = 253402300799
+
+
+def point_error(point, keys=REQUIRED_KEYS) -> str:
+    """
+    Returns why a single point is invalid, or an empty string if it is valid.
+
+    Parameters
+    ----------
+    point : dict
+        The point to check.
+    keys : tuple
+        The keys every point must have, REQUIRED_KEYS or TIMED_KEYS.
+
+    Returns
+    -------
+    str
+        The reason the point is invalid.
+    """
+    if not isinstance(point, dict):
+        return f"Must be an object with {', '.join(keys[:-1])} and {keys[-1]}"
+
+    point_keys = set(point.keys())
+    required_keys = set(keys)
+    if point_keys != required_keys:
+        missing_keys = required_keys - point_keys
+        extra_keys = point_keys - required_keys
+        error_message = []
+        if missing_keys:
+            error_message.append(f"Missing keys: {', '.join(sorted(missing_keys))}")
+        if extra_keys:
+            error_message.append(f"Extra keys: {', '.join(sorted(map(str, extra_keys)))}")
+        return '; '.join(error_message)
+
+    for key in keys:
+        value = point[key]
+        if type(value) not in NUMERIC_TYPES:
+            return f"Invalid value for {key}: {value}. Must be a numerical value."
+        if not np.isfinite(float(value)):
+            return f"Invalid value for {key}: {value}. Must be a finite number."
+
+    if not -90 <= point['lat'] <= 90:
+        return f"Invalid value for lat: {point['lat']}. Must be between -90 and 90."
+    if not -180 <= point['lon'] <= 180:
+        return f"Invalid value for lon: {point['lon']}. Must be between -180 and 180."
+    if not -MAX_ELE <= point['ele'] <= MAX_ELE:
+        return f"Invalid value for ele: {point['ele']}. Must be between {-MAX_ELE} and {MAX_ELE}."
+    if TIME_KEY in keys and not 0 <= point[TIME_KEY] <= MAX_TIME:
+        return f"Invalid value for time: {point[TIME_KEY]}. Must be between 0 and {MAX_TIME}."
+    return ""
+
+
+def _first_error(points, keys=REQUIRED_KEYS) -> str:
+    """Scans the points one by one and describes the first invalid one."""
+    for index, point in enumerate(points):
+        try:
+            error_message = point_error(point, keys)
+        except OverflowError:
+            error_message = "Numerical value out of range"
+        if error_message:
+            return f"Point {index}: {error_message}"
+    return "Invalid points data"
+
+
+def _values_array(points, keys):
+    """
+    Checks the shape and types of a points payload in bulk and converts it to an
+    (n, len(keys)) float64 array, or returns None and the first error.
+    """
+    if not isinstance(points, list):
+        return None, "Points must be a list"
+    if not points:
+        return None, "No data provided"
+
+    try:
+        # len() and the key lookups raise TypeError for anything that is not a dictionary
+        if set(map(len, points)) != {len(keys)}:
+            return None, _first_error(points, keys)
+
+        values = list(chain.from_iterable(map(itemgetter(*keys), points)))
+        if not set(map(type, values)) <= NUMERIC_TYPES:
+            return None, _first_error(points, keys)
+
+        return np.array(values, dtype=np.float64).reshape(-1, len(keys)), ""
+    except (KeyError, TypeError, OverflowError):
+        return None, _first_error(points, keys)
+
+
+def validate_point_array(points):
+    """
+    Validates the points payload of a journey and converts it to an array.
+
+    Parameters
+    ----------
+    points : list
+        The list of {lat, lon, ele} dictionaries sent by the client.
+
+    Returns
+    -------
+    (np.ndarray, str)
+        Tuple containing the (n, 3) float64 array of lat, lon, ele (None if validation
+        failed), and an error message naming the index of the first bad point.
+    """
+    array, error_message = _values_array(points, REQUIRED_KEYS)
+    if array is None:
+        return None, error_message
+
+    error_message = validate_array(array)
+    if error_message:
+        return None, error_message
+
+    return array, ""
+
+
+def validate_timed_point_array(points):
+    """
+    Validates the points payload of a journey whose points may carry a timestamp.
+
+    Parameters
+    ----------
+    points : list
+        The list of {lat, lon, ele} or {lat, lon, ele, time} dictionaries sent by the
+        client. Either every point has a time or none has.
+
+    Returns
+    -------
+    (np.ndarray, np.ndarray, str)
+        Tuple containing the (n, 3) float64 array of lat, lon, ele (None if validation
+        failed), the int64 Unix epoch milliseconds of every point (None without times),
+        and an error message naming the index of the first bad point.
+    """
+    if not (isinstance(points, list) and points and isinstance(points[0], dict) and TIME_KEY in points[0]):
+        array, error_message = validate_point_array(points)
+        return array, None, error_message
+
+    values, error_message = _values_array(points, TIMED_KEYS)
+    if values is None:
+        return None, None, error_message
+
+    array = np.ascontiguousarray(values[:, :3])
+    error_message = validate_array(array)
+    if error_message:
+        return None, None, error_message
+
+    times, error_message = validate_times(values[:, 3])
+    if times is None:
+        return None, None, error_message
+
+    return array, times, ""
+
+
+def validate_times(seconds: np.ndarray):
+    """
+    Checks the timestamps of a track and converts them to milliseconds.
+
+    Parameters
+    ----------
+    seconds : np.ndarray
+        The Unix epoch time of every point in seconds, e.g. parsed from an uploaded GPX file.
+
+    Returns
+    -------
+    (np.ndarray, str)
+        Tuple containing the int64 Unix epoch milliseconds (None if the times are invalid),
+        and an error message naming the first bad point.
+    """
+    # Checked before converting, as larger values would overflow the int64 milliseconds
+    valid = np.isfinite(seconds) & (seconds >= 0) & (seconds <= MAX_TIME)
+    if not valid.all():
+        index = int(np.argmin(valid))
+        return None, f"Point {index}: Invalid value for time: {seconds[index]}. Must be a finite number between 0 and {MAX_TIME}."
+
+    times = np.rint(seconds * 1000).astype(np.int64)
+    deltas = np.diff(times)
+    valid = (deltas >= 0) & (deltas <= MAX_TIME_DELTA_MS)
+    if not valid.all():
+        index = int(np.argmin(valid)) + 1
+        if deltas[index - 1] < 0:
+            return None, f"Point {index}: Invalid value for time: {seconds[index]}. Must not be earlier than the previous point."
+        return None, f"Point {index}: Invalid value for time: {seconds[index]}. Too long after the previous point."
+
+    return times, ""
+
+
+def validate_array(array: np.ndarray) -> str:
+    """
+    Checks an (n, 3) array of lat, lon, ele for non finite and out of range values.
+
+    Parameters
+    ----------
+    array : np.ndarray
+        The points to check, e.g. parsed from an uploaded GPX file.
+
+    Returns
+    -------
+    str
+        An error message naming the first bad point, or an empty string if all are valid.
+    """
+    if len(array) == 0:
+        return "No data provided"
+
+    valid = np.isfinite(array).all(axis=1)
+    valid &= np.abs(array[:, 0]) <= 90
+    valid &= np.abs(array[:, 1]) <= 180
+    valid &= np.abs(array[:, 2]) <= MAX_ELE
+    if valid.all():
+        return ""
+
+    index = int(np.argmin(valid))
+    point = dict(zip(REQUIRED_KEYS, array[index].tolist()))
+    return f"Point {index}: {point_error(point)}"
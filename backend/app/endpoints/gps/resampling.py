@@ -0,0 +1,71 @@
+import numpy as np
+from app.endpoints.gps.trackProcessing import cumulative_distances
+from app.endpoints.gps.lruCache import LRUCache
+
+"""
+Resampling Description:
+
+Distance-aligned series of a journey for charts: the track is interpolated at a fixed
+spacing along its cumulative distance (0, step, 2 * step, ... and the finish), so the
+series of two journeys can be overlaid sample by sample without the client downloading
+and interpolating the raw points.
+
+Serialized responses are kept in an in-process LRU cache (see lruCache.py) keyed by journey
+id, journey version, points hash and step.
+"""
+
+MIN_STEP_M = 1.0
+MAX_SAMPLES = 20000
+
+# Number of responses kept in memory
+CACHE_SIZE = 256
+
+# Decimals kept in the output (about 1 cm of lat/lon, 1 mm of elevation)
+COORD_DECIMALS = 7
+ELE_DECIMALS = 3
+DISTANCE_DECIMALS = 2
+
+cache = LRUCache(CACHE_SIZE)
+
+
+def sample_distances(total: float, step: float) -> np.ndarray:
+    """The distances along a track of length total to sample at: every step, then the finish."""
+    distances = np.arange(0.0, total, step)
+    if not len(distances) or distances[-1] < total:
+        distances = np.append(distances, total)
+    return distances
+
+
+def resample_track(array: np.ndarray, step: float, times: np.ndarray = None) -> dict:
+    """
+    Interpolates a track at a fixed spacing along its distance.
+
+    Parameters
+    ----------
+    array : np.ndarray
+        The (n, 3) lat, lon, ele points.
+    step : float
+        The spacing of the samples in metres.
+    times : np.ndarray, optional
+        The Unix epoch milliseconds of every point.
+
+    Returns
+    -------
+    dict
+        Parallel lists of distance (metres), lat, lon and ele, plus time (Unix epoch
+        seconds) when the track has timestamps.
+    """
+    along = cumulative_distances(array)
+    distances = sample_distances(float(along[-1]) if len(along) else 0.0, step)
+
+    # np.interp needs strictly increasing distances; of points at the same distance (stops)
+    # the first one is kept
+    keep = np.concatenate(([True], np.diff(along) > 0)) if len(along) else np.zeros(0, dtype=bool)
+    along = along[keep]
+
+    series = {'distance': np.round(distances, DISTANCE_DECIMALS).tolist()}
+    for index, (key, decimals) in enumerate((('lat', COORD_DECIMALS), ('lon', COORD_DECIMALS), ('ele', ELE_DECIMALS))):
+        series[key] = np.round(np.interp(distances, along, array[keep, index]), decimals).tolist()
+    if times is not None:
+        series['time'] = np.round(np.interp(distances, along, times[keep]) / 1000.0, 3).tolist()
+    return series
@@ -0,0 +1,110 @@
+import threading
+from sqlalchemy import inspect, text, Integer
+from app import db, app
+from app.models import Journey, User, RecordingChunk
+from app.endpoints.gps.pointCodec import decode_points, encode_points, PackedPoints
+from app.endpoints.gps import pointStore
+
+"""
+Schema Migration Description:
+
+The project has no Alembic revisions, so databases created by older versions are brought up
+to date here: new tables, and the columns and indexes added to `journey`, `user` and
+`recording_chunk` since the database was created, are added, and tracks still stored in the
+old `journey.points` column are moved into the content-addressed `point_blob` table (see
+pointStore.py) before the column is dropped.
+
+migrate_legacy_schema() runs both steps once per process, on the first request to a database
+that still has `journey.points`, so journeys (legacy JSON rows included) stay readable and
+writable without a manual step. If it fails, only the journey routes are refused until
+pack_points.py is run. pack_points.py also runs both steps, followed by the slower per-journey
+processing (derived values, LOD levels, spatial index and heatmaps).
+"""
+
+BATCH_SIZE = 500
+
+# Guards the migration of the process; set when it failed, so it is not retried per request
+_lock = threading.Lock()
+_failed = False
+
+
+def add_missing_columns():
+    """
+    Creates new tables, adds any nullable or defaulted Journey, User and RecordingChunk
+    columns missing from the database and creates the Journey indexes that were added since.
+    """
+    db.create_all()
+    with db.engine.begin() as connection:
+        for table in (Journey.__table__, User.__table__, RecordingChunk.__table__):
+            existing = {column['name'] for column in inspect(connection).get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                definition = f'"{column.name}" {column.type.compile(db.engine.dialect)}'
+                if column.server_default is not None:
+                    definition += f" NOT NULL DEFAULT {column.server_default.arg}"
+                elif not column.nullable:
+                    continue
+                connection.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN {definition}')
+        for index in Journey.__table__.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def move_points_to_blobs(batch_size=BATCH_SIZE):
+    """
+    Moves the tracks of a database created before the point_blob table out of the
+    journey.points column, packing legacy JSON rows on the way, then drops the column.
+
+    Returns
+    -------
+    int
+        The number of journeys whose track was moved.
+    """
+    columns = {column['name'] for column in inspect(db.engine).get_columns('journey')}
+    if 'points' not in columns:
+        return 0
+
+    legacy = (text('SELECT id, points FROM journey WHERE "pointsHash" IS NULL ORDER BY id LIMIT :limit')
+              .columns(id=Integer, points=PackedPoints))
+    table = Journey.__table__
+    moved = 0
+    while True:
+        rows = db.session.execute(legacy, {'limit': batch_size}).all()
+        if not rows:
+            break
+        for row_id, blob in rows:
+            key = pointStore.acquire(db.session, encode_points(decode_points(blob)))
+            db.session.execute(table.update().where(table.c.id == row_id).values(pointsHash=key))
+            moved += 1
+        db.session.commit()
+
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql('ALTER TABLE journey DROP COLUMN points')
+    return moved
+
+
+def migrate_legacy_schema() -> bool:
+    """
+    Adds the missing columns and moves the legacy journey.points column into point_blob, once
+    per process.
+
+    Returns
+    -------
+    bool
+        True when the database is migrated, False if the migration failed.
+    """
+    global _failed
+    with _lock:
+        if not pointStore.legacy_schema():
+            return True
+        if _failed:
+            return False
+        try:
+            add_missing_columns()
+            move_points_to_blobs()
+        except Exception:
+            db.session.rollback()
+            app.logger.exception('Moving journey.points to point_blob failed; run python pack_points.py')
+            _failed = True
+            return False
+        return not pointStore.legacy_schema()
@@ -0,0 +1,255 @@
+import numpy as np
+from collections import Counter
+from scipy.spatial import cKDTree
+from app.endpoints.gps.spatialIndex import bounding_box, segment_candidate_ids, candidate_ids
+from app.endpoints.gps.trackProcessing import EARTH_RADIUS_M, cumulative_distances, segment_distances
+from app.endpoints.gps.pointCodec import decode_points
+
+"""
+Segment Matching Description:
+
+A segment is a stretch of path; a journey has an effort on it every time its track follows
+the segment from its first to its last point.
+
+Matching a track runs in two stages:
+1. Candidate prefilter: only segments whose bounding box intersects the track's bounding box
+   (grown by MATCH_TOLERANCE_M) are considered, looked up through the segment R*Tree.
+2. Along-track match, vectorized with NumPy: both paths are projected onto a local plane in
+   metres around the first track point. The projected track, its distances along and a
+   KD-tree of its points are built once per track (PreparedTrack) and shared by every
+   candidate segment, so a segment only costs two radius queries for the track points within
+   the tolerance of its start and end, plus the checks of the pairs found. Every start is
+   paired with the next end after it. The pair is an effort when every point of the segment
+   (resampled every SAMPLE_SPACING_M) lies within the tolerance of the track between them,
+   and the distance covered is close to the segment's.
+   The search then continues after the effort, so repeated laps give several efforts.
+
+Matching runs as part of the write-time processing of every journey (GPSRoutes.store_points),
+and backfill_segment matches a new segment against the historical journeys.
+"""
+
+MATCH_TOLERANCE_M = 25.0
+SAMPLE_SPACING_M = 10.0
+MIN_SEGMENT_LENGTH_M = 50.0
+
+# Longest accepted effort relative to the segment length (allows for GPS noise, not detours)
+MAX_LENGTH_RATIO = 1.3
+
+# Largest number of point-to-segment distances evaluated at once
+_CHUNK = 1_000_000
+
+
+def _project(array: np.ndarray, origin: np.ndarray) -> np.ndarray:
+    """Projects lat, lon onto an equirectangular plane in metres around an origin point."""
+    cos_lat = np.cos(np.radians(origin[0]))
+    return np.column_stack((
+        np.radians(array[:, 1] - origin[1]) * cos_lat,
+        np.radians(array[:, 0] - origin[0]),
+    )) * EARTH_RADIUS_M
+
+
+def resample(xy: np.ndarray, spacing: float = SAMPLE_SPACING_M) -> np.ndarray:
+    """Points along a projected polyline at most `spacing` metres apart, including every vertex."""
+    if len(xy) < 2:
+        return xy
+    lengths = np.hypot(*np.diff(xy, axis=0).T)
+    steps = np.maximum(np.ceil(lengths / spacing).astype(np.int64), 1)
+    segment = np.repeat(np.arange(len(steps)), steps)
+    t = (np.arange(len(segment)) - np.repeat(np.cumsum(steps) - steps, steps)) / steps[segment]
+    points = xy[segment] + (xy[segment + 1] - xy[segment]) * t[:, None]
+    return np.vstack((points, xy[-1:]))
+
+
+def distances_to_polyline(points: np.ndarray, polyline: np.ndarray) -> np.ndarray:
+    """
+    Distance from every point to the nearest part of a polyline.
+
+    Parameters
+    ----------
+    points : np.ndarray
+        An (m, 2) array of projected points.
+    polyline : np.ndarray
+        An (k, 2) array of projected vertices.
+
+    Returns
+    -------
+    np.ndarray
+        An (m,) array of distances in metres.
+    """
+    if len(polyline) == 1:
+        return np.hypot(*(points - polyline[0]).T)
+
+    start = polyline[:-1]
+    direction = polyline[1:] - start
+    length_sq = np.maximum((direction ** 2).sum(axis=1), 1e-12)
+    nearest = np.empty(len(points))
+    rows = max(1, _CHUNK // len(start))
+    for first in range(0, len(points), rows):
+        block = points[first:first + rows, None, :] - start[None, :, :]
+        t = np.clip((block * direction).sum(axis=2) / length_sq, 0, 1)
+        offsets = block - t[:, :, None] * direction
+        nearest[first:first + rows] = np.hypot(offsets[:, :, 0], offsets[:, :, 1]).min(axis=1)
+    return nearest
+
+
+def _closest_in_runs(indices: np.ndarray, distances: np.ndarray) -> np.ndarray:
+    """For every run of consecutive (sorted) indices, the one with the smallest of their distances."""
+    if not len(indices):
+        return indices
+    firsts = np.concatenate(([0], np.flatnonzero(np.diff(indices) > 1) + 1))
+    lasts = np.append(firsts[1:], len(indices))
+    return np.array([indices[first + int(np.argmin(distances[first:last]))]
+                     for first, last in zip(firsts, lasts)], dtype=np.int64)
+
+
+class PreparedTrack:
+    """
+    The parts of a track that matching needs, computed once and shared by every segment.
+
+    Attributes:
+    - origin (np.ndarray): The lat, lon, ele of the projection origin (the first point).
+    - xy (np.ndarray): The (n, 2) points projected around the origin, in metres.
+    - along (np.ndarray): The (n,) distances along the track in metres.
+    - tree (cKDTree): A KD-tree of the projected points.
+    """
+
+    def __init__(self, track: np.ndarray):
+        self.origin = track[0]
+        self.xy = _project(track, self.origin)
+        self.along = cumulative_distances(track)
+        self.tree = cKDTree(self.xy)
+
+    def __len__(self) -> int:
+        return len(self.xy)
+
+    def near(self, point: np.ndarray, tolerance: float) -> np.ndarray:
+        """The points within the tolerance of a projected point, the closest of each run of them."""
+        indices = np.array(sorted(self.tree.query_ball_point(point, tolerance)), dtype=np.int64)
+        return _closest_in_runs(indices, np.hypot(*(self.xy[indices] - point).T))
+
+
+def find_efforts(track, segment: np.ndarray, tolerance: float = MATCH_TOLERANCE_M) -> list:
+    """
+    Finds every traversal of a segment in a track.
+
+    Parameters
+    ----------
+    track : np.ndarray or PreparedTrack
+        The (n, 3) lat, lon, ele points of the journey, or the track prepared for matching
+        against several segments.
+    segment : np.ndarray
+        The (m, 3) lat, lon, ele points of the segment.
+    tolerance : float
+        How far in metres the track may be from the segment.
+
+    Returns
+    -------
+    list
+        One (startIndex, endIndex, distance) tuple per effort, in track order. The distance
+        is measured along the track in metres.
+    """
+    if len(track) < 2 or len(segment) < 2:
+        return []
+    if not isinstance(track, PreparedTrack):
+        track = PreparedTrack(track)
+
+    segment_xy = _project(segment, track.origin)
+    samples = resample(segment_xy)
+    segment_length = float(segment_distances(segment).sum())
+    starts = track.near(segment_xy[0], tolerance)
+    ends = track.near(segment_xy[-1], tolerance)
+
+    efforts = []
+    searched_to = -1
+    for start in starts:
+        if start <= searched_to:
+            continue
+        later = ends[ends > start]
+        if not len(later):
+            break
+        end = int(later[0])
+
+        distance = float(track.along[end] - track.along[start])
+        if not segment_length - 2 * tolerance <= distance <= segment_length * MAX_LENGTH_RATIO + 2 * tolerance:
+            continue
+        if distances_to_polyline(samples, track.xy[start:end + 1]).max() > tolerance:
+            continue
+
+        efforts.append((int(start), end, distance))
+        searched_to = end
+    return efforts
+
+
+def _search_box(array: np.ndarray, tolerance: float = MATCH_TOLERANCE_M):
+    """The (west, south, east, north) bounding box of a track grown by the tolerance."""
+    min_lat, max_lat, min_lon, max_lon = bounding_box(array)
+    pad_lat = np.degrees(tolerance / EARTH_RADIUS_M)
+    pad_lon = pad_lat / max(np.cos(np.radians(max(abs(min_lat), abs(max_lat)))), 1e-6)
+    return (max(min_lon - pad_lon, -180.0), max(min_lat - pad_lat, -90.0),
+            min(max_lon + pad_lon, 180.0), min(max_lat + pad_lat, 90.0))
+
+
+def match_track(session, array: np.ndarray) -> list:
+    """
+    Matches a journey track against every segment.
+
+    Parameters
+    ----------
+    session : Session
+        The database session.
+    array : np.ndarray
+        The (n, 3) lat, lon, ele points of the journey.
+
+    Returns
+    -------
+    list
+        One (segmentId, startIndex, endIndex, distance) tuple per effort.
+    """
+    from app import models
+
+    if len(array) < 2:
+        return []
+    ids = segment_candidate_ids(session, _search_box(array))
+    if not ids:
+        return []
+
+    track = PreparedTrack(array)
+    efforts = []
+    for segment in models.Segment.query.filter(models.Segment.id.in_(ids)).order_by(models.Segment.id):
+        efforts.extend((segment.id, *effort) for effort in find_efforts(track, segment.point_array))
+    return efforts
+
+
+def backfill_segment(session, segment, batch_size=200) -> Counter:
+    """
+    Matches a segment against the existing journeys of every user and adds their efforts.
+    The changes are not committed.
+
+    Parameters
+    ----------
+    session : Session
+        The database session.
+    segment : Segment
+        The segment, with its id and bounding box set.
+    batch_size : int
+        Number of candidate journeys loaded at a time.
+
+    Returns
+    -------
+    Counter
+        The number of efforts added per user id.
+    """
+    from app import models
+
+    path = segment.point_array
+    ids = candidate_ids(session, None, _search_box(path))
+    added = Counter()
+    for first in range(0, len(ids), batch_size):
+        rows = session.query(models.Journey.id, models.Journey.userId, models.Journey.points).filter(
+            models.Journey.id.in_(ids[first:first + batch_size])).all()
+        for journeyId, userId, points in rows:
+            for start, end, distance in find_efforts(decode_points(points), path):
+                session.add(models.SegmentEffort(segmentId=segment.id, journeyId=journeyId,
+                                                 startIndex=start, endIndex=end, distance=distance))
+                added[userId] += 1
+    return added
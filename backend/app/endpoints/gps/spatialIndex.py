@@ -0,0 +1,155 @@
+import numpy as np
+from sqlalchemy import text
+from app.endpoints.gps.vectorTiles import line_intersects
+
+"""
+Spatial Index Description:
+
+Every journey (and segment) stores the bounding box of its track (minLat, maxLat, minLon,
+maxLon), computed when its points are saved. On SQLite the boxes are mirrored into an R*Tree
+virtual table per table, kept in sync by triggers, so it stays correct for ORM writes as well as
+bulk UPDATE/DELETE statements. Bounding box queries narrow the candidates through the R*Tree
+before any points are decoded; on other databases they fall back to the bbox columns.
+
+The R*Tree stores 32 bit floats rounded outwards, so it may return a few extra candidates
+but never misses one. Candidates are then confirmed with an exact test on their tracks: a
+journey passes through a box if one of its segments crosses it, even with no point inside.
+"""
+
+RTREE_TABLE = 'journey_rtree'
+SEGMENT_RTREE_TABLE = 'segment_rtree'
+
+
+def _rtree_statements(source, rtree):
+    """The statements creating the R*Tree of a table with bbox columns and its triggers."""
+    return (
+        f'CREATE VIRTUAL TABLE IF NOT EXISTS {rtree} USING rtree(id, minLat, maxLat, minLon, maxLon)',
+        f'''CREATE TRIGGER IF NOT EXISTS {rtree}_insert AFTER INSERT ON {source}
+            WHEN NEW.minLat IS NOT NULL
+            BEGIN
+                INSERT OR REPLACE INTO {rtree} VALUES (NEW.id, NEW.minLat, NEW.maxLat, NEW.minLon, NEW.maxLon);
+            END''',
+        f'''CREATE TRIGGER IF NOT EXISTS {rtree}_update AFTER UPDATE OF minLat, maxLat, minLon, maxLon ON {source}
+            BEGIN
+                DELETE FROM {rtree} WHERE id = OLD.id;
+                INSERT INTO {rtree} SELECT NEW.id, NEW.minLat, NEW.maxLat, NEW.minLon, NEW.maxLon
+                    WHERE NEW.minLat IS NOT NULL;
+            END''',
+        f'''CREATE TRIGGER IF NOT EXISTS {rtree}_delete AFTER DELETE ON {source}
+            BEGIN
+                DELETE FROM {rtree} WHERE id = OLD.id;
+            END''',
+    )
+
+
+# (source table, R*Tree) pairs
+_INDEXED_TABLES = (('journey', RTREE_TABLE), ('segment', SEGMENT_RTREE_TABLE))
+
+
+def create_index(target, connection, **kw):
+    """Creates the R*Trees and their triggers after the tables are created (SQLite only)."""
+    if connection.dialect.name != 'sqlite':
+        return
+    for source, rtree in _INDEXED_TABLES:
+        for statement in _rtree_statements(source, rtree):
+            connection.exec_driver_sql(statement)
+
+
+def drop_index(target, connection, **kw):
+    """Drops the R*Trees before the tables are dropped (SQLite only)."""
+    if connection.dialect.name != 'sqlite':
+        return
+    for _, rtree in _INDEXED_TABLES:
+        connection.exec_driver_sql(f'DROP TABLE IF EXISTS {rtree}')
+
+
+def rebuild_index(connection):
+    """Refills the R*Trees from the bbox columns, e.g. after a migration (SQLite only)."""
+    if connection.dialect.name != 'sqlite':
+        return
+    for source, rtree in _INDEXED_TABLES:
+        connection.exec_driver_sql(f'DELETE FROM {rtree}')
+        connection.exec_driver_sql(
+            f'INSERT INTO {rtree} SELECT id, minLat, maxLat, minLon, maxLon FROM {source} '
+            f'WHERE minLat IS NOT NULL')
+
+
+def bounding_box(array: np.ndarray):
+    """
+    Returns the (minLat, maxLat, minLon, maxLon) of an (n, 3) points array, or a tuple of
+    None for an empty track.
+    """
+    if len(array) == 0:
+        return None, None, None, None
+    minimum = array[:, :2].min(axis=0)
+    maximum = array[:, :2].max(axis=0)
+    return float(minimum[0]), float(maximum[0]), float(minimum[1]), float(maximum[1])
+
+
+def parse_bbox(value):
+    """
+    Parses a 'west,south,east,north' bounding box query parameter.
+
+    Returns
+    -------
+    (tuple, str)
+        Tuple containing (west, south, east, north) (None if invalid), and an error message.
+    """
+    try:
+        west, south, east, north = (float(part) for part in (value or '').split(','))
+    except ValueError:
+        return None, "Invalid bbox. Must be west,south,east,north"
+    if not (-180 <= west <= east <= 180 and -90 <= south <= north <= 90):
+        return None, "Invalid bbox. Must be west,south,east,north within -180..180 and -90..90"
+    return (west, south, east, north), ""
+
+
+def _intersecting_ids(session, source, rtree, bbox, userId=None) -> list:
+    """Ids of the rows of a table with bbox columns whose box intersects the given one."""
+    west, south, east, north = bbox
+    params = {'userId': userId, 'west': west, 'south': south, 'east': east, 'north': north}
+    if session.get_bind().dialect.name == 'sqlite':
+        user_filter = f'AND {source}.userId = :userId ' if userId is not None else ''
+        query = text(
+            f'SELECT {source}.id FROM {rtree} JOIN {source} ON {source}.id = {rtree}.id '
+            f'WHERE {rtree}.maxLat >= :south AND {rtree}.minLat <= :north '
+            f'AND {rtree}.maxLon >= :west AND {rtree}.minLon <= :east '
+            f'{user_filter}ORDER BY {source}.id')
+    else:
+        user_filter = 'AND "userId" = :userId ' if userId is not None else ''
+        query = text(
+            f'SELECT id FROM {source} WHERE "maxLat" >= :south AND "minLat" <= :north '
+            f'AND "maxLon" >= :west AND "minLon" <= :east {user_filter}ORDER BY id')
+    return [row[0] for row in session.execute(query, params)]
+
+
+def candidate_ids(session, userId, bbox) -> list:
+    """
+    Ids of the journeys whose bounding box intersects the given box.
+
+    Parameters
+    ----------
+    session : Session
+        The database session.
+    userId : int
+        The owner of the journeys, or None for the journeys of every user.
+    bbox : tuple
+        (west, south, east, north) in degrees.
+
+    Returns
+    -------
+    list
+        The candidate journey ids, in ascending order.
+    """
+    return _intersecting_ids(session, 'journey', RTREE_TABLE, bbox, userId)
+
+
+def segment_candidate_ids(session, bbox) -> list:
+    """Ids of the segments whose bounding box intersects the given (west, south, east, north) box."""
+    return _intersecting_ids(session, 'segment', SEGMENT_RTREE_TABLE, bbox)
+
+
+def passes_through(array: np.ndarray, bbox) -> bool:
+    """Exact test: True if a point or a straight segment between two points of the track lies in the box."""
+    west, south, east, north = bbox
+    return line_intersects(array[:, :2], (south, west), (north, east))
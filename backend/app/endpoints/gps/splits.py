@@ -0,0 +1,109 @@
+import numpy as np
+from app.endpoints.gps.trackProcessing import cumulative_distances
+
+"""
+Splits Description:
+
+Pace analysis of journeys whose points carry timestamps (see the times column in
+pointCodec.py), computed with NumPy over the whole track at once.
+
+    - splits: the track is cut every kilometre or mile of distance along the track. The time
+      each boundary is crossed is interpolated between the two points around it, so the
+      splits add up exactly to the elapsed time. The last split is usually partial.
+    - moving time: the time spent between consecutive points while moving faster than
+      MOVING_SPEED_MPS, so pauses at traffic lights or for photos are left out.
+    - pace: seconds per unit of distance, of each split and over the whole journey.
+"""
+
+UNITS = {'km': 1000.0, 'mile': 1609.344}
+DEFAULT_UNIT = 'km'
+
+# Slower than this between two points counts as stopped (metres per second)
+MOVING_SPEED_MPS = 0.5
+
+
+def moving_time(distances: np.ndarray, durations: np.ndarray) -> float:
+    """
+    The time spent moving along a track.
+
+    Parameters
+    ----------
+    distances : np.ndarray
+        The distance in metres between each pair of consecutive points.
+    durations : np.ndarray
+        The time in seconds between each pair of consecutive points.
+
+    Returns
+    -------
+    float
+        The total duration in seconds of the steps faster than MOVING_SPEED_MPS.
+    """
+    moving = distances > MOVING_SPEED_MPS * durations
+    return float(durations[moving].sum())
+
+
+def split_times(array: np.ndarray, times: np.ndarray, unit: str = DEFAULT_UNIT) -> dict:
+    """
+    Splits a timed track into equal distances.
+
+    Parameters
+    ----------
+    array : np.ndarray
+        The (n, 3) lat, lon, ele points.
+    times : np.ndarray
+        The Unix epoch milliseconds of every point.
+    unit : str
+        'km' or 'mile', the length of a split.
+
+    Returns
+    -------
+    dict
+        The unit, the distance (metres), elapsed and moving time (seconds), the average
+        and moving pace (seconds per unit, None for a track without distance), the splits
+        (each with its distance, duration and pace) and the indices of the fastest and
+        slowest full split (None when the track is shorter than one unit).
+    """
+    unit_length = UNITS[unit]
+    seconds = (times - times[0]) / 1000.0 if len(times) else np.zeros(0)
+    along = cumulative_distances(array)
+    distance = float(along[-1]) if len(along) else 0.0
+    elapsed = float(seconds[-1]) if len(seconds) else 0.0
+    moving = moving_time(np.diff(along), np.diff(seconds))
+
+    # Distance at the end of every split, with the final partial split ending at the finish
+    boundaries = np.arange(1, int(distance // unit_length) + 1) * unit_length
+    if distance > (boundaries[-1] if len(boundaries) else 0.0):
+        boundaries = np.append(boundaries, distance)
+
+    # np.interp needs strictly increasing distances; stops add points at the same distance,
+    # of which the first one is when the boundary was reached
+    first = np.concatenate(([True], np.diff(along) > 0)) if len(along) else np.zeros(0, dtype=bool)
+    crossed = np.interp(boundaries, along[first], seconds[first]) if len(boundaries) else boundaries
+    if len(crossed) and boundaries[-1] == distance:
+        # Time spent standing at the finish belongs to the last split
+        crossed[-1] = elapsed
+
+    split_distances = np.diff(boundaries, prepend=0.0)
+    durations = np.diff(crossed, prepend=0.0)
+    paces = durations / (split_distances / unit_length)
+
+    full = np.flatnonzero(np.isclose(split_distances, unit_length))
+    fastest = int(full[np.argmin(paces[full])]) if len(full) else None
+    slowest = int(full[np.argmax(paces[full])]) if len(full) else None
+
+    return {
+        'unit': unit,
+        'distance': distance,
+        'elapsedTime': elapsed,
+        'movingTime': moving,
+        'averagePace': elapsed / (distance / unit_length) if distance else None,
+        'movingPace': moving / (distance / unit_length) if distance else None,
+        'splits': [
+            {'index': index, 'distance': split_distance, 'duration': duration, 'pace': pace}
+            for index, (split_distance, duration, pace)
+            in enumerate(zip(split_distances.tolist(), durations.tolist(), paces.tolist()))
+        ],
+        'fastest': fastest,
+        'slowest': slowest,
+    }
+
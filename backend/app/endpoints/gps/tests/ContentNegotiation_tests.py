@@ -0,0 +1,76 @@
+from app.endpoints.imports import imports
+from app.endpoints.gps import contentNegotiation
+import numpy as np
+import struct
+import msgpack
+import cbor2
+
+def unpack_msgpack(data):
+    return msgpack.unpackb(data, raw=False)
+
+def unpack_cbor(data):
+    return cbor2.loads(data)
+
+class TestContentNegotiation:
+    """Class for testing the MessagePack and CBOR responses of journey endpoints."""
+
+    def test_encoders(self, client, clean_db):
+        value = {"a": [1, -1, 200, -200, 70000, -(1 << 40), 1.5, None, True, False], "text": "é" * 40, "blob": b"\x00" * 300}
+        assert unpack_msgpack(contentNegotiation.pack_msgpack(value)) == value
+        assert unpack_cbor(contentNegotiation.pack_cbor(value)) == value
+
+        # Known encodings from the format specifications
+        assert contentNegotiation.pack_msgpack({"compact": True, "schema": 0}) == b'\x82\xa7compact\xc3\xa6schema\x00'
+        assert contentNegotiation.pack_cbor([1, [2, 3], -500]) == bytes.fromhex('83018202033901f3')
+
+        array = np.array([[51.5, -0.1, 10.0]])
+        assert contentNegotiation.pack_msgpack(array) == b'\xc4\x18' + struct.pack('<3d', 51.5, -0.1, 10.0)
+        assert unpack_cbor(contentNegotiation.pack_cbor(array)) == cbor2.CBORTag(86, struct.pack('<3d', 51.5, -0.1, 10.0))
+        assert unpack_msgpack(contentNegotiation.pack_msgpack({"n": np.int64(3), "on": np.bool_(True)})) == {"n": 3, "on": True}
+
+        # Integers beyond MessagePack's range are refused cleanly; CBOR sends them as bignums
+        with imports.app.test_request_context():
+            response, status = contentNegotiation.make_response({"n": 1 << 64}, contentNegotiation.MSGPACK)
+            assert status == 406 and response.json['status'] == 406
+            response, status = contentNegotiation.make_response({"n": -(1 << 63) - 1}, contentNegotiation.MSGPACK)
+            assert status == 406
+            response, status = contentNegotiation.make_response({"n": 1 << 64}, contentNegotiation.CBOR)
+            assert status == 200 and unpack_cbor(response.data) == {"n": 1 << 64}
+
+    def test_negotiated_endpoints(self, client, clean_db):
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        expected = client.get("/get_journeys_of_user", headers=headers).json
+        response = client.get("/get_journeys_of_user", headers=dict(headers, Accept="application/msgpack"))
+        assert response.status_code == 200
+        assert response.mimetype == 'application/msgpack'
+        assert 'Accept' in response.headers['Vary']
+        data = unpack_msgpack(response.data)['data']
+        assert [journey['name'] for journey in data] == [journey['name'] for journey in expected['data']]
+        points = np.frombuffer(data[0]['points'], '<f8').reshape(-1, 3)
+        assert points.tolist() == [[point['lat'], point['lon'], point['ele']] for point in expected['data'][0]['points']]
+
+        # Each format has its own ETag
+        etag = response.headers['ETag']
+        assert etag != client.get("/get_journeys_of_user", headers=headers).headers['ETag']
+        assert client.get("/get_journeys_of_user", headers=dict(headers, Accept="application/msgpack", **{"If-None-Match": etag})).status_code == 304
+        assert client.get("/get_journeys_of_user", headers=dict(headers, **{"If-None-Match": etag})).status_code == 200
+
+        response = client.get("/get_journeys_of_user?format=polyline", headers=dict(headers, Accept="application/cbor"))
+        assert response.mimetype == 'application/cbor'
+        assert unpack_cbor(response.data)['data'][0]['polyline'] == client.get("/get_journeys_of_user?format=polyline", headers=headers).json['data'][0]['polyline']
+
+        response = client.get("/get_friends_journey?friend=bob@example.com", headers=dict(headers, Accept="application/cbor"))
+        assert response.status_code == 200
+        points = unpack_cbor(response.data)['data'][0]['points']
+        assert points.tag == 86 and np.frombuffer(points.value, '<f8').tolist() == [38.5, -120.2, 100, 38.6, -120.3, 110]
+
+        stats = client.get("/getStats", headers=headers).json
+        response = client.get("/getStats", headers=dict(headers, Accept="application/x-msgpack, application/json;q=0.5"))
+        assert response.mimetype == 'application/msgpack'
+        assert unpack_msgpack(response.data) == stats
+
+        # JSON stays the default
+        assert client.get("/getStats", headers=dict(headers, Accept="text/html")).mimetype == 'application/json'
+        assert client.get("/getStats", headers=dict(headers, Accept="*/*")).mimetype == 'application/json'
@@ -0,0 +1,78 @@
+from app.endpoints.imports import imports
+from app.endpoints.gps import elevationProfile
+import numpy as np
+
+def reference_lttb(x, y, threshold):
+    """The LTTB algorithm as published, one point at a time."""
+    every = (len(x) - 2) / (threshold - 2)
+    selected, a = [0], 0
+    for i in range(threshold - 2):
+        start, stop = int(i * every) + 1, int((i + 1) * every) + 1
+        next_start, next_stop = stop, min(int((i + 2) * every) + 1, len(x))
+        if i == threshold - 3:
+            cx, cy = x[-1], y[-1]
+        else:
+            cx, cy = np.mean(x[next_start:next_stop]), np.mean(y[next_start:next_stop])
+        best, best_area = start, -1
+        for b in range(start, stop):
+            area = abs((x[a] - cx) * (y[b] - y[a]) - (x[a] - x[b]) * (cy - y[a]))
+            if area > best_area:
+                best, best_area = b, area
+        selected.append(best)
+        a = best
+    return selected + [len(x) - 1]
+
+class TestElevationProfile:
+    """Class for testing the downsampled elevation profiles of journeys."""
+
+    def test_lttb(self):
+        rng = np.random.default_rng(7)
+        x = np.cumsum(rng.uniform(1, 10, 1003))
+        y = np.cumsum(rng.normal(0, 2, 1003))
+        for threshold in (3, 10, 100, 500):
+            assert elevationProfile.lttb(x, y, threshold).tolist() == reference_lttb(x, y, threshold)
+
+        # A single summit survives downsampling
+        y = np.zeros(1000)
+        y[637] = 50
+        assert 637 in elevationProfile.lttb(np.arange(1000.0), y, 20)
+        assert elevationProfile.lttb(np.arange(5.0), np.zeros(5), 10).tolist() == [0, 1, 2, 3, 4]
+
+    def test_elevation_profile_endpoint(self, client, clean_db):
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+        token3, id3 = imports.users.user2(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        lat = np.linspace(51.0, 51.1, 2000)
+        points = [{"lat": float(a), "lon": -0.1, "ele": float(100 + 50 * np.sin(i / 100))} for i, a in enumerate(lat)]
+        journey_data = {
+            "name": "Hill Run", "type": "Run", "points": points,
+            "startTime": "07:30:00", "endTime": "08:30:00", "dateCreated": "2024-03-12"
+        }
+        assert client.post("/create_journey", json=journey_data, headers=headers).status_code == 201
+        journey = imports.models.Journey.query.filter_by(name="Hill Run").first()
+
+        response = client.get(f"/journey/{journey.id}/elevation_profile", headers=headers)
+        assert response.status_code == 200
+        data = response.json['data']
+        assert data['points'] == elevationProfile.DEFAULT_POINTS
+        assert len(data['distance']) == len(data['ele']) == elevationProfile.DEFAULT_POINTS
+        assert data['trackPoints'] == 2000
+        assert data['distance'][0] == 0 and data['distance'][-1] == data['totalDistance']
+        assert abs(max(data['ele']) - 150) < 0.1 and abs(min(data['ele']) - 50) < 0.1
+
+        # Short tracks are returned whole; responses are cached per journey version
+        data = client.get("/journey/1/elevation_profile?points=50", headers=headers).json['data']
+        assert data['ele'] == [100, 110]
+        points_hash = imports.db.session.get(imports.models.Journey, 1).pointsHash
+        assert elevationProfile.cache.get((1, 1, points_hash, 50)) is not None
+        etag = client.get("/journey/1/elevation_profile?points=50", headers=headers).headers['ETag']
+        assert client.get("/journey/1/elevation_profile?points=50", headers=dict(headers, **{"If-None-Match": etag})).status_code == 304
+        client.delete("/delete_journey/1", headers=headers)
+        assert elevationProfile.cache.get((1, 1, points_hash, 50)) is None
+
+        assert client.get(f"/journey/{journey.id}/elevation_profile", headers={"Authorization": f"Bearer {token2}"}).status_code == 200
+        assert client.get(f"/journey/{journey.id}/elevation_profile", headers={"Authorization": f"Bearer {token3}"}).status_code == 403
+        for query in ("?points=2", "?points=abc", "?points=5001"):
+            assert client.get(f"/journey/{journey.id}/elevation_profile{query}", headers=headers).status_code == 400
+        assert client.get("/journey/999/elevation_profile", headers=headers).status_code == 404
@@ -0,0 +1,84 @@
+from app.endpoints.imports import imports
+from app.endpoints.gps.zipStream import stream_zip, safe_filename
+from datetime import datetime
+import xml.etree.ElementTree as ET
+import zipfile
+
+GPX_NS = {'gpx': 'http://www.topografix.com/GPX/1/1'}
+
+class TestExport:
+    """Class for testing the streamed ZIP export of a user's journeys."""
+
+    def test_stream_zip(self):
+        def content(count):
+            for index in range(count):
+                yield f'line {index}\n'
+
+        members = ((f'file{index}.txt', datetime(2024, 3, 12, 7, 30), content(1000)) for index in range(3))
+        parts = list(stream_zip(members))
+        # The archive is produced in pieces, not all at once
+        assert len(parts) > 3
+        with zipfile.ZipFile(imports.io.BytesIO(b''.join(parts))) as archive:
+            assert archive.testzip() is None
+            assert archive.namelist() == ['file0.txt', 'file1.txt', 'file2.txt']
+            assert archive.read('file2.txt').decode().splitlines()[-1] == 'line 999'
+            assert archive.getinfo('file0.txt').date_time == (2024, 3, 12, 7, 30, 0)
+
+        # Dates before 1980 cannot be stored in a ZIP and are clamped
+        members = [('old.txt', datetime(1969, 7, 20, 20, 17), ['landing'])]
+        with zipfile.ZipFile(imports.io.BytesIO(b''.join(stream_zip(members)))) as archive:
+            assert archive.getinfo('old.txt').date_time == (1980, 1, 1, 0, 0, 0)
+            assert archive.read('old.txt') == b'landing'
+
+        assert safe_filename('Morning Run') == 'Morning Run'
+        assert safe_filename('../etc/passwd') == 'etc_passwd'
+        assert safe_filename('***') == 'journey'
+
+    def test_export_endpoint(self, client, clean_db):
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+        token3, id3 = imports.users.user2(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        journey_data = {
+            "name": "Tempo Run",
+            "type": "Run",
+            "points": [
+                {"lat": 51.5, "lon": -0.1, "ele": 10, "time": 1710228600},
+                {"lat": 51.501, "lon": -0.1, "ele": 11, "time": 1710228630.5},
+            ],
+            "startTime": "07:30:00",
+            "endTime": "07:31:00",
+            "dateCreated": "2024-03-12"
+        }
+        assert client.post("/create_journey", json=journey_data, headers=headers).status_code == 201
+
+        response = client.get("/export/journeys.zip", headers=headers)
+        assert response.status_code == 200
+        assert response.mimetype == 'application/zip'
+        assert response.headers['Content-Disposition'] == 'attachment; filename="journeys.zip"'
+        with zipfile.ZipFile(imports.io.BytesIO(response.data)) as archive:
+            names = archive.namelist()
+            assert len(names) == 4
+            assert names[0] == '1-Morning Run.gpx'
+            root = ET.fromstring(archive.read(names[0]))
+            assert root.find('gpx:trk/gpx:name', GPX_NS).text == 'Morning Run'
+            assert len(root.findall('.//gpx:trkpt', GPX_NS)) == 2
+
+            root = ET.fromstring(archive.read(names[-1]))
+            times = [element.text for element in root.findall('.//gpx:trkpt/gpx:time', GPX_NS)]
+            assert times == ['2024-03-12T07:30:00.000Z', '2024-03-12T07:30:30.500Z']
+
+        # Journeys dated before 1980 are exported whole
+        old_journey = dict(journey_data, name="Old Run", dateCreated="1975-06-01")
+        assert client.post("/create_journey", json=old_journey, headers=headers).status_code == 201
+        response = client.get("/export/journeys.zip", headers=headers)
+        with zipfile.ZipFile(imports.io.BytesIO(response.data)) as archive:
+            assert archive.testzip() is None
+            names = archive.namelist()
+            assert names[-1].endswith('-Old Run.gpx')
+            assert archive.getinfo(names[-1]).date_time == (1980, 1, 1, 0, 0, 0)
+
+        # Only the user's own journeys are exported
+        response = client.get("/export/journeys.zip", headers={"Authorization": f"Bearer {token3}"})
+        with zipfile.ZipFile(imports.io.BytesIO(response.data)) as archive:
+            assert archive.namelist() == []
@@ -297,6 +297,20 @@ class TestGPSRoutes:
         # Test if journey is updated successfully
         response = client.put("/update_journey/1", json=journey_update_data, headers={"Authorization": f"Bearer {token}"})
         assert response.status_code == 200
+        assert response.json['ignored'] == ['elevation']
+
+        # The elevation summary follows the new points, not the supplied elevation
+        journey = imports.db.session.get(imports.models.Journey, 1)
+        assert (journey.avgEle, journey.minEle, journey.maxEle) == (165, 120, 210)
+        assert journey.totalDistance == 2.0
+
+        # New points without a distance reset it to the computed one
+        response = client.put("/update_journey/1", json={"points": journey_update_data["points"][:1]},
+                              headers={"Authorization": f"Bearer {token}"})
+        assert 'ignored' not in response.json
+        imports.db.session.expire_all()
+        journey = imports.db.session.get(imports.models.Journey, 1)
+        assert journey.totalDistance == journey.computedDistance == 0
 
 
     def test_update_journey_non_existing_journey(self, client, clean_db):
@@ -385,3 +399,462 @@ class TestGPSRoutes:
         assert response.status_code == 403
 
 
+
+    def test_get_journeys_polyline_format(self, client, clean_db):
+        """Test getting user journeys as encoded polylines."""
+
+        token = imports.users.user1(self, client, clean_db)[0]
+
+        response = client.get("/get_journeys_of_user?format=polyline", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+
+        journey = response.json['data'][0]
+        assert 'points' not in journey
+        assert journey['precision'] == 5
+        coordinates = imports.decode_polyline(journey['polyline'], journey['precision'])
+        elevation = imports.decode_polyline(journey['elevationPolyline'], journey['elevationPrecision'], 1)
+        assert coordinates.tolist() == [[38.5, -120.2], [38.6, -120.3]]
+        assert elevation.ravel().tolist() == [100, 110]
+
+    def test_get_journeys_invalid_format(self, client, clean_db):
+        """Test getting user journeys with an unsupported output format."""
+
+        token = imports.users.user1(self, client, clean_db)[0]
+
+        response = client.get("/get_journeys_of_user?format=xml", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 400
+
+        response = client.get("/get_journeys_of_user?format=polyline&precision=7", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 400
+
+    def test_get_friends_journey_polyline_format(self, client, clean_db):
+        """Test getting a friend's journeys as precision 6 encoded polylines."""
+
+        token = imports.users.user1(self, client, clean_db)[0]
+
+        response = client.get("/get_friends_journey?friend=bob@example.com&format=polyline&precision=6",
+                              headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        journey = response.json['data'][0]
+        assert imports.decode_polyline(journey['polyline'], 6).tolist() == [[38.5, -120.2], [38.6, -120.3]]
+
+    def test_polyline_reference_encoding(self):
+        """Test the polyline encoder against the reference example from the format documentation."""
+
+        points = imports.np.array([[38.5, -120.2], [40.7, -120.95], [43.252, -126.453]])
+        assert imports.encode_polyline(points, 5) == '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+
+    def test_get_journeys_without_points(self, client, clean_db):
+        """Test getting only the journey summaries."""
+
+        token = imports.users.user1(self, client, clean_db)[0]
+
+        response = client.get("/get_journeys_of_user?include_points=false", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        assert len(response.json['data']) == 3
+        assert 'points' not in response.json['data'][0]
+        assert response.json['data'][0]['name'] == "Morning Run"
+
+    def test_get_journey_points_paged(self, client, clean_db):
+        """Test paging through the points of a journey."""
+
+        token = imports.users.user1(self, client, clean_db)[0]
+
+        response = client.get("/journey/1/points?offset=1&limit=5", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        assert response.json['data']['total'] == 2
+        assert response.json['data']['points'] == [{"lat": 38.6, "lon": -120.3, "ele": 110}]
+
+        response = client.get("/journey/1/points?offset=5", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        assert response.json['data']['points'] == []
+
+        response = client.get("/journey/1/points?limit=0", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 400
+
+    def test_get_journey_points_not_belong_to_user(self, client, clean_db):
+        """Test paging through the points of another user's journey."""
+
+        token = imports.users.user1(self, client, clean_db)[0]
+
+        response = client.get("/journey/4/points", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 403
+
+        response = client.get("/journey/99/points", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 404
+
+    def test_validate_points_reports_first_bad_point(self):
+        """Test that validation names the index and reason of the first invalid point."""
+
+        points = [{'lat': 10, 'lon': 20, 'ele': 5} for _ in range(50)]
+        points[7] = {'lat': 15, 'lon': 25}
+        points[9] = {'lat': 'invalid', 'lon': 25, 'ele': 10}
+        valid, error_message = imports.GPSRoutes.validate_points(points)
+        assert valid == False
+        assert error_message == "Point 7: Missing keys: ele"
+
+        points[7] = {'lat': 15, 'lon': 25, 'ele': 1}
+        valid, error_message = imports.GPSRoutes.validate_points(points)
+        assert error_message == "Point 9: Invalid value for lat: invalid. Must be a numerical value."
+
+    def test_validate_points_ranges_and_non_finite(self):
+        """Test that out of range and non finite values are rejected."""
+
+        base = [{'lat': 10, 'lon': 20, 'ele': 5}, {'lat': 11, 'lon': 21, 'ele': 6}]
+        cases = [
+            ({'lat': 91, 'lon': 20, 'ele': 5}, "lat"),
+            ({'lat': 10, 'lon': -180.5, 'ele': 5}, "lon"),
+            ({'lat': 10, 'lon': 20, 'ele': float('nan')}, "ele"),
+            ({'lat': float('inf'), 'lon': 20, 'ele': 5}, "lat"),
+            ({'lat': True, 'lon': 20, 'ele': 5}, "lat"),
+            # Beyond float32 and the int32 millimetres of compressed tracks
+            ({'lat': 10, 'lon': 20, 'ele': 1e39}, "ele"),
+            ({'lat': 10, 'lon': 20, 'ele': -100000.5}, "ele"),
+        ]
+        for bad_point, key in cases:
+            valid, error_message = imports.GPSRoutes.validate_points(base + [bad_point])
+            assert valid == False
+            assert error_message.startswith(f"Point 2: Invalid value for {key}")
+
+        assert imports.GPSRoutes.validate_points(base + ['point'])[1] == "Point 2: Must be an object with lat, lon and ele"
+        assert imports.GPSRoutes.validate_points({'lat': 10})[1] == "Points must be a list"
+        assert imports.GPSRoutes.validate_points([])[1] == "No data provided"
+        assert imports.GPSRoutes.validate_points([{'lat': 90, 'lon': -180, 'ele': -400.5}]) == (True, "")
+        assert imports.GPSRoutes.validate_points([{'lat': 0, 'lon': 0, 'ele': 100000}]) == (True, "")
+
+    def test_convert_journey_streams_valid_gpx(self, client, clean_db):
+        """Test that the streamed GPX document is well formed and contains every point."""
+
+        token = imports.users.user1(self, client, clean_db)[0]
+
+        response = client.get("/convert_journey_to_gpx/1", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        assert response.is_streamed
+
+        namespace = {'gpx': 'http://www.topografix.com/GPX/1/1'}
+        root = imports.ET.fromstring(response.data)
+        assert root.find('gpx:trk/gpx:name', namespace).text == "Morning Run"
+        points = root.findall('gpx:trk/gpx:trkseg/gpx:trkpt', namespace)
+        assert [(p.get('lat'), p.get('lon'), p.find('gpx:ele', namespace).text) for p in points] == [
+            ('38.5', '-120.2', '100.0'), ('38.6', '-120.3', '110.0')]
+
+    def test_generate_gpx_in_chunks(self):
+        """Test that long tracks are written in chunks and special characters are escaped."""
+
+        track = imports.np.column_stack((imports.np.linspace(50, 51, 25), imports.np.linspace(0, 1, 25), imports.np.arange(25)))
+        parts = list(imports.generate_gpx('Fish & <Chips>', 'Run', 'A "quoted" name', '2024-03-12T00:00:00',
+                                          imports.encode_points(track), chunk_size=10))
+
+        # header, three chunks of points and the closing tags
+        assert len(parts) == 5
+        root = imports.ET.fromstring(''.join(parts))
+        assert root.get('creator') == 'A "quoted" name'
+        assert len(list(root.iter('{http://www.topografix.com/GPX/1/1}trkpt'))) == 25
+
+    def test_import_journey_gpx(self, client, clean_db):
+        """Test importing a journey from a GPX file."""
+
+        token = imports.users.user2(self, client, clean_db)[0]
+        gpx = b"""<?xml version="1.0" encoding="UTF-8"?>
+        <gpx version="1.1" creator="watch" xmlns="http://www.topografix.com/GPX/1/1">
+          <metadata><name>Park Loop</name></metadata>
+          <trk><type>running</type><trkseg>
+            <trkpt lat="51.5" lon="-0.1"><ele>10</ele><time>2024-03-12T07:30:00Z</time></trkpt>
+            <trkpt lat="51.501" lon="-0.1"><time>2024-03-12T07:31:00Z</time></trkpt>
+            <trkpt lat="51.502" lon="-0.1"><ele>20</ele><time>2024-03-12T07:32:10Z</time></trkpt>
+          </trkseg></trk>
+        </gpx>"""
+
+        response = client.post("/import_journey", data={"file": (imports.io.BytesIO(gpx), "loop.gpx")},
+                               headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 201
+        assert response.json['points'] == 3
+
+        journey = client.get("/get_journeys_of_user", headers={"Authorization": f"Bearer {token}"}).json['data'][0]
+        assert journey['name'] == "Park Loop"
+        assert journey['type'] == "Run"
+        assert journey['startTime'] == "07:30:00" and journey['endTime'] == "07:32:10"
+        assert journey['dateCreated'] == "12-03-2024"
+        assert [point['ele'] for point in journey['points']] == [10, 15, 20]
+
+    def test_import_journey_tcx(self, client, clean_db):
+        """Test importing a journey from a TCX file, with form fields overriding the file."""
+
+        token = imports.users.user2(self, client, clean_db)[0]
+        tcx = b"""<?xml version="1.0" encoding="UTF-8"?>
+        <TrainingCenterDatabase xmlns="http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2">
+          <Activities><Activity Sport="Biking"><Lap><Track>
+            <Trackpoint><Time>2024-03-12T07:30:00Z</Time>
+              <Position><LatitudeDegrees>51.5</LatitudeDegrees><LongitudeDegrees>-0.1</LongitudeDegrees></Position>
+              <AltitudeMeters>12.5</AltitudeMeters></Trackpoint>
+            <Trackpoint><Time>2024-03-12T07:30:05Z</Time><HeartRateBpm><Value>120</Value></HeartRateBpm></Trackpoint>
+            <Trackpoint><Time>2024-03-12T08:00:00Z</Time>
+              <Position><LatitudeDegrees>51.6</LatitudeDegrees><LongitudeDegrees>-0.2</LongitudeDegrees></Position>
+              <AltitudeMeters>14</AltitudeMeters></Trackpoint>
+          </Track></Lap></Activity></Activities>
+        </TrainingCenterDatabase>"""
+
+        response = client.post("/import_journey",
+                               data={"file": (imports.io.BytesIO(tcx), "ride.tcx"), "name": "Commute"},
+                               headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 201
+        assert response.json['points'] == 2
+
+        journey = client.get("/get_journeys_of_user", headers={"Authorization": f"Bearer {token}"}).json['data'][0]
+        assert journey['name'] == "Commute"
+        assert journey['type'] == "Cycle"
+        assert journey['endTime'] == "08:00:00"
+
+    def test_import_journey_invalid_files(self, client, clean_db):
+        """Test importing malformed files and files missing required information."""
+
+        token = imports.users.user2(self, client, clean_db)[0]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        response = client.post("/import_journey", data={}, headers=headers)
+        assert response.status_code == 400
+
+        response = client.post("/import_journey", data={"file": (imports.io.BytesIO(b"<gpx><trk>"), "bad.gpx")}, headers=headers)
+        assert response.status_code == 400
+        assert 'Invalid GPX/TCX file' in response.json['message']
+
+        no_times = b'<gpx><trk><type>walking</type><trkseg><trkpt lat="95" lon="0"/></trkseg></trk></gpx>'
+        response = client.post("/import_journey", data={"file": (imports.io.BytesIO(no_times), "a.gpx")}, headers=headers)
+        assert response.json['message'] == 'Invalid points data: Point 0: Invalid value for lat: 95.0. Must be between -90 and 90.'
+
+        no_times = b'<gpx><trk><type>walking</type><trkseg><trkpt lat="50" lon="0"/></trkseg></trk></gpx>'
+        response = client.post("/import_journey", data={"file": (imports.io.BytesIO(no_times), "a.gpx")}, headers=headers)
+        assert response.json['message'] == 'Missing field: startTime'
+
+        response = client.post("/import_journey", data={"file": (imports.io.BytesIO(no_times), "a.gpx"), "startTime": "10:00:00",
+                                                        "endTime": "10:30:00", "dateCreated": "2024-03-12"}, headers=headers)
+        assert response.status_code == 201
+
+    def test_create_journeys_batch(self, client, clean_db):
+        """Test creating several journeys at once with per item results."""
+
+        token = imports.users.user2(self, client, clean_db)[0]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        journey_data = {
+            "name": "Morning Run",
+            "type": "Run",
+            "totalDistance": 5.0,
+            "points": [
+                {"lat": 38.5, "lon": -120.2, "ele": 100},
+                {"lat": 38.6, "lon": -120.3, "ele": 110}
+            ],
+            "startTime": "07:30:00",
+            "endTime": "08:15:00",
+            "dateCreated": "2024-03-12"
+        }
+        invalid_journey = dict(journey_data, type="Swim")
+
+        response = client.post("/create_journeys_batch", json={"journeys": [journey_data, invalid_journey, journey_data]}, headers=headers)
+        assert response.status_code == 207
+        assert response.json['created'] == 2
+        results = response.json['results']
+        assert [result['status'] for result in results] == [201, 400, 201]
+        assert results[1]['message'] == 'Invalid journey type. Must be Run, Walk, or Cycle'
+        assert results[0]['id'] != results[2]['id']
+
+        response = client.get("/get_journeys_of_user?include_points=false", headers=headers)
+        assert len(response.json['data']) == 2
+
+        response = client.post("/create_journeys_batch", json={"journeys": [journey_data]}, headers=headers)
+        assert response.status_code == 201
+
+        response = client.post("/create_journeys_batch", json={"journeys": [invalid_journey, "journey"]}, headers=headers)
+        assert response.status_code == 400
+        assert response.json['results'][1]['message'] == 'Journey data must be an object'
+
+        response = client.post("/create_journeys_batch", json={"journeys": []}, headers=headers)
+        assert response.status_code == 400
+
+    def test_journeys_within_bbox(self, client, clean_db):
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        journey = imports.db.session.get(imports.models.Journey, 1)
+        assert (journey.minLat, journey.maxLat, journey.minLon, journey.maxLon) == (38.5, 38.6, -120.3, -120.2)
+
+        # A diagonal track whose bounding box covers (1, 9) without any point near it
+        response = client.post("/create_journey", json={
+            "name": "Diagonal",
+            "type": "Walk",
+            "points": [{"lat": 0, "lon": 0, "ele": 0}, {"lat": 10, "lon": 10, "ele": 0}],
+            "startTime": "07:30:00",
+            "endTime": "08:15:00",
+            "dateCreated": "2024-03-12"
+        }, headers=headers)
+        assert response.status_code == 201
+        diagonal_id = imports.models.Journey.query.filter_by(name="Diagonal").first().id
+
+        response = client.get("/journeys/within?bbox=-120.25,38.45,-120.15,38.55", headers=headers)
+        assert response.status_code == 200
+        assert [journey['id'] for journey in response.json["data"]] == [1]
+        assert response.json['data'][0]['bbox'] == [-120.3, 38.5, -120.2, 38.6]
+
+        bbox = (1.0, 8.0, 2.0, 9.0)
+        assert imports.spatialIndex.candidate_ids(imports.db.session, id, bbox) == [diagonal_id]
+        response = client.get("/journeys/within?bbox=1,8,2,9", headers=headers)
+        assert response.json['data'] == []
+
+        response = client.get("/journeys/within?bbox=-1,-1,1,1", headers=headers)
+        assert [journey['id'] for journey in response.json['data']] == [diagonal_id]
+
+        # A small box crossed by the segment, with the two points on opposite sides of it
+        response = client.get("/journeys/within?bbox=4.9,4.9,5.1,5.1", headers=headers)
+        assert [journey['id'] for journey in response.json['data']] == [diagonal_id]
+
+        # Moving a journey updates the index through the triggers
+        client.put(f"/update_journey/{diagonal_id}", json={"points": [{"lat": 50, "lon": 50, "ele": 0}]}, headers=headers)
+        response = client.get("/journeys/within?bbox=-1,-1,1,1", headers=headers)
+        assert response.json['data'] == []
+
+        # Other users' journeys are never returned
+        response = client.get("/journeys/within?bbox=-1,-1,1,1", headers={"Authorization": f"Bearer {token2}"})
+        assert response.json['data'] == []
+
+        for bbox in ["", "1,2,3", "a,b,c,d", "2,0,1,1", "0,0,1,91"]:
+            response = client.get(f"/journeys/within?bbox={bbox}", headers=headers)
+            assert response.status_code == 400
+
+    def test_get_journeys_keyset_pagination(self, client, clean_db):
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        # Journey 3 is the newest; journeys 1 and 2 share a date and are ordered by id
+        response = client.get("/get_journeys_of_user?limit=2&include_points=false", headers=headers)
+        assert response.status_code == 200
+        assert [journey['id'] for journey in response.json['data']] == [3, 2]
+        cursor = response.json['nextCursor']
+        assert cursor
+
+        # A journey created between pages does not shift the next page
+        client.post("/create_journey", json={
+            "name": "Latest Run",
+            "type": "Run",
+            "points": [{"lat": 38.5, "lon": -120.2, "ele": 100}],
+            "startTime": "07:30:00",
+            "endTime": "08:15:00",
+            "dateCreated": "2024-03-20"
+        }, headers=headers)
+
+        response = client.get(f"/get_journeys_of_user?limit=2&cursor={cursor}", headers=headers)
+        assert [journey['id'] for journey in response.json['data']] == [1]
+        assert response.json['data'][0]['points'] == [{'lat': 38.5, 'lon': -120.2, 'ele': 100}, {'lat': 38.6, 'lon': -120.3, 'ele': 110}]
+        assert response.json['nextCursor'] is None
+
+        response = client.get("/get_journeys_of_user", headers=headers)
+        assert 'nextCursor' not in response.json
+        assert [journey['id'] for journey in response.json['data']] == [1, 2, 3, 7]
+
+        for query in ["limit=0", "cursor=notacursor"]:
+            response = client.get(f"/get_journeys_of_user?{query}", headers=headers)
+            assert response.status_code == 400
+
+    def test_get_journeys_filters(self, client, clean_db):
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        response = client.get("/get_journeys_of_user?type=Walk&include_points=false", headers=headers)
+        assert [journey['id'] for journey in response.json['data']] == [2]
+
+        response = client.get("/get_journeys_of_user?from=2024-03-13&include_points=false", headers=headers)
+        assert [journey['id'] for journey in response.json['data']] == [3]
+
+        response = client.get("/get_journeys_of_user?to=2024-03-12&limit=5&include_points=false", headers=headers)
+        assert [journey['id'] for journey in response.json['data']] == [2, 1]
+
+        response = client.get("/get_journeys_of_user?from=2024-03-14", headers=headers)
+        assert response.status_code == 404
+
+        for query in ["type=Swim", "from=12-03-2024", "to=2024-13-01"]:
+            response = client.get(f"/get_journeys_of_user?{query}", headers=headers)
+            assert response.status_code == 400
+
+        plan = imports.db.session.execute(imports.db.text(
+            "EXPLAIN QUERY PLAN SELECT id FROM journey WHERE userId = 1 AND (dateCreated, id) < ('2024-03-13', 3) "
+            "ORDER BY dateCreated DESC, id DESC LIMIT 3")).fetchall()
+        assert any('ix_journey_user_date_id' in row[-1] for row in plan)
+
+    def test_delete_journey_of_other_user(self, client, clean_db):
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+
+        # Journey 4 belongs to Bob
+        response = client.delete("/delete_journey/4", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 404
+        assert imports.db.session.get(imports.models.Journey, 4) is not None
+
+        response = client.delete("/delete_journey/1", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 200
+        assert imports.models.JourneyLOD.query.filter_by(journeyId=1).count() == 0
+
+    def test_delete_journeys_bulk(self, client, clean_db):
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        response = client.post("/delete_journeys", json={"ids": [1, 3, 4, 99]}, headers=headers)
+        assert response.status_code == 200
+        assert response.json['deleted'] == [1, 3]
+        assert response.json['notFound'] == [4, 99]
+
+        remaining = [journey.id for journey in imports.models.Journey.query.order_by(imports.models.Journey.id)]
+        assert remaining == [2, 4, 5, 6]
+        assert imports.models.JourneyLOD.query.filter(imports.models.JourneyLOD.journeyId.in_([1, 3])).count() == 0
+        assert client.get("/heatmap/0/0/0", headers=headers).json['data']['max'] == 1
+
+        response = client.post("/delete_journeys", json={"ids": [1, 3]}, headers=headers)
+        assert response.status_code == 404
+
+        for body in [{}, {"ids": []}, {"ids": ["1"]}, {"ids": list(range(imports.GPSRoutes.MAX_BATCH_SIZE + 1))}]:
+            response = client.post("/delete_journeys", json=body, headers=headers)
+            assert response.status_code == 400
+
+    def test_conditional_get_journeys_and_gpx(self, client, clean_db):
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        response = client.get("/get_journeys_of_user", headers=headers)
+        etag = response.headers['ETag']
+        assert response.headers['Cache-Control'] == 'private, no-cache'
+
+        response = client.get("/get_journeys_of_user", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+
+        # Different query parameters are a different representation
+        response = client.get("/get_journeys_of_user?format=polyline", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+        gpx_etag = client.get("/convert_journey_to_gpx/1", headers=headers).headers['ETag']
+        response = client.get("/convert_journey_to_gpx/1", headers={**headers, "If-None-Match": gpx_etag})
+        assert response.status_code == 304
+
+        # Ownership is checked before the ETag, and the creator name is part of it
+        response = client.get("/convert_journey_to_gpx/1", headers={"Authorization": f"Bearer {token2}", "If-None-Match": gpx_etag})
+        assert response.status_code == 403
+        imports.db.session.get(imports.models.User, id).first_name = "Johnny"
+        imports.db.session.commit()
+        response = client.get("/convert_journey_to_gpx/1", headers={**headers, "If-None-Match": gpx_etag})
+        assert response.status_code == 200
+        assert b'Johnny' in response.data
+        gpx_etag = response.headers['ETag']
+
+        # Every journey write bumps the data version of its owner only
+        bob_etag = client.get("/get_journeys_of_user", headers={"Authorization": f"Bearer {token2}"}).headers['ETag']
+        version = imports.db.session.get(imports.models.User, id).dataVersion
+        client.put("/update_journey/2", json={"name": "Renamed Walk"}, headers=headers)
+        imports.db.session.expire_all()
+        assert imports.db.session.get(imports.models.User, id).dataVersion == version + 1
+
+        response = client.get("/get_journeys_of_user", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json['data'][1]['name'] == "Renamed Walk"
+        response = client.get("/convert_journey_to_gpx/1", headers={**headers, "If-None-Match": gpx_etag})
+        assert response.status_code == 200
+
+        response = client.get("/get_journeys_of_user", headers={"Authorization": f"Bearer {token2}", "If-None-Match": bob_etag})
+        assert response.status_code == 304
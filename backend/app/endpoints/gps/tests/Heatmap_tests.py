@@ -0,0 +1,94 @@
+from app.endpoints.imports import imports
+from app.endpoints.gps import heatmap
+import numpy as np
+
+class TestHeatmap:
+    """Class for testing the incrementally maintained heatmap tiles."""
+
+    def stored_tiles(self, userId):
+        tiles = imports.models.HeatmapTile.query.filter_by(userId=userId).all()
+        return {(tile.zoom, tile.x, tile.y): bytes(tile.counts) for tile in tiles}
+
+    def test_tile_cells_single_point(self):
+        cells = heatmap.tile_cells(np.array([[0.0, 0.0, 0.0]]), 0)
+        assert list(cells) == [(0, 0)]
+        assert cells[(0, 0)].tolist() == [32 * heatmap.GRID_SIZE + 32]
+
+        cells = heatmap.tile_cells(np.array([[0.0, 0.0, 0.0]]), 1)
+        assert list(cells) == [(1, 1)]
+        assert cells[(1, 1)].tolist() == [0]
+
+    def test_tile_cells_fills_segments(self):
+        # 0.01 degrees of longitude is about 1.1 km: joined below MAX_GAP_M, not above it
+        short = np.array([[0.0, 0.0, 0.0], [0.0, 0.004, 0.0]])
+        long = np.array([[0.0, 0.0, 0.0], [0.0, 0.01, 0.0]])
+        zoom = 16
+
+        cells = np.concatenate(list(heatmap.tile_cells(short, zoom).values()))
+        assert len(cells) > 2
+        assert len(np.concatenate(list(heatmap.tile_cells(long, zoom).values()))) == 2
+
+        # A track touching the same cell repeatedly counts it once
+        loop = np.vstack([short, short[::-1], short])
+        assert sorted(np.concatenate(list(heatmap.tile_cells(loop, zoom).values()))) == sorted(cells)
+
+    def test_tile_cells_across_antimeridian(self):
+        # About 110 m across the antimeridian: the two points are marked, not the world between them
+        track = np.array([[0.0, 179.9995, 0.0], [0.0, -179.9995, 0.0]])
+        for zoom in (0, 4, heatmap.MAX_ZOOM):
+            cells = heatmap.tile_cells(track, zoom)
+            assert len(cells) <= 2
+            assert sum(len(group) for group in cells.values()) == 2
+
+    def test_tiles_stored_sparse(self):
+        counts = np.zeros(heatmap.GRID_SIZE * heatmap.GRID_SIZE, dtype=np.int32)
+        counts[[0, 5, heatmap.GRID_SIZE * heatmap.GRID_SIZE - 1]] = [1, 3, 2]
+        blob = heatmap.pack_counts(counts)
+        assert len(blob) == 3 * heatmap.CELL_DTYPE.itemsize
+        assert np.array_equal(heatmap.unpack_counts(blob), counts)
+
+    def test_heatmap_tile_endpoint(self, client, clean_db):
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        response = client.get("/heatmap/0/0/0", headers=headers)
+        assert response.status_code == 200
+        data = response.json['data']
+        assert data['size'] == heatmap.GRID_SIZE
+        assert len(data['counts']) == heatmap.GRID_SIZE
+        # All three journeys of the user are in the same cell at zoom 0
+        assert data['max'] == 3
+        assert sum(map(sum, data['counts'])) == 3
+
+        response = client.get("/heatmap/1/1/1", headers=headers)
+        assert response.json['data']['max'] == 0
+
+        for path in ["/heatmap/17/0/0", "/heatmap/1/2/0", "/heatmap/3/0/8"]:
+            assert client.get(path, headers=headers).status_code == 400
+
+    def test_heatmap_incremental_matches_rebuild(self, client, clean_db):
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        client.put("/update_journey/2", json={"points": [
+            {"lat": 51.5, "lon": -0.12, "ele": 10}, {"lat": 51.501, "lon": -0.121, "ele": 11}
+        ]}, headers=headers)
+        client.delete("/delete_journey/1", headers=headers)
+
+        response = client.get("/heatmap/0/0/0", headers=headers)
+        assert response.json['data']['max'] == 1
+        assert sum(map(sum, response.json['data']['counts'])) == 2
+
+        incremental = self.stored_tiles(id)
+        assert heatmap.rebuild_user(imports.db.session, id) == 2
+        imports.db.session.commit()
+        assert self.stored_tiles(id) == incremental
+
+        # Removing every journey leaves no tiles behind
+        client.delete("/delete_journey/2", headers=headers)
+        client.delete("/delete_journey/3", headers=headers)
+        assert self.stored_tiles(id) == {}
+
+        # The other user's tiles are untouched
+        response = client.get("/heatmap/0/0/0", headers={"Authorization": f"Bearer {token2}"})
+        assert response.json['data']['max'] == 3
@@ -0,0 +1,23 @@
+from app.endpoints.gps.lruCache import LRUCache, clear_all
+
+class TestLRUCache:
+    """Class for testing the in-process LRU cache of derived responses."""
+
+    def test_eviction_and_discard(self):
+        cache = LRUCache(2)
+        cache.put((1, 'a'), 'first')
+        cache.put((2, 'a'), 'second')
+        # Reading an entry makes it the most recently used
+        assert cache.get((1, 'a')) == 'first'
+        cache.put((3, 'a'), 'third')
+        assert cache.get((2, 'a')) is None
+        assert len(cache) == 2
+
+        # Entries are discarded by owner, the first item of their keys
+        cache.put((1, 'b'), 'other')
+        cache.discard([1])
+        assert cache.get((1, 'a')) is None and cache.get((1, 'b')) is None
+
+        cache.put((4, 'a'), 'fourth')
+        clear_all()
+        assert len(cache) == 0
@@ -0,0 +1,114 @@
+from app.endpoints.imports import imports
+from app.endpoints.gps import pointCodec, pointStore
+import numpy as np
+
+class TestPointCodec:
+    """Class for testing the packed journey point storage."""
+
+    def test_encode_decode_round_trip(self):
+        points = [
+            {'lat': 38.5, 'lon': -120.2, 'ele': 100},
+            {'lat': -33.8688197, 'lon': 151.2092955, 'ele': 58.25}
+        ]
+        blob = pointCodec.encode_points(points)
+
+        assert pointCodec.is_packed(blob)
+        assert len(blob) == pointCodec.HEADER.size + 12 * len(points)
+        assert pointCodec.points_to_dicts(pointCodec.decode_points(blob)) == points
+
+    def test_decode_legacy_json(self):
+        legacy = '[{"lat": 10, "lon": 20, "ele": 5}]'
+
+        assert not pointCodec.is_packed(legacy.encode('utf-8'))
+        assert pointCodec.decode_points(legacy).tolist() == [[10, 20, 5]]
+        assert pointCodec.decode_points(legacy.encode('utf-8')).tolist() == [[10, 20, 5]]
+
+    def test_decode_empty(self):
+        assert pointCodec.decode_points(b'').shape == (0, 3)
+        assert pointCodec.decode_points(None).shape == (0, 3)
+
+    def test_encode_array(self):
+        array = np.array([[51.5, -0.12, 11.0], [51.6, -0.13, 12.5]])
+        decoded = pointCodec.decode_points(pointCodec.encode_points(array))
+        assert np.allclose(decoded, array)
+
+    def test_encode_decode_times(self):
+        times = np.array([1710228600000, 1710228601000, 1710228601000, 1710232200500])
+        blob = pointCodec.encode_times(times)
+
+        assert len(blob) == pointCodec.TIMES_HEADER.size + 4 * (len(times) - 1)
+        assert pointCodec.decode_times(blob).tolist() == times.tolist()
+        assert pointCodec.decode_times(pointCodec.encode_times(times[:1])).tolist() == times[:1].tolist()
+        assert pointCodec.decode_times(None) is None
+
+    def test_legacy_rows_migrated(self, client, clean_db):
+        token, id, *_ = imports.users.user1(self, client, clean_db)
+
+        # Write a journey the way it was stored before the packed format and point_blob: as
+        # JSON in the journey row, without LOD levels
+        legacy = '[{"lat": 38.5, "lon": -120.2, "ele": 100}]'
+        with imports.db.engine.begin() as connection:
+            connection.exec_driver_sql('ALTER TABLE journey ADD COLUMN points BLOB')
+            connection.exec_driver_sql('UPDATE journey SET points = ?, "pointsHash" = NULL WHERE id = 1', (legacy,))
+            connection.exec_driver_sql('DELETE FROM journey_lod WHERE "journeyId" = 1')
+        clean_db.session.expire_all()
+
+        # The first request moves the tracks out of journey.points, so the legacy row is
+        # readable straight away
+        pointStore._migrated = False
+        headers = {"Authorization": f"Bearer {token}"}
+        response = client.get("/get_journeys_of_user", headers=headers)
+        assert response.status_code == 200
+        assert response.json['data'][0]['points'] == [{'lat': 38.5, 'lon': -120.2, 'ele': 100}]
+        columns = {column['name'] for column in imports.db.inspect(imports.db.engine).get_columns('journey')}
+        assert 'points' not in columns
+
+        from pack_points import move_points_to_blobs, pack_legacy_points
+        assert move_points_to_blobs() == 0
+        assert pack_legacy_points(batch_size=2) == 1
+        assert pack_legacy_points() == 0
+
+        journey = imports.db.session.get(imports.models.Journey, 1)
+        assert pointCodec.is_packed(journey.points)
+        assert journey.point_array.tolist() == [[38.5, -120.2, 100]]
+        assert journey.lods
+
+        response = client.get("/get_journeys_of_user", headers=headers)
+        assert response.json['data'][0]['points'] == [{'lat': 38.5, 'lon': -120.2, 'ele': 100}]
+
+    def test_failed_migration_only_refuses_journey_routes(self, client, clean_db, monkeypatch):
+        from app.endpoints.gps import schemaMigration
+
+        token, id, *_ = imports.users.user1(self, client, clean_db)
+        with imports.db.engine.begin() as connection:
+            connection.exec_driver_sql('ALTER TABLE journey ADD COLUMN points BLOB')
+
+        def fail(*args, **kw):
+            raise RuntimeError('disk full')
+        monkeypatch.setattr(schemaMigration, 'move_points_to_blobs', fail)
+        monkeypatch.setattr(schemaMigration, '_failed', False)
+        monkeypatch.setattr(pointStore, '_migrated', False)
+
+        headers = {"Authorization": f"Bearer {token}"}
+        response = client.get("/get_journeys_of_user", headers=headers)
+        assert response.status_code == 503
+        assert 'pack_points.py' in response.json['message']
+        assert client.get("/list_friends", headers=headers).status_code == 200
+
+        with imports.db.engine.begin() as connection:
+            connection.exec_driver_sql('ALTER TABLE journey DROP COLUMN points')
+        monkeypatch.setattr(pointStore, '_migrated', False)
+        assert client.get("/get_journeys_of_user", headers=headers).status_code == 200
+
+    def test_migration_adds_missing_columns(self, client, clean_db):
+        from pack_points import add_missing_columns
+
+        with imports.db.engine.begin() as connection:
+            connection.exec_driver_sql('ALTER TABLE journey DROP COLUMN "elevationLoss"')
+            connection.exec_driver_sql('ALTER TABLE user DROP COLUMN "dataVersion"')
+
+        add_missing_columns()
+        columns = {column['name'] for column in imports.db.inspect(imports.db.engine).get_columns('journey')}
+        assert 'elevationLoss' in columns
+        columns = {column['name']: column for column in imports.db.inspect(imports.db.engine).get_columns('user')}
+        assert not columns['dataVersion']['nullable']
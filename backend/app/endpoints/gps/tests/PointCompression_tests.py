@@ -0,0 +1,122 @@
+from app.endpoints.imports import imports
+from app.endpoints.gps import pointCodec, pointCompression
+import numpy as np
+from sqlalchemy import event
+
+class TestPointCompression:
+    """Class for testing the optional compressed journey point storage."""
+
+    def random_track(self, n, seed=0):
+        rng = np.random.default_rng(seed)
+        return np.column_stack((
+            51.5 + np.cumsum(rng.normal(0, 1e-5, n)),
+            -0.12 + np.cumsum(rng.normal(0, 1e-5, n)),
+            100 + np.cumsum(rng.normal(0, 0.2, n)),
+        ))
+
+    def codecs(self):
+        codecs = [pointCompression.CODEC_ZLIB]
+        if pointCompression.zstandard is not None:
+            codecs.append(pointCompression.CODEC_ZSTD)
+        return codecs
+
+    def raw_journey_points(self, journey_id):
+        """The stored blob of a journey's track, as written to point_blob."""
+        table = imports.models.PointBlob.__table__
+        journey = imports.models.Journey.__table__
+        return imports.db.session.execute(
+            imports.db.select(imports.db.type_coerce(table.c.points, imports.db.LargeBinary))
+            .join(journey, journey.c.pointsHash == table.c.hash).where(journey.c.id == journey_id)).scalar()
+
+    def test_compress_round_trip(self):
+        track = self.random_track(2000)
+        # Extreme values exercise the wrapping int32 deltas
+        track[10] = [-89.9, 179.9, -400.5]
+        track[11] = [89.9, -179.9, 8848.125]
+        blob = pointCodec.encode_points(track)
+
+        for codec in self.codecs():
+            compressed = pointCompression.compress_blob(blob, codec)
+            assert pointCompression.is_compressed(compressed)
+            assert len(compressed) < len(blob) / 2
+            restored = pointCompression.decompress_blob(compressed)
+            assert np.array_equal(pointCodec.decode_points(restored), pointCodec.decode_points(blob))
+
+            empty = pointCodec.encode_points(np.empty((0, 3)))
+            assert pointCodec.decode_points(pointCompression.decompress_blob(
+                pointCompression.compress_blob(empty, codec))).shape == (0, 3)
+
+    def test_trained_dictionary(self):
+        samples = [pointCodec.encode_points(self.random_track(200, seed)) for seed in range(50)]
+        blob = pointCodec.encode_points(self.random_track(200, seed=99))
+
+        for codec in self.codecs():
+            dictionary = pointCompression.train_dictionary(samples, codec, 4096)
+            assert 0 < len(dictionary) <= 4096
+            compressed = pointCompression.compress_blob(blob, codec, dictionary, 7)
+            assert pointCompression.blob_dictionary_id(compressed) == 7
+            restored = pointCompression.decompress_blob(compressed, dictionary)
+            assert np.array_equal(pointCodec.decode_points(restored), pointCodec.decode_points(blob))
+
+    def raw_segment_points(self, segment_id):
+        """The stored blob of a segment's path."""
+        table = imports.models.Segment.__table__
+        return imports.db.session.execute(
+            imports.db.select(imports.db.type_coerce(table.c.points, imports.db.LargeBinary))
+            .where(table.c.id == segment_id)).scalar()
+
+    def test_compressed_storage_and_reencode(self, client, clean_db):
+        from compress_points import train, reencode
+
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+        original = client.get("/get_journeys_of_user", headers=headers).json['data']
+        segment_id = client.post("/segments", json={"name": "Ridge", "points": [
+            {"lat": 38.5, "lon": -120.2, "ele": 100}, {"lat": 38.6, "lon": -120.3, "ele": 110}
+        ]}, headers=headers).json['id']
+
+        imports.app.config['POINTS_COMPRESSION'] = 'zlib'
+        try:
+            # Existing packed rows are compressed without a dictionary until one is trained
+            rewritten, before, after = reencode(batch_size=2)
+            assert rewritten == (imports.models.PointBlob.query.count() + imports.models.JourneyLOD.query.count()
+                                 + imports.models.Segment.query.count())
+            assert pointCompression.is_compressed(self.raw_journey_points(1))
+            assert pointCompression.is_compressed(self.raw_segment_points(segment_id))
+            assert client.get("/get_journeys_of_user", headers=headers).json['data'] == original
+
+            dictionary_id = train('zlib')
+            assert dictionary_id
+            reencode()
+            raw = self.raw_journey_points(1)
+            assert pointCompression.blob_dictionary_id(raw) == dictionary_id
+            assert reencode() == (0, 0, 0)
+
+            # New journeys are written compressed with the newest dictionary, which is not
+            # looked up again for every blob
+            statements = []
+            def record(conn, cursor, statement, *args):
+                statements.append(statement)
+            event.listen(imports.db.engine, 'before_cursor_execute', record)
+            try:
+                client.put("/update_journey/2", json={"points": [{"lat": 51.5, "lon": -0.12, "ele": 10}]}, headers=headers)
+            finally:
+                event.remove(imports.db.engine, 'before_cursor_execute', record)
+            assert not [statement for statement in statements if 'point_dictionary' in statement]
+            assert pointCompression.blob_dictionary_id(self.raw_journey_points(2)) == dictionary_id
+
+            # Training a new dictionary makes it the one used from then on
+            assert train('zlib') == dictionary_id + 1
+            client.put("/update_journey/2", json={"points": [{"lat": 51.6, "lon": -0.12, "ele": 10}]}, headers=headers)
+            assert pointCompression.blob_dictionary_id(self.raw_journey_points(2)) == dictionary_id + 1
+            dictionary_id += 1
+            response = client.get("/journey/2/points", headers=headers)
+            assert response.json['data']['points'] == [{"lat": 51.6, "lon": -0.12, "ele": 10}]
+        finally:
+            imports.app.config['POINTS_COMPRESSION'] = None
+
+        # Turning compression off and re-encoding restores the packed format
+        reencode()
+        assert pointCodec.is_packed(self.raw_journey_points(1))
+        assert pointCodec.is_packed(self.raw_segment_points(segment_id))
+        assert client.get("/get_journeys_of_user", headers=headers).json['data'][0] == original[0]
@@ -0,0 +1,106 @@
+from app.endpoints.imports import imports
+from app.endpoints.gps import pointStore, pointCodec, idempotency
+from datetime import datetime, timedelta
+
+class TestPointStore:
+    """Class for testing the content-addressed track storage and idempotent journey uploads."""
+
+    journey_data = {
+        "name": "Commute",
+        "type": "Cycle",
+        "points": [{"lat": 51.5, "lon": -0.12, "ele": 10}, {"lat": 51.51, "lon": -0.13, "ele": 12}],
+        "startTime": "08:00:00",
+        "endTime": "08:30:00",
+        "dateCreated": "2024-03-12"
+    }
+
+    def ref_counts(self):
+        return {blob.hash: blob.refCount for blob in imports.models.PointBlob.query.all()}
+
+    def test_blobs_are_shared_and_counted(self, client, clean_db):
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        # Journeys with the same track share one blob
+        journeys = imports.models.Journey.query.all()
+        counts = self.ref_counts()
+        assert len(counts) == len({journey.pointsHash for journey in journeys}) < len(journeys)
+        assert sum(counts.values()) == len(journeys)
+        morning_run = imports.db.session.get(imports.models.Journey, 1)
+        assert morning_run.pointsHash == pointStore.content_hash(morning_run.points)
+        assert counts[morning_run.pointsHash] >= 2
+
+        # Saving new points moves the reference; the blob of the old track stays while used
+        old_hash, old_count = morning_run.pointsHash, counts[morning_run.pointsHash]
+        client.put("/update_journey/1", json={"points": self.journey_data["points"]}, headers=headers)
+        client.post("/create_journey", json=self.journey_data, headers=headers)
+        counts = self.ref_counts()
+        assert counts[old_hash] == old_count - 1
+        new_hash = pointStore.content_hash(pointCodec.encode_points(self.journey_data["points"]))
+        assert counts[new_hash] == 2
+        assert sum(counts.values()) == imports.models.Journey.query.count()
+
+        # Blobs are deleted with their last reference
+        client.delete("/delete_journey/1", headers=headers)
+        assert self.ref_counts()[new_hash] == 1
+        commute = imports.models.Journey.query.filter_by(name="Commute").first()
+        client.post("/delete_journeys", json={"ids": [commute.id]}, headers=headers)
+        assert new_hash not in self.ref_counts()
+
+    def test_read_points_range(self, client, clean_db):
+        import numpy as np
+        from app.endpoints.gps import pointCompression
+
+        array = np.column_stack((np.linspace(51.0, 51.1, 50), np.linspace(-0.1, -0.2, 50), np.arange(50.0)))
+        blob = pointCodec.encode_points(array)
+        key = pointStore.acquire(imports.db.session, blob)
+        imports.db.session.commit()
+
+        points, total = pointStore.read_points(imports.db.session, key, 10, 15)
+        assert total == 50
+        assert np.array_equal(points, pointCodec.decode_points(blob, 10, 15))
+        assert pointStore.read_points(imports.db.session, key, 48)[0].tolist() == pointCodec.decode_points(blob, 48).tolist()
+        assert len(pointStore.read_points(imports.db.session, key, 60)[0]) == 0
+        assert pointStore.read_points(imports.db.session, 'missing') is None
+
+        # Compressed blobs cannot be sliced in the database
+        imports.app.config['POINTS_COMPRESSION'] = 'zlib'
+        try:
+            key = pointStore.acquire(imports.db.session, pointCodec.encode_points(array[:5]))
+            imports.db.session.commit()
+            assert pointStore.read_points(imports.db.session, key) is None
+        finally:
+            imports.app.config['POINTS_COMPRESSION'] = None
+            pointCompression.clear_dictionary_cache()
+
+    def test_idempotent_create(self, client, clean_db):
+        token, id = imports.users.user2(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}", "Idempotency-Key": "upload-1"}
+
+        response = client.post("/create_journey", json=self.journey_data, headers=headers)
+        assert response.status_code == 201
+        assert idempotency.REPLAYED_HEADER not in response.headers
+        journey_id = response.json['id']
+
+        # A retry gets the same response and creates nothing
+        retry = client.post("/create_journey", json=self.journey_data, headers=headers)
+        assert retry.status_code == 201
+        assert retry.json == response.json
+        assert retry.headers[idempotency.REPLAYED_HEADER] == 'true'
+        assert imports.models.Journey.query.filter_by(userId=id).count() == 1
+
+        # The key cannot be reused for another request
+        other = dict(self.journey_data, name="Other")
+        assert client.post("/create_journey", json=other, headers=headers).status_code == 422
+        # Without a key, or with another one, journeys are created as usual
+        assert client.post("/create_journey", json=self.journey_data, headers={"Authorization": f"Bearer {token}"}).status_code == 201
+        assert client.post("/create_journey", json=other, headers=dict(headers, **{"Idempotency-Key": "upload-2"})).json['id'] != journey_id
+        assert client.post("/create_journey", json=other, headers=dict(headers, **{"Idempotency-Key": "x" * 256})).status_code == 400
+
+        # Expired keys are processed again
+        record = imports.models.IdempotencyKey.query.filter_by(userId=id, key="upload-1").first()
+        record.createdAt = datetime.now() - idempotency.KEY_TTL - timedelta(minutes=1)
+        imports.db.session.commit()
+        response = client.post("/create_journey", json=self.journey_data, headers=headers)
+        assert response.status_code == 201 and response.json['id'] != journey_id
+        assert imports.models.Journey.query.filter_by(userId=id).count() == 4
@@ -0,0 +1,106 @@
+from app.endpoints.imports import imports
+from app.endpoints.gps.Recording import RecordingRoutes
+
+class TestRecordingRoutes:
+    """Class for testing the live recording API."""
+
+    def start(self, client, token):
+        response = client.post("/recording/start", json={"name": "Live Walk", "type": "Walk"},
+                               headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 201
+        return response.json['id']
+
+    def test_record_journey(self, client, clean_db):
+        token, id = imports.users.user2(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+        recordingId = self.start(client, token)
+
+        chunks = [
+            [{"lat": 51.5, "lon": -0.12, "ele": 10}, {"lat": 51.501, "lon": -0.121, "ele": 12}],
+            [{"lat": 51.502, "lon": -0.122, "ele": 11}],
+        ]
+        response = client.post(f"/recording/{recordingId}/append", json={"points": chunks[0]}, headers=headers)
+        assert response.status_code == 200
+        assert response.json['seq'] == 0
+        assert response.json['pointCount'] == 2
+
+        response = client.post(f"/recording/{recordingId}/append", json={"seq": 1, "points": chunks[1]}, headers=headers)
+        assert response.json['pointCount'] == 3
+
+        # A retried chunk is not stored twice
+        response = client.post(f"/recording/{recordingId}/append", json={"seq": 1, "points": chunks[1]}, headers=headers)
+        assert response.json['message'] == 'Chunk already received'
+        assert response.json['pointCount'] == 3
+
+        response = client.get(f"/recording/{recordingId}", headers=headers)
+        assert response.json['data']['pointCount'] == 3
+        assert response.json['data']['lastSeq'] == 1
+
+        response = client.post(f"/recording/{recordingId}/finish", json={"endTime": "09:00:00"}, headers=headers)
+        assert response.status_code == 201
+        assert response.json['points'] == 3
+
+        journey = imports.db.session.get(imports.models.Journey, response.json['id'])
+        assert journey.name == "Live Walk"
+        assert journey.endTime.strftime('%H:%M:%S') == "09:00:00"
+        assert imports.points_to_dicts(journey.point_array) == chunks[0] + chunks[1]
+        assert journey.totalDistance == journey.computedDistance > 0
+        assert journey.elevationGain == 2
+        assert journey.lods
+
+        # The recording is gone once it has been finished
+        assert client.get(f"/recording/{recordingId}", headers=headers).status_code == 404
+        assert imports.models.RecordingChunk.query.count() == 0
+
+    def test_recording_errors(self, client, clean_db):
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        response = client.post("/recording/start", json={"name": "Swim", "type": "Swim"}, headers=headers)
+        assert response.status_code == 400
+        response = client.post("/recording/start", json={"type": "Run"}, headers=headers)
+        assert response.json['message'] == 'Missing field: name'
+
+        recordingId = self.start(client, token)
+        response = client.post(f"/recording/{recordingId}/finish", json={}, headers=headers)
+        assert response.json['message'] == 'No points recorded'
+
+        response = client.post(f"/recording/{recordingId}/append", json={"points": [{"lat": 95, "lon": 0, "ele": 0}]}, headers=headers)
+        assert response.status_code == 400
+        response = client.post(f"/recording/{recordingId}/append", json={"seq": -1, "points": [{"lat": 1, "lon": 0, "ele": 0}]}, headers=headers)
+        assert response.status_code == 400
+
+        # Recordings of other users cannot be read or changed
+        other = {"Authorization": f"Bearer {token2}"}
+        assert client.get(f"/recording/{recordingId}", headers=other).status_code == 403
+        response = client.post(f"/recording/{recordingId}/append", json={"points": [{"lat": 1, "lon": 0, "ele": 0}]}, headers=other)
+        assert response.status_code == 403
+        assert client.post("/recording/999/finish", json={}, headers=headers).status_code == 404
+
+    def test_recording_chunks_complete(self, client, clean_db, monkeypatch):
+        token, id = imports.users.user2(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+        recordingId = self.start(client, token)
+        point = {"lat": 51.5, "lon": -0.12, "ele": 10}
+
+        for seq in (0, 2, 4):
+            client.post(f"/recording/{recordingId}/append", json={"seq": seq, "points": [point]}, headers=headers)
+
+        # A recording with lost chunks is not turned into a journey
+        response = client.post(f"/recording/{recordingId}/finish", json={}, headers=headers)
+        assert response.status_code == 409
+        assert response.json['missing'] == [1, 3]
+        assert response.json['message'] == 'Missing chunks: 1, 3'
+
+        # Appends without a seq that lose a race for it are rejected, not stored
+        monkeypatch.setattr(RecordingRoutes, 'next_seq', lambda recording: 2)
+        response = client.post(f"/recording/{recordingId}/append", json={"points": [point, point]}, headers=headers)
+        assert response.status_code == 409
+        monkeypatch.undo()
+        assert client.get(f"/recording/{recordingId}", headers=headers).json['data']['pointCount'] == 3
+
+        for seq in (1, 3):
+            client.post(f"/recording/{recordingId}/append", json={"seq": seq, "points": [point]}, headers=headers)
+        response = client.post(f"/recording/{recordingId}/finish", json={}, headers=headers)
+        assert response.status_code == 201
+        assert response.json['points'] == 5
@@ -0,0 +1,67 @@
+from app.endpoints.imports import imports
+from app.endpoints.gps import resampling
+from app.endpoints.gps.trackProcessing import cumulative_distances
+import numpy as np
+
+class TestResampling:
+    """Class for testing the fixed-spacing resampling of journey tracks."""
+
+    def test_resample_track(self):
+        array = np.array([[51.0, -0.1, 10.0], [51.001, -0.1, 20.0], [51.001, -0.1, 20.0], [51.002, -0.1, 0.0]])
+        total = cumulative_distances(array)[-1]
+
+        series = resampling.resample_track(array, 50.0)
+        assert series['distance'][:3] == [0, 50, 100]
+        assert series['distance'][-1] == round(total, 2)
+        assert len(series['distance']) == int(total // 50) + 2
+        assert series['lat'][0] == 51.0 and series['lat'][-1] == 51.002
+        # Halfway to the second point, on the way up
+        halfway = series['distance'].index(50)
+        assert abs(series['ele'][halfway] - 10 - 10 * 50 / cumulative_distances(array)[1]) < 1e-3
+        assert 'time' not in series
+
+        times = np.array([0, 60000, 120000, 180000]) + 1710228600000
+        series = resampling.resample_track(array, 50.0, times)
+        # The stop at the second point is skipped, the first arrival is kept
+        assert series['time'][0] == 1710228600 and series['time'][-1] == 1710228780
+
+        single = resampling.resample_track(array[:1], 10.0)
+        assert single['distance'] == [0] and single['ele'] == [10]
+
+    def test_resample_endpoint(self, client, clean_db):
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+        token3, id3 = imports.users.user2(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        response = client.get("/journey/1/resample?step=1000", headers=headers)
+        assert response.status_code == 200
+        data = response.json['data']
+        assert data['step'] == 1000
+        assert data['distance'][1] == 1000
+        assert len(data['distance']) == len(data['lat']) == len(data['lon']) == len(data['ele'])
+        assert data['ele'][0] == 100 and data['ele'][-1] == 110
+
+        # The response is cached per journey version, points hash and step
+        points_hash = imports.db.session.get(imports.models.Journey, 1).pointsHash
+        assert points_hash in response.headers['ETag']
+        assert resampling.cache.get((1, 1, points_hash, 1000.0)) is not None
+        response = client.get("/journey/1/resample?step=1000", headers=dict(headers, **{"If-None-Match": response.headers['ETag']}))
+        assert response.status_code == 304
+
+        client.put("/update_journey/1", json={"points": [
+            {"lat": 51.5, "lon": -0.12, "ele": 10}, {"lat": 51.501, "lon": -0.121, "ele": 11}
+        ]}, headers=headers)
+        data = client.get("/journey/1/resample?step=1000", headers=headers).json['data']
+        assert data['lat'] == [51.5, 51.501]
+        points_hash = imports.db.session.get(imports.models.Journey, 1).pointsHash
+        assert resampling.cache.get((1, 2, points_hash, 1000.0)) is not None
+        client.delete("/delete_journey/1", headers=headers)
+        assert resampling.cache.get((1, 2, points_hash, 1000.0)) is None
+
+        assert client.get("/journey/2/resample?step=1000", headers={"Authorization": f"Bearer {token2}"}).status_code == 200
+        assert client.get("/journey/2/resample?step=1000", headers={"Authorization": f"Bearer {token3}"}).status_code == 403
+        for query in ("", "?step=abc", "?step=0.5", "?step=nan", "?step=0.9"):
+            assert client.get(f"/journey/2/resample{query}", headers=headers).status_code == 400
+        # More than MAX_SAMPLES samples
+        assert client.get("/journey/2/resample?step=1", headers=headers).status_code == 400
+        assert client.get("/journey/999/resample?step=10", headers=headers).status_code == 404
@@ -0,0 +1,116 @@
+from app.endpoints.imports import imports
+from app.endpoints.gps import segmentMatching
+from app.endpoints.gps.trackProcessing import segment_distances
+import backfill_segments
+import numpy as np
+
+class TestSegmentRoutes:
+    """Class for testing segments and the matching of journeys against them."""
+
+    # Path of the "Morning Run" journey of both test users
+    MORNING_RUN = [
+        {"lat": 38.5, "lon": -120.2, "ele": 100},
+        {"lat": 38.6, "lon": -120.3, "ele": 110}
+    ]
+
+    def straight_track(self, count=200):
+        return np.column_stack((np.linspace(51.0, 51.01, count), np.full(count, -1.0), np.zeros(count)))
+
+    def test_find_efforts(self):
+        track = self.straight_track()
+        segment = track[50:120].copy()
+
+        efforts = segmentMatching.find_efforts(track, segment)
+        assert len(efforts) == 1
+        start, end, distance = efforts[0]
+        assert (start, end) == (50, 119)
+        assert abs(distance - segment_distances(segment).sum()) < 1
+
+        # Every lap in the direction of the segment is an effort
+        laps = np.vstack((track, track[::-1], track))
+        assert [effort[:2] for effort in segmentMatching.find_efforts(laps, segment)] == [(50, 119), (450, 519)]
+        # A track prepared once gives the same efforts for every segment
+        prepared = segmentMatching.PreparedTrack(laps)
+        assert segmentMatching.find_efforts(prepared, segment) == segmentMatching.find_efforts(laps, segment)
+        assert segmentMatching.find_efforts(prepared, segment[::-1]) == segmentMatching.find_efforts(laps, segment[::-1])
+
+        # A parallel path 70 metres away, or a track that stops halfway, is not
+        parallel = track.copy()
+        parallel[:, 1] += 0.001
+        assert segmentMatching.find_efforts(parallel, segment) == []
+        assert segmentMatching.find_efforts(track[:90], segment) == []
+
+        # Leaving the segment between its ends is not an effort either
+        detour = track.copy()
+        detour[80:90, 1] += 0.002
+        assert segmentMatching.find_efforts(detour, segment) == []
+
+    def test_create_segment_backfills_journeys(self, client, clean_db):
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        response = client.post("/segments", json={"name": "Ridge", "points": self.MORNING_RUN}, headers=headers)
+        assert response.status_code == 201
+        # The "Morning Run" of both users is matched, but only the creator's own effort is counted
+        assert response.json['efforts'] == 1
+        segmentId = response.json['id']
+        assert imports.models.SegmentEffort.query.filter_by(segmentId=segmentId).count() == 2
+
+        response = client.get(f"/segments/{segmentId}", headers=headers)
+        assert response.status_code == 200
+        data = response.json['data']
+        assert data['name'] == "Ridge"
+        assert len(data['points']) == 2
+        assert [effort['journeyId'] for effort in data['efforts']] == [1]
+        assert data['efforts'][0]['journeyName'] == "Morning Run"
+
+        assert client.get("/segments/999", headers=headers).status_code == 404
+        assert client.post("/segments", json={"name": "Short", "points": self.MORNING_RUN[:1]}, headers=headers).status_code == 400
+        response = client.post("/segments", json={"name": "Short", "points": [
+            {"lat": 38.5, "lon": -120.2, "ele": 100}, {"lat": 38.5001, "lon": -120.2, "ele": 100}
+        ]}, headers=headers)
+        assert response.status_code == 400
+
+    def test_journeys_matched_on_ingest(self, client, clean_db):
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+        segmentId = client.post("/segments", json={"name": "Ridge", "points": self.MORNING_RUN}, headers=headers).json['id']
+
+        journey_data = {
+            "name": "Ridge Again",
+            "type": "Run",
+            "totalDistance": 14.0,
+            "points": self.MORNING_RUN,
+            "startTime": "07:30:00",
+            "endTime": "08:15:00",
+            "dateCreated": "2024-03-20"
+        }
+        assert client.post("/create_journey", json=journey_data, headers=headers).status_code == 201
+        journey = imports.models.Journey.query.filter_by(name="Ridge Again").first()
+
+        response = client.get(f"/journey/{journey.id}/efforts", headers=headers)
+        assert response.status_code == 200
+        assert [(effort['segmentId'], effort['segmentName']) for effort in response.json['data']] == [(segmentId, "Ridge")]
+        assert client.get(f"/journey/{journey.id}/efforts", headers={"Authorization": f"Bearer {token2}"}).status_code == 403
+
+        # Moving the journey elsewhere drops its effort, deleting it removes the rest
+        client.put("/update_journey/1", json={"points": [
+            {"lat": 51.5, "lon": -0.12, "ele": 10}, {"lat": 51.501, "lon": -0.121, "ele": 11}
+        ]}, headers=headers)
+        assert client.get("/journey/1/efforts", headers=headers).json['data'] == []
+        client.delete(f"/delete_journey/{journey.id}", headers=headers)
+        assert imports.models.SegmentEffort.query.filter_by(journeyId=journey.id).count() == 0
+        assert len(client.get(f"/segments/{segmentId}", headers=headers).json['data']['efforts']) == 0
+
+    def test_backfill_script(self, client, clean_db):
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+        segmentId = client.post("/segments", json={"name": "Ridge", "points": self.MORNING_RUN}, headers=headers).json['id']
+
+        imports.models.SegmentEffort.query.delete()
+        imports.db.session.commit()
+
+        assert backfill_segments.backfill(segmentId) == (1, 2)
+        # Re-running replaces the efforts instead of adding them again
+        assert backfill_segments.backfill() == (1, 2)
+        assert imports.models.SegmentEffort.query.count() == 2
@@ -0,0 +1,133 @@
+from app.endpoints.imports import imports
+from app.endpoints.gps import splits
+from app.endpoints.gps.pointValidation import validate_timed_point_array, validate_times
+import numpy as np
+
+class TestSplits:
+    """Class for testing per-point timestamps and the splits computed from them."""
+
+    # 2024-03-12 07:30:00 UTC
+    START = 1710228600
+
+    def timed_points(self, count=301, seconds_per_point=1.2, pause_at=None, pause=60):
+        """A track heading north for about 3.3 km, one point every 11 metres."""
+        lat = np.linspace(51.0, 51.03, count)
+        seconds = self.START + np.arange(count) * seconds_per_point
+        if pause_at is not None:
+            seconds[pause_at:] += pause
+        return [{"lat": float(a), "lon": -0.1, "ele": 10, "time": float(t)} for a, t in zip(lat, seconds)]
+
+    def test_validate_timed_points(self):
+        points = self.timed_points(3)
+        array, times, error_message = validate_timed_point_array(points)
+        assert error_message == ""
+        assert array.shape == (3, 3)
+        assert times.tolist() == [self.START * 1000, self.START * 1000 + 1200, self.START * 1000 + 2400]
+
+        # Without times the points are validated as before
+        array, times, error_message = validate_timed_point_array([{"lat": 1, "lon": 2, "ele": 3}])
+        assert array.shape == (1, 3) and times is None
+
+        points[2]["time"] = self.START
+        assert validate_timed_point_array(points)[2].startswith("Point 2: Invalid value for time")
+        del points[1]["time"]
+        assert validate_timed_point_array(points)[2] == "Point 1: Missing keys: time"
+        assert validate_timed_point_array([{"lat": 1, "lon": 2, "ele": 3, "time": "07:30"}])[0] is None
+        assert validate_timed_point_array([{"lat": 1, "lon": 2, "ele": 3, "time": -1}])[0] is None
+        # Times past year 9999 would overflow the milliseconds
+        for time in (1e300, 253402300800):
+            array, times, error_message = validate_timed_point_array([{"lat": 1, "lon": 2, "ele": 3, "time": time}])
+            assert array is None and error_message.startswith("Point 0: Invalid value for time")
+        assert validate_times(np.array([253402300799.0]))[0].tolist() == [253402300799000]
+
+    def test_split_times(self):
+        array, times, _ = validate_timed_point_array(self.timed_points(pause_at=150))
+        result = splits.split_times(array, times)
+
+        assert [round(split['distance']) for split in result['splits']] == [1000, 1000, 1000, 336]
+        # The splits add up to the elapsed time, which includes the pause
+        assert abs(sum(split['duration'] for split in result['splits']) - result['elapsedTime']) < 1e-6
+        assert result['elapsedTime'] == 420
+        assert abs(result['movingTime'] - (420 - 61.2)) < 1e-6
+        # The pause is in the second kilometre
+        assert result['slowest'] == 1
+        assert result['fastest'] in (0, 2)
+        assert abs(result['splits'][0]['pace'] - 1000 / 11.12 * 1.2) < 1
+
+        miles = splits.split_times(array, times, 'mile')
+        assert len(miles['splits']) == 3 and miles['fastest'] == 0
+
+        # Shorter than a kilometre: one partial split and no fastest split
+        result = splits.split_times(array[:50], times[:50])
+        assert len(result['splits']) == 1 and result['fastest'] is None
+
+    def test_journey_splits_endpoint(self, client, clean_db):
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+        token3, id3 = imports.users.user2(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        journey_data = {
+            "name": "Tempo Run",
+            "type": "Run",
+            "points": self.timed_points(pause_at=150),
+            "startTime": "07:30:00",
+            "endTime": "07:37:00",
+            "dateCreated": "2024-03-12"
+        }
+        assert client.post("/create_journey", json=journey_data, headers=headers).status_code == 201
+        journey = imports.models.Journey.query.filter_by(name="Tempo Run").first()
+
+        response = client.get(f"/journey/{journey.id}/splits", headers=headers)
+        assert response.status_code == 200
+        data = response.json['data']
+        assert data['unit'] == 'km' and len(data['splits']) == 4
+        assert data['slowest'] == 1
+        assert client.get(f"/journey/{journey.id}/splits?unit=mile", headers=headers).json['data']['unit'] == 'mile'
+
+        # Friends may see the splits, other users may not
+        assert client.get(f"/journey/{journey.id}/splits", headers={"Authorization": f"Bearer {token2}"}).status_code == 200
+        assert client.get(f"/journey/{journey.id}/splits", headers={"Authorization": f"Bearer {token3}"}).status_code == 403
+        assert client.get(f"/journey/{journey.id}/splits?unit=yard", headers=headers).status_code == 400
+        assert client.get("/journey/1/splits", headers=headers).status_code == 400
+        assert client.get("/journey/999/splits", headers=headers).status_code == 404
+
+        # The stats show the moving time and fastest kilometre
+        stats = client.get("/getStats", headers=headers).json['data']
+        tempo = next(entry for entry in stats['journeysData'] if entry['journeyId'] == journey.id)
+        assert abs(tempo['movingTime'] - 358.8) < 1e-6
+        assert stats['fastestKmPace'] == tempo['fastestKmPace']
+        assert abs(tempo['fastestKmPace'] - min(data['splits'][0]['pace'], data['splits'][2]['pace'])) < 1e-6
+
+        # New points without times drop the derived values
+        client.put(f"/update_journey/{journey.id}", json={"points": [
+            {"lat": 51.5, "lon": -0.12, "ele": 10}, {"lat": 51.501, "lon": -0.121, "ele": 11}
+        ]}, headers=headers)
+        assert client.get(f"/journey/{journey.id}/splits", headers=headers).status_code == 400
+        assert client.get("/getStats", headers=headers).json['data']['fastestKmPace'] is None
+
+    def test_import_and_recording_keep_times(self, client, clean_db):
+        token = imports.users.user2(self, client, clean_db)[0]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        gpx = b"""<?xml version="1.0" encoding="UTF-8"?>
+        <gpx version="1.1" creator="watch" xmlns="http://www.topografix.com/GPX/1/1">
+          <trk><name>Park Loop</name><type>running</type><trkseg>
+            <trkpt lat="51.5" lon="-0.1"><time>2024-03-12T07:30:00Z</time></trkpt>
+            <trkpt lat="51.505" lon="-0.1"><time>2024-03-12T07:33:00Z</time></trkpt>
+            <trkpt lat="51.51" lon="-0.1"><time>2024-03-12T08:36:00+01:00</time></trkpt>
+          </trkseg></trk>
+        </gpx>"""
+        response = client.post("/import_journey", data={"file": (imports.io.BytesIO(gpx), "loop.gpx")}, headers=headers)
+        assert response.status_code == 201
+        journey = imports.models.Journey.query.filter_by(name="Park Loop").first()
+        data = client.get(f"/journey/{journey.id}/splits", headers=headers).json['data']
+        assert data['elapsedTime'] == 360
+
+        recording_id = client.post("/recording/start", json={"name": "Live", "type": "Run"}, headers=headers).json['id']
+        points = self.timed_points(101)
+        client.post(f"/recording/{recording_id}/append", json={"points": points[:50]}, headers=headers)
+        client.post(f"/recording/{recording_id}/append", json={"points": points[50:]}, headers=headers)
+        journey_id = client.post(f"/recording/{recording_id}/finish", json={}, headers=headers).json['id']
+        data = client.get(f"/journey/{journey_id}/splits", headers=headers).json['data']
+        assert data['elapsedTime'] == 120
+        assert data['splits'][0]['distance'] == 1000
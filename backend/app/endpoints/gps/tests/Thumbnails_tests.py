@@ -0,0 +1,79 @@
+from app.endpoints.imports import imports
+from app.endpoints.gps import thumbnails
+import os
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+class TestThumbnails:
+    """Class for testing the cached PNG journey thumbnails."""
+
+    def use_cache_dir(self, monkeypatch, tmp_path, limit=64 * 1024 * 1024):
+        monkeypatch.setitem(imports.app.config, 'THUMBNAIL_CACHE_DIR', str(tmp_path))
+        monkeypatch.setitem(imports.app.config, 'THUMBNAIL_CACHE_BYTES', limit)
+        return tmp_path
+
+    def test_thumbnail_rendered_and_cached(self, client, clean_db, monkeypatch, tmp_path):
+        cache = self.use_cache_dir(monkeypatch, tmp_path)
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+        points_hash = imports.db.session.get(imports.models.Journey, 1).pointsHash
+
+        # An image left by a deleted journey with the same id and version is not served
+        (cache / f'1-1-{"0" * 64}-{thumbnails.DEFAULT_SIZE}.png').write_bytes(b'stale')
+
+        response = client.get("/journey/1/thumbnail.png", headers=headers)
+        assert response.status_code == 200
+        assert response.mimetype == 'image/png'
+        assert response.data.startswith(PNG_SIGNATURE)
+        assert points_hash in response.headers['ETag']
+        os.remove(cache / f'1-1-{"0" * 64}-{thumbnails.DEFAULT_SIZE}.png')
+        assert os.listdir(cache) == [f'1-1-{points_hash}-{thumbnails.DEFAULT_SIZE}.png']
+
+        # A second request is served from the cache, and revalidation needs no body
+        os.utime(cache / os.listdir(cache)[0], (0, 0))
+        assert client.get("/journey/1/thumbnail.png", headers=headers).data == response.data
+        assert os.stat(cache / os.listdir(cache)[0]).st_mtime > 0
+        response = client.get("/journey/1/thumbnail.png", headers=dict(headers, **{"If-None-Match": response.headers['ETag']}))
+        assert response.status_code == 304
+
+        # New points give a new version
+        client.put("/update_journey/1", json={"points": [
+            {"lat": 51.5, "lon": -0.12, "ele": 10}, {"lat": 51.501, "lon": -0.121, "ele": 11}
+        ]}, headers=headers)
+        assert client.get("/journey/1/thumbnail.png?size=64", headers=headers).status_code == 200
+        new_hash = imports.db.session.get(imports.models.Journey, 1).pointsHash
+        assert sorted(os.listdir(cache)) == sorted([f'1-1-{points_hash}-128.png', f'1-2-{new_hash}-64.png'])
+
+        client.delete("/delete_journey/1", headers=headers)
+        assert os.listdir(cache) == []
+
+        assert client.get("/journey/2/thumbnail.png?size=8", headers=headers).status_code == 400
+        assert client.get("/journey/999/thumbnail.png", headers=headers).status_code == 404
+
+    def test_thumbnail_of_friend(self, client, clean_db, monkeypatch, tmp_path):
+        self.use_cache_dir(monkeypatch, tmp_path)
+        # John and Bob are friends, Alice is not
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+        token3, id3 = imports.users.user2(self, client, clean_db)
+
+        assert client.get("/journey/1/thumbnail.png", headers={"Authorization": f"Bearer {token2}"}).status_code == 200
+        assert client.get("/journey/1/thumbnail.png", headers={"Authorization": f"Bearer {token3}"}).status_code == 403
+
+        imports.db.session.get(imports.models.User, id).isPrivate = True
+        imports.db.session.commit()
+        assert client.get("/journey/1/thumbnail.png", headers={"Authorization": f"Bearer {token2}"}).status_code == 403
+
+    def test_cache_evicts_least_recently_used(self, client, clean_db, monkeypatch, tmp_path):
+        cache = self.use_cache_dir(monkeypatch, tmp_path, limit=1000)
+
+        for journeyId in (1, 2, 3):
+            thumbnails.store_thumbnail(journeyId, 1, 'abc', 64, b'x' * 300)
+            os.utime(cache / f'{journeyId}-1-abc-64.png', (journeyId, journeyId))
+        # Reading journey 1 makes journey 2 the least recently used, then journey 3
+        assert thumbnails.cached_thumbnail(1, 1, 'abc', 64) == b'x' * 300
+        assert thumbnails.cached_thumbnail(1, 2, 'abc', 64) is None
+        assert thumbnails.cached_thumbnail(1, 1, 'def', 64) is None
+
+        # Going over the limit deletes images until the cache is at most 3/4 full
+        thumbnails.store_thumbnail(4, 1, 'abc', 64, b'x' * 300)
+        assert sorted(os.listdir(cache)) == ['1-1-abc-64.png', '4-1-abc-64.png']
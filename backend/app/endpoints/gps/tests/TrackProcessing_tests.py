@@ -0,0 +1,146 @@
+from app.endpoints.imports import imports
+from app.endpoints.gps import trackProcessing
+import numpy as np
+
+class TestTrackProcessing:
+    """Class for testing the vectorized track processing helpers."""
+
+    def douglas_peucker(self, xy, tolerance):
+        """Straightforward recursive Douglas-Peucker used as a reference."""
+        if len(xy) < 3:
+            return list(range(len(xy)))
+        distances = trackProcessing._segment_distances(xy[1:-1], xy[0], xy[-1])
+        index = int(np.argmax(distances)) + 1
+        if distances[index - 1] <= tolerance:
+            return [0, len(xy) - 1]
+        left = self.douglas_peucker(xy[:index + 1], tolerance)
+        right = self.douglas_peucker(xy[index:], tolerance)
+        return left[:-1] + [i + index for i in right]
+
+    def random_track(self, n, seed=0):
+        rng = np.random.default_rng(seed)
+        lat = 51.5 + np.cumsum(rng.normal(0, 1e-4, n))
+        lon = -0.1 + np.cumsum(rng.normal(0, 1e-4, n))
+        return np.column_stack((lat, lon, rng.normal(50, 5, n)))
+
+    def test_significance_matches_douglas_peucker(self):
+        track = self.random_track(500)
+        xy = trackProcessing.project_to_metres(track)
+        significance = trackProcessing.simplification_significance(xy, 1.0)
+
+        for tolerance in (1.0, 10.0, 40.0, 250.0):
+            expected = self.douglas_peucker(xy, tolerance)
+            assert np.flatnonzero(significance > tolerance).tolist() == expected
+
+    def test_build_lod_pyramid(self):
+        track = self.random_track(2000)
+        pyramid = trackProcessing.build_lod_pyramid(track)
+
+        assert [level for level, _, _ in pyramid] == [1, 2, 3, 4]
+        sizes = [len(simplified) for _, _, simplified in pyramid]
+        assert sizes == sorted(sizes, reverse=True)
+        for _, _, simplified in pyramid:
+            assert simplified[0].tolist() == track[0].tolist()
+            assert simplified[-1].tolist() == track[-1].tolist()
+
+    def test_build_lod_pyramid_short_tracks(self):
+        for n in (0, 1, 2):
+            for _, _, simplified in trackProcessing.build_lod_pyramid(self.random_track(n)):
+                assert len(simplified) == n
+
+    def test_lod_for_tolerance(self):
+        assert trackProcessing.lod_for_tolerance(0) == 0
+        assert trackProcessing.lod_for_tolerance(2) == 1
+        assert trackProcessing.lod_for_tolerance(60) == 3
+        assert trackProcessing.lod_for_tolerance(10000) == 4
+
+    def test_get_journeys_with_lod(self, client, clean_db):
+        token = imports.users.user1(self, client, clean_db)[0]
+
+        points = [{'lat': lat, 'lon': lon, 'ele': ele} for lat, lon, ele in self.random_track(300).tolist()]
+        journey_data = {
+            "name": "Long Ride",
+            "type": "Cycle",
+            "totalDistance": 30.0,
+            "elevation": {"avg": 50, "min": 40, "max": 60},
+            "points": points,
+            "startTime": "07:30:00",
+            "endTime": "09:15:00",
+            "dateCreated": "2024-03-14"
+        }
+        response = client.post("/create_journey", json=journey_data, headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 201
+
+        headers = {"Authorization": f"Bearer {token}"}
+        full = client.get("/get_journeys_of_user", headers=headers).json['data'][-1]['points']
+        coarse = client.get("/get_journeys_of_user?lod=4", headers=headers).json['data'][-1]['points']
+        by_tolerance = client.get("/get_journeys_of_user?tolerance=60", headers=headers).json['data'][-1]['points']
+
+        assert len(full) == 300
+        assert len(coarse) < len(by_tolerance) < len(full)
+        assert coarse[0] == full[0] and coarse[-1] == full[-1]
+
+        assert client.get("/get_journeys_of_user?lod=9", headers=headers).status_code == 400
+        assert client.get("/get_journeys_of_user?tolerance=-1", headers=headers).status_code == 400
+
+    def test_update_journey_rebuilds_lod(self, client, clean_db):
+        token, _, token2, _ = imports.users.user1(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        points = [{'lat': lat, 'lon': lon, 'ele': ele} for lat, lon, ele in self.random_track(100, seed=3).tolist()]
+        response = client.put("/update_journey/1", json={"points": points}, headers=headers)
+        assert response.status_code == 200
+
+        journey = imports.db.session.get(imports.models.Journey, 1)
+        assert sorted(lod.level for lod in journey.lods) == [1, 2, 3, 4]
+        assert imports.models.JourneyLOD.query.filter_by(journeyId=1).count() == 4
+
+        # Friends see the same simplified track
+        response = client.get("/get_friends_journey?friend=john.doe@example.com&lod=1",
+                              headers={"Authorization": f"Bearer {token2}"})
+        assert response.status_code == 200
+        simplified = [lod for lod in journey.lods if lod.level == 1][0].point_array
+        assert len(response.json['data'][0]['points']) == len(simplified)
+
+    def test_track_metrics(self):
+        track = np.array([[0.0, 0.0, 100], [0.0, 1.0, 110], [1.0, 1.0, 90], [1.0, 1.0, 95]])
+        metrics = trackProcessing.track_metrics(track)
+
+        # One degree along the equator and one along a meridian on a spherical Earth
+        one_degree = np.radians(1) * trackProcessing.EARTH_RADIUS_M
+        assert np.isclose(metrics['distance'], 2 * one_degree, rtol=1e-4)
+        assert metrics['elevationGain'] == 15
+        assert metrics['elevationLoss'] == 20
+        assert metrics['minEle'] == 90 and metrics['maxEle'] == 110
+        assert metrics['avgEle'] == 98.75
+
+        assert trackProcessing.track_metrics(track[:1])['distance'] == 0
+
+    def test_create_journey_derives_metrics(self, client, clean_db):
+        token = imports.users.user1(self, client, clean_db)[0]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        journey_data = {
+            "name": "Hill Walk",
+            "type": "Walk",
+            "elevation": {"avg": 1, "min": 1, "max": 1},
+            "points": [
+                {"lat": 51.0, "lon": 0.0, "ele": 10},
+                {"lat": 51.001, "lon": 0.0, "ele": 30},
+                {"lat": 51.002, "lon": 0.0, "ele": 25}
+            ],
+            "startTime": "07:30:00",
+            "endTime": "08:15:00",
+            "dateCreated": "2024-03-14"
+        }
+        response = client.post("/create_journey", json=journey_data, headers=headers)
+        assert response.status_code == 201
+
+        journey = client.get("/get_journeys_of_user", headers=headers).json['data'][-1]
+        assert round(journey['computedDistance']) == 222
+        assert journey['totalDistance'] == journey['computedDistance']
+        assert journey['elevation'] == {'avg': 21.666666666666668, 'min': 10, 'max': 30, 'gain': 20, 'loss': 5}
+
+        stats = client.get("/getStats", headers=headers).json['data']
+        assert stats['journeysData'][-1]['elevationGain'] == 20
+        assert stats['totalElevationGain'] == 20 + 10 + 0 + 10
@@ -0,0 +1,141 @@
+from app.endpoints.imports import imports
+from app.endpoints.gps import vectorTiles
+import numpy as np
+
+def read_varint(data, position):
+    value = shift = 0
+    while True:
+        byte = data[position]
+        value |= (byte & 0x7f) << shift
+        position += 1
+        shift += 7
+        if not byte & 0x80:
+            return value, position
+
+def read_fields(data):
+    """Decodes a protobuf message into a list of (field, value) pairs, without a schema."""
+    fields, position = [], 0
+    while position < len(data):
+        key, position = read_varint(data, position)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, position = read_varint(data, position)
+        elif wire_type == 1:
+            value, position = data[position:position + 8], position + 8
+        else:
+            length, position = read_varint(data, position)
+            value, position = data[position:position + length], position + length
+        fields.append((field, value))
+    return fields
+
+def read_packed(data):
+    values, position = [], 0
+    while position < len(data):
+        value, position = read_varint(data, position)
+        values.append(value)
+    return values
+
+def read_tile(data):
+    """Returns the extent and the features of the journeys layer as {id: (properties, geometry)}."""
+    layers = [read_fields(value) for field, value in read_fields(data) if field == 3]
+    if not layers:
+        return None, {}
+    layer = layers[0]
+    assert [value for field, value in layer if field == 1] == [b'journeys']
+    keys = [value.decode() for field, value in layer if field == 3]
+    values = []
+    for field, value in layer:
+        if field == 4:
+            kind, raw = read_fields(value)[0]
+            values.append(raw.decode() if kind == 1 else np.frombuffer(raw, '<f8')[0] if kind == 3 else raw)
+    features = {}
+    for field, value in layer:
+        if field == 2:
+            feature = dict(read_fields(value))
+            tags = read_packed(feature[2])
+            properties = {keys[tags[i]]: values[tags[i + 1]] for i in range(0, len(tags), 2)}
+            features[feature[1]] = (properties, read_packed(feature[4]))
+    return dict(layer)[5], features
+
+class TestVectorTiles:
+    """Class for testing the GeoJSON and vector tile output of journeys."""
+
+    def tile_of(self, lat, lon, zoom):
+        xy = vectorTiles.project(np.array([[lat, lon, 0.0]]), zoom, 0, 0)[0]
+        return int(xy[0] // vectorTiles.EXTENT), int(xy[1] // vectorTiles.EXTENT)
+
+    def test_clip_and_encode(self):
+        # A line leaving the square and coming back is cut into two parts
+        line = np.array([[10.0, 10.0], [50.0, 10.0], [150.0, 10.0], [150.0, 50.0], [50.0, 50.0]])
+        parts = vectorTiles.clip_line(line, 0, 100)
+        assert [part.tolist() for part in parts] == [[[10, 10], [50, 10], [100, 10]], [[100, 50], [50, 50]]]
+        assert vectorTiles.clip_line(line + 200, 0, 100) == []
+
+        assert vectorTiles.quantize(np.array([[1.2, 1.0], [0.8, 1.1], [3.0, 4.0]])).tolist() == [[1, 1], [3, 4]]
+
+        # The LineString example of the MVT specification
+        assert vectorTiles.encode_geometry([np.array([[2, 2], [2, 10], [10, 10]])]) == [9, 4, 4, 18, 0, 16, 16, 0]
+        assert vectorTiles.encode_tile([]) == b''
+
+        west, south, east, north = vectorTiles.tile_bbox(1, 0, 0, buffer=0)
+        assert (west, east) == (-180, 0) and south == 0 and abs(north - 85.0511287798) < 1e-6
+
+    def test_track_across_antimeridian(self):
+        # A track across the antimeridian is drawn at both edges of the map, not across it
+        track = np.array([[0.0, 179.5, 0.0], [0.0, 179.9, 0.0], [0.0, -179.9, 0.0], [0.0, -179.5, 0.0]])
+        zoom = 4
+        y = self.tile_of(0.0, 179.9995, zoom)[1]
+        drawn = [x for x in range(1 << zoom) if vectorTiles.track_parts(track, zoom, x, y)]
+        assert drawn == [0, (1 << zoom) - 1]
+
+    def test_geojson_endpoint(self, client, clean_db):
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        response = client.get("/journeys.geojson", headers=headers)
+        assert response.status_code == 200
+        assert response.mimetype == 'application/geo+json'
+        collection = response.json
+        assert collection['type'] == 'FeatureCollection'
+        assert [feature['id'] for feature in collection['features']] == [1, 2, 3]
+        feature = collection['features'][0]
+        assert feature['geometry'] == {'type': 'LineString', 'coordinates': [[-120.2, 38.5, 100], [-120.3, 38.6, 110]]}
+        assert feature['properties']['name'] == 'Morning Run'
+
+        response = client.get("/journeys.geojson", headers=dict(headers, **{"If-None-Match": response.headers['ETag']}))
+        assert response.status_code == 304
+        assert [feature['id'] for feature in client.get("/journeys.geojson?type=Walk", headers=headers).json['features']] == [2]
+        assert client.get("/journeys.geojson?lod=9", headers=headers).status_code == 400
+
+    def test_tile_endpoint(self, client, clean_db):
+        token, id, token2, id2 = imports.users.user1(self, client, clean_db)
+        headers = {"Authorization": f"Bearer {token}"}
+
+        response = client.get("/tiles/journeys/0/0/0.mvt", headers=headers)
+        assert response.status_code == 200
+        assert response.mimetype == vectorTiles.MEDIA_TYPE
+        extent, features = read_tile(response.data)
+        assert extent == vectorTiles.EXTENT
+        # Only the user's own journeys
+        assert sorted(features) == [1, 2, 3]
+        properties, geometry = features[1]
+        assert properties['name'] == 'Morning Run' and properties['type'] == 'Run'
+        assert geometry[0] == 9 and geometry[3] == 10
+
+        x, y = self.tile_of(38.5, -120.2, 12)
+        extent, features = read_tile(client.get(f"/tiles/journeys/12/{x}/{y}.mvt", headers=headers).data)
+        assert 1 in features and 2 not in features
+        # Empty tiles have an empty body
+        response = client.get("/tiles/journeys/12/0/0.mvt", headers=headers)
+        assert response.status_code == 200 and response.data == b''
+
+        # Tiles are cached per data version
+        version = imports.models.User.query.get(id).dataVersion or 0
+        assert vectorTiles.cache.get((id, version, 0, 0, 0)) is not None
+        etag = client.get("/tiles/journeys/0/0/0.mvt", headers=headers).headers['ETag']
+        assert client.get("/tiles/journeys/0/0/0.mvt", headers=dict(headers, **{"If-None-Match": etag})).status_code == 304
+        client.delete("/delete_journey/2", headers=headers)
+        assert sorted(read_tile(client.get("/tiles/journeys/0/0/0.mvt", headers=headers).data)[1]) == [1, 3]
+
+        assert client.get("/tiles/journeys/21/0/0.mvt", headers=headers).status_code == 400
+        assert client.get("/tiles/journeys/1/2/0.mvt", headers=headers).status_code == 400
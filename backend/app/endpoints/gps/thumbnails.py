@@ -0,0 +1,175 @@
+import io
+import os
+import threading
+import numpy as np
+from flask import current_app
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from app.endpoints.gps.trackProcessing import project_to_metres, EARTH_RADIUS_M
+
+"""
+Thumbnails Description:
+
+Small PNG images of journey tracks for the journey cards, rendered with matplotlib on the Agg
+backend (a Figure with its own canvas, so no pyplot state is shared between requests).
+
+Rendered images are kept in a directory on disk (THUMBNAIL_CACHE_DIR in config.py), one file
+per journey, journey version, points hash and size. Journey.version changes whenever the points
+are saved, so an image never has to be invalidated when a track is edited: requests simply look
+for the new version and the old file ages out. The points hash (Journey.pointsHash, see
+pointStore.py) keeps a journey that reuses the id of a deleted one from being served its image,
+whichever process drew it. Files are touched when served, and once the directory
+grows past THUMBNAIL_CACHE_BYTES the least recently used ones are deleted.
+"""
+
+DEFAULT_SIZE = 128
+MIN_SIZE = 32
+MAX_SIZE = 512
+
+DPI = 100
+LINE_COLOUR = '#1c7ed6'
+START_COLOUR = '#2f9e44'
+END_COLOUR = '#e03131'
+
+# Bytes in the cache directory as last counted, per directory; guarded by _lock
+_cache_bytes = {}
+_lock = threading.Lock()
+
+
+def cache_dir() -> str:
+    """The configured cache directory, created if needed."""
+    path = current_app.config['THUMBNAIL_CACHE_DIR']
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def cache_path(journeyId: int, version: int, pointsHash: str, size: int) -> str:
+    """The file an image of a journey version is cached in."""
+    return os.path.join(cache_dir(), f'{journeyId}-{version}-{pointsHash}-{size}.png')
+
+
+def track_extent(journey) -> float:
+    """The larger side of the bounding box of a journey in metres (0 without a bounding box)."""
+    if journey.minLat is None:
+        return 0.0
+    cos_lat = np.cos(np.radians((journey.minLat + journey.maxLat) / 2))
+    return float(np.radians(max(journey.maxLat - journey.minLat,
+                                (journey.maxLon - journey.minLon) * cos_lat)) * EARTH_RADIUS_M)
+
+
+def render_thumbnail(array: np.ndarray, size: int = DEFAULT_SIZE) -> bytes:
+    """
+    Draws a track as a square PNG with a transparent background.
+
+    Parameters
+    ----------
+    array : np.ndarray
+        An (n, 3) array of lat, lon, ele.
+    size : int
+        The width and height of the image in pixels.
+
+    Returns
+    -------
+    bytes
+        The PNG image. The track keeps its shape (north up) and is centred, with its start
+        and end marked.
+    """
+    figure = Figure(figsize=(size / DPI, size / DPI), dpi=DPI)
+    figure.patch.set_alpha(0)
+    canvas = FigureCanvasAgg(figure)
+    axes = figure.add_axes((0.06, 0.06, 0.88, 0.88))
+    axes.set_axis_off()
+    axes.set_aspect('equal', adjustable='datalim')
+
+    if len(array):
+        xy = project_to_metres(array)
+        width = max(size / 64, 1.0)
+        axes.plot(xy[:, 0], xy[:, 1], color=LINE_COLOUR, linewidth=width,
+                  solid_capstyle='round', solid_joinstyle='round')
+        axes.plot(*xy[0], 'o', color=START_COLOUR, markersize=width * 2.5)
+        axes.plot(*xy[-1], 'o', color=END_COLOUR, markersize=width * 2.5)
+        if np.ptp(xy, axis=0).max() == 0:
+            axes.set_xlim(xy[0, 0] - 1, xy[0, 0] + 1)
+            axes.set_ylim(xy[0, 1] - 1, xy[0, 1] + 1)
+
+    buffer = io.BytesIO()
+    canvas.print_png(buffer)
+    return buffer.getvalue()
+
+
+def cached_thumbnail(journeyId: int, version: int, pointsHash: str, size: int):
+    """
+    Reads an image from the cache, marking it as recently used.
+
+    Returns
+    -------
+    bytes or None
+        The PNG image, or None if it is not cached.
+    """
+    path = cache_path(journeyId, version, pointsHash, size)
+    try:
+        with open(path, 'rb') as file:
+            image = file.read()
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return image
+
+
+def store_thumbnail(journeyId: int, version: int, pointsHash: str, size: int, image: bytes) -> None:
+    """Writes an image to the cache, evicting the least recently used images if it is full."""
+    path = cache_path(journeyId, version, pointsHash, size)
+    temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(image)
+    # Readers never see a partly written file
+    os.replace(temporary, path)
+
+    directory = os.path.dirname(path)
+    limit = current_app.config['THUMBNAIL_CACHE_BYTES']
+    with _lock:
+        if directory not in _cache_bytes:
+            _cache_bytes[directory] = _directory_size(directory)
+        else:
+            _cache_bytes[directory] += len(image)
+        if _cache_bytes[directory] > limit:
+            _cache_bytes[directory] = _evict(directory, limit)
+
+
+def discard_thumbnails(journeyIds) -> None:
+    """Deletes every cached image of some journeys, e.g. when they are deleted."""
+    directory = current_app.config['THUMBNAIL_CACHE_DIR']
+    if not journeyIds or not os.path.isdir(directory):
+        return
+    prefixes = tuple(f'{journeyId}-' for journeyId in journeyIds)
+    with _lock:
+        for entry in os.scandir(directory):
+            if entry.name.startswith(prefixes):
+                _remove(entry.path)
+        _cache_bytes.pop(directory, None)
+
+
+def _directory_size(directory: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(directory) if entry.name.endswith('.png'))
+
+
+def _evict(directory: str, limit: int) -> int:
+    """Deletes the least recently used images until the cache is at most 3/4 of the limit."""
+    entries = sorted((entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                     for entry in os.scandir(directory) if entry.name.endswith('.png'))
+    total = sum(size for _, size, _ in entries)
+    target = limit * 3 // 4
+    for _, size, path in entries:
+        if total <= target:
+            break
+        _remove(path)
+        total -= size
+    return total
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        # Already evicted by another process
+        pass
@@ -0,0 +1,172 @@
+from array import array
+from datetime import datetime, timezone
+import xml.etree.ElementTree as ET
+import numpy as np
+
+"""
+Track Import Description:
+
+Incremental parser for uploaded GPX 1.0/1.1 and TCX files. The file is read with
+ElementTree.iterparse and every <trkpt> (GPX) or <Trackpoint> (TCX) is removed from the tree
+as soon as it has been read, so the parser never holds more than one point's elements. The
+coordinates are collected in compact array('d') buffers and returned as an (n, 3) float array
+of lat, lon, ele, ready for the same validation and storage as /create_journey.
+
+Points without an elevation are interpolated from their neighbours.
+"""
+
+# Lower case prefixes of GPX <type> / TCX Sport values mapped to journey types
+TYPE_PREFIXES = (
+    ('run', 'Run'),
+    ('walk', 'Walk'),
+    ('hik', 'Walk'),
+    ('cycl', 'Cycle'),
+    ('bik', 'Cycle'),
+    ('rid', 'Cycle'),
+)
+
+
+def _local_name(tag: str) -> str:
+    """Strips the namespace from an element tag."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _child_text(element, name):
+    """Text of the first direct child with the given local name, or None."""
+    for child in element:
+        if _local_name(child.tag) == name:
+            return child.text
+    return None
+
+
+def journey_type_from_text(text):
+    """Maps an activity name such as 'running' or 'Biking' to Run, Walk or Cycle (None if unknown)."""
+    if not text:
+        return None
+    text = text.strip().lower()
+    for prefix, journey_type in TYPE_PREFIXES:
+        if text.startswith(prefix):
+            return journey_type
+    return None
+
+
+def parse_time(text):
+    """Parses an ISO 8601 timestamp from a GPX/TCX file, or returns None."""
+    if not text:
+        return None
+    try:
+        return datetime.fromisoformat(text.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+def epoch_seconds(text) -> float:
+    """The Unix epoch time of an ISO 8601 timestamp (UTC if it has no offset), or NaN."""
+    moment = parse_time(text)
+    if moment is None:
+        return np.nan
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def parse_track(stream) -> dict:
+    """
+    Parses a GPX or TCX file incrementally.
+
+    Parameters
+    ----------
+    stream : file-like
+        The uploaded file, opened in binary mode.
+
+    Returns
+    -------
+    dict
+        points (an (n, 3) float array of lat, lon, ele), times (the Unix epoch seconds of
+        every point, or None unless every point has a timestamp), name, type, startTime and
+        endTime (datetimes or None when the file has no timestamps).
+
+    Exceptions
+    ----------
+    ValueError
+        Raised when the file is not well formed XML.
+    """
+    lat, lon, ele, seconds = array('d'), array('d'), array('d'), array('d')
+    name = None
+    activity = None
+    first_time = None
+    last_time = None
+
+    # Open elements, so a finished track point can be detached from its parent
+    stack = []
+    try:
+        for event, element in ET.iterparse(stream, events=('start', 'end')):
+            if event == 'start':
+                stack.append(element)
+                if _local_name(element.tag) == 'Activity' and activity is None:
+                    activity = element.get('Sport')
+                continue
+
+            stack.pop()
+            tag = _local_name(element.tag)
+
+            if tag == 'trkpt':
+                point_lat, point_lon = element.get('lat'), element.get('lon')
+                point_ele = _child_text(element, 'ele')
+                point_time = _child_text(element, 'time')
+            elif tag == 'Trackpoint':
+                position = next((child for child in element if _local_name(child.tag) == 'Position'), None)
+                if position is None:
+                    point_lat = point_lon = None
+                else:
+                    point_lat = _child_text(position, 'LatitudeDegrees')
+                    point_lon = _child_text(position, 'LongitudeDegrees')
+                point_ele = _child_text(element, 'AltitudeMeters')
+                point_time = _child_text(element, 'Time')
+            else:
+                if tag == 'name' and name is None and stack and _local_name(stack[-1].tag) in ('trk', 'metadata'):
+                    name = element.text
+                elif tag == 'type' and activity is None and stack and _local_name(stack[-1].tag) == 'trk':
+                    activity = element.text
+                continue
+
+            if point_lat is not None and point_lon is not None:
+                lat.append(float(point_lat))
+                lon.append(float(point_lon))
+                ele.append(float(point_ele) if point_ele else np.nan)
+                seconds.append(epoch_seconds(point_time))
+                if point_time:
+                    first_time = first_time or point_time
+                    last_time = point_time
+
+            element.clear()
+            if stack:
+                stack[-1].remove(element)
+    except ET.ParseError as e:
+        raise ValueError(f"Invalid GPX/TCX file: {e}")
+    except ValueError:
+        raise ValueError("Invalid GPX/TCX file: coordinates and elevations must be numbers")
+
+    points = np.column_stack((np.frombuffer(lat), np.frombuffer(lon), np.frombuffer(ele)))
+
+    # Fill in missing elevations from the neighbouring points
+    missing = np.isnan(points[:, 2])
+    if missing.any():
+        if missing.all():
+            points[:, 2] = 0.0
+        else:
+            index = np.arange(len(points))
+            points[missing, 2] = np.interp(index[missing], index[~missing], points[~missing, 2])
+
+    times = np.frombuffer(seconds)
+    if not len(times) or np.isnan(times).any():
+        times = None
+
+    return {
+        'points': points,
+        'times': times,
+        'name': name.strip() if name else None,
+        'type': journey_type_from_text(activity),
+        'startTime': parse_time(first_time),
+        'endTime': parse_time(last_time),
+    }
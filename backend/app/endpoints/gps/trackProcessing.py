@@ -0,0 +1,183 @@
+import numpy as np
+
+"""
+Track Processing Description:
+
+Vectorized geometry helpers that run over decoded (n, 3) lat, lon, ele point arrays when
+a journey is saved, so the results can be stored instead of recomputed on every read.
+
+Metrics:
+Distances use the haversine formula between consecutive points. Elevation gain and loss are
+the sums of the positive and negative elevation changes between consecutive points.
+
+Simplification:
+The level-of-detail (LOD) pyramid is built with Douglas-Peucker. A single pass at the
+smallest tolerance records, for every point, the largest tolerance at which Douglas-Peucker
+would still keep it (its significance). Each level is then a boolean mask over that array,
+which gives exactly the same result as running Douglas-Peucker once per tolerance.
+"""
+
+EARTH_RADIUS_M = 6371008.8
+
+# Douglas-Peucker tolerances in metres for LOD levels 1, 2, 3 and 4. Level 0 is the full track.
+LOD_TOLERANCES = (2.0, 10.0, 50.0, 200.0)
+
+
+def segment_distances(array: np.ndarray) -> np.ndarray:
+    """
+    Haversine distance in metres between each pair of consecutive points.
+
+    Parameters
+    ----------
+    array : np.ndarray
+        An (n, 3) array of lat, lon, ele.
+
+    Returns
+    -------
+    np.ndarray
+        An (n - 1,) array of distances (empty for fewer than two points).
+    """
+    lat = np.radians(array[:, 0])
+    lon = np.radians(array[:, 1])
+    half_dlat = np.diff(lat) / 2
+    half_dlon = np.diff(lon) / 2
+    a = np.sin(half_dlat) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(half_dlon) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def cumulative_distances(array: np.ndarray) -> np.ndarray:
+    """Distance in metres from the start of the track to every point, starting at 0."""
+    return np.concatenate(([0.0], np.cumsum(segment_distances(array))))
+
+
+def track_metrics(array: np.ndarray) -> dict:
+    """
+    Derives the summary values of a track from its points.
+
+    Parameters
+    ----------
+    array : np.ndarray
+        An (n, 3) array of lat, lon, ele.
+
+    Returns
+    -------
+    dict
+        distance (metres), elevationGain and elevationLoss (metres, loss is positive),
+        and avgEle, minEle and maxEle. Elevations are 0 for an empty track.
+    """
+    if len(array) == 0:
+        return {'distance': 0.0, 'elevationGain': 0.0, 'elevationLoss': 0.0,
+                'avgEle': 0.0, 'minEle': 0.0, 'maxEle': 0.0}
+
+    ele = array[:, 2]
+    climbs = np.diff(ele)
+    return {
+        'distance': float(segment_distances(array).sum()),
+        'elevationGain': float(climbs[climbs > 0].sum()),
+        'elevationLoss': float(-climbs[climbs < 0].sum()),
+        'avgEle': float(ele.mean()),
+        'minEle': float(ele.min()),
+        'maxEle': float(ele.max()),
+    }
+
+
+def project_to_metres(array: np.ndarray) -> np.ndarray:
+    """
+    Projects lat, lon onto a local equirectangular plane in metres, centred on the track.
+
+    Parameters
+    ----------
+    array : np.ndarray
+        An (n, 3) array of lat, lon, ele.
+
+    Returns
+    -------
+    np.ndarray
+        An (n, 2) array of x, y in metres.
+    """
+    lat = np.radians(array[:, 0])
+    lon = np.radians(array[:, 1])
+    cos_lat = np.cos(lat.mean()) if len(lat) else 1.0
+    return np.column_stack((lon * cos_lat, lat)) * EARTH_RADIUS_M
+
+
+def _segment_distances(points: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """Distance from every point to the segment start-end."""
+    direction = end - start
+    length_sq = direction @ direction
+    offsets = points - start
+    if length_sq == 0:
+        return np.hypot(offsets[:, 0], offsets[:, 1])
+    t = np.clip(offsets @ direction / length_sq, 0, 1)
+    nearest = offsets - t[:, None] * direction
+    return np.hypot(nearest[:, 0], nearest[:, 1])
+
+
+def simplification_significance(xy: np.ndarray, min_tolerance: float = LOD_TOLERANCES[0]) -> np.ndarray:
+    """
+    Runs Douglas-Peucker once and returns the significance of every point.
+
+    Parameters
+    ----------
+    xy : np.ndarray
+        An (n, 2) array of projected coordinates in metres.
+    min_tolerance : float
+        Points that are not kept at this tolerance get a significance of 0.
+
+    Returns
+    -------
+    np.ndarray
+        Float array where point i is kept at tolerance t if significance[i] > t.
+        The end points are always kept (infinite significance).
+    """
+    n = len(xy)
+    significance = np.zeros(n)
+    if n == 0:
+        return significance
+    significance[[0, -1]] = np.inf
+
+    stack = [(0, n - 1, np.inf)]
+    while stack:
+        first, last, parent = stack.pop()
+        if last - first < 2:
+            continue
+
+        distances = _segment_distances(xy[first + 1:last], xy[first], xy[last])
+        index = int(np.argmax(distances))
+        distance = distances[index]
+        if distance <= min_tolerance:
+            continue
+
+        # A point can never be more significant than the split that exposed it
+        index += first + 1
+        significance[index] = min(distance, parent)
+        stack.append((first, index, significance[index]))
+        stack.append((index, last, significance[index]))
+
+    return significance
+
+
+def build_lod_pyramid(array: np.ndarray, tolerances=LOD_TOLERANCES) -> list:
+    """
+    Builds the simplified versions of a track.
+
+    Parameters
+    ----------
+    array : np.ndarray
+        An (n, 3) array of lat, lon, ele.
+    tolerances : tuple
+        Douglas-Peucker tolerances in metres, one per level.
+
+    Returns
+    -------
+    list
+        One (level, tolerance, simplified array) tuple per tolerance, level starting at 1.
+    """
+    significance = simplification_significance(project_to_metres(array), min(tolerances))
+    return [(level, tolerance, array[significance > tolerance])
+            for level, tolerance in enumerate(tolerances, start=1)]
+
+
+def lod_for_tolerance(tolerance: float, tolerances=LOD_TOLERANCES) -> int:
+    """Returns the coarsest LOD level whose tolerance does not exceed the given one (0 for the full track)."""
+    return int(np.searchsorted(tolerances, tolerance, side='right'))
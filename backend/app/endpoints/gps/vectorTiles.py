@@ -0,0 +1,249 @@
+import struct
+import numpy as np
+from app.endpoints.gps.trackProcessing import EARTH_RADIUS_M
+from app.endpoints.gps.lruCache import LRUCache
+from app.endpoints.gps import webMercator
+
+"""
+Vector Tiles Description:
+
+Journeys as Mapbox Vector Tiles (MVT 2.1) on the standard XYZ tile scheme (see
+webMercator.py), so a map only downloads the geometry it shows, at the resolution it shows it
+at.
+
+Every journey is one LineString (or MultiLineString) feature of the 'journeys' layer. Tracks are
+projected into tile coordinates (EXTENT units per tile side), clipped to the tile plus a
+BUFFER on every side so lines join up across tile edges, and quantized to integers; points
+that fall on the same integer position are merged. The track is read at the coarsest LOD level
+whose simplification tolerance is below half a screen pixel at the tile's zoom level.
+
+The protobuf encoding is written by hand: a tile of line features only needs varints,
+length-delimited fields and doubles, while the mapbox-vector-tile package would add protobuf
+and shapely (GEOS) to the dependencies for geometry that is already clipped and quantized here.
+The encoder is tested by decoding its tiles field by field against the specification.
+
+Encoded tiles are kept in an in-process LRU cache (see lruCache.py) keyed by the user, their
+data version (which changes with every write to the user's journeys) and the tile.
+"""
+
+LAYER_NAME = 'journeys'
+EXTENT = 4096
+BUFFER = 64
+MIN_ZOOM = 0
+MAX_ZOOM = 20
+
+# Tiles are drawn TILE_PIXELS wide; detail finer than SIMPLIFY_PIXELS of a pixel is not visible
+TILE_PIXELS = 256
+SIMPLIFY_PIXELS = 0.5
+
+EARTH_CIRCUMFERENCE_M = 2 * np.pi * EARTH_RADIUS_M
+
+# Number of encoded tiles kept in memory
+CACHE_SIZE = 1024
+
+# Geometry commands and feature types of the MVT specification
+MOVE_TO = 1
+LINE_TO = 2
+LINESTRING = 2
+
+MEDIA_TYPE = 'application/vnd.mapbox-vector-tile'
+
+cache = LRUCache(CACHE_SIZE)
+
+
+def simplify_tolerance(zoom: int) -> float:
+    """The simplification tolerance in metres that is invisible at a zoom level (at the equator)."""
+    return EARTH_CIRCUMFERENCE_M / (TILE_PIXELS << zoom) * SIMPLIFY_PIXELS
+
+
+def tile_bbox(zoom: int, x: int, y: int, buffer: int = BUFFER):
+    """The (west, south, east, north) box in degrees covered by a tile and its buffer."""
+    world = EXTENT << zoom
+    left, right = (x * EXTENT - buffer) / world, ((x + 1) * EXTENT + buffer) / world
+    top, bottom = (y * EXTENT - buffer) / world, ((y + 1) * EXTENT + buffer) / world
+    north, south = webMercator.latitude(top), webMercator.latitude(bottom)
+    return max(left * 360 - 180, -180.0), max(south, -90.0), min(right * 360 - 180, 180.0), min(north, 90.0)
+
+
+def project(array: np.ndarray, zoom: int, x: int, y: int) -> np.ndarray:
+    """Projects the lat, lon of a track into the (column, row) coordinates of a tile."""
+    px, py = webMercator.project(array, EXTENT << zoom)
+    return np.column_stack((px - x * EXTENT, py - y * EXTENT))
+
+
+def _clip_segments(xy: np.ndarray, low, high):
+    """
+    Liang-Barsky clipping of every segment of a line to a box at once.
+
+    Returns the segment starts and deltas, the fractions of each segment at which it enters
+    and leaves the box, and whether it crosses the box at all.
+    """
+    (low_x, low_y), (high_x, high_y) = np.broadcast_to(low, 2), np.broadcast_to(high, 2)
+    start, delta = xy[:-1], np.diff(xy, axis=0)
+    enter = np.zeros(len(delta))
+    leave = np.ones(len(delta))
+    outside = np.zeros(len(delta), dtype=bool)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for p, q in ((-delta[:, 0], start[:, 0] - low_x), (delta[:, 0], high_x - start[:, 0]),
+                     (-delta[:, 1], start[:, 1] - low_y), (delta[:, 1], high_y - start[:, 1])):
+            ratio = q / p
+            enter = np.where(p < 0, np.maximum(enter, ratio), enter)
+            leave = np.where(p > 0, np.minimum(leave, ratio), leave)
+            outside |= (p == 0) & (q < 0)
+    return start, delta, enter, leave, ~outside & (enter <= leave)
+
+
+def clip_line(xy: np.ndarray, low, high) -> list:
+    """
+    Clips a line to a box with the Liang-Barsky algorithm, all segments at once.
+
+    Parameters
+    ----------
+    xy : np.ndarray
+        The (n, 2) points of the line.
+    low, high : float or tuple
+        The lower and upper bounds of the box, the same on both axes or an (x, y) pair.
+
+    Returns
+    -------
+    list
+        The (m, 2) arrays of the parts of the line inside the box, in order.
+    """
+    if len(xy) < 2:
+        return []
+    start, delta, enter, leave, inside = _clip_segments(xy, low, high)
+    if not inside.any():
+        return []
+
+    # A segment continues the previous part if both are whole at the point they share
+    continues = np.zeros(len(delta), dtype=bool)
+    continues[1:] = inside[:-1] & (leave[:-1] == 1) & (enter[1:] == 0)
+    kept = np.flatnonzero(inside)
+    heads = start[kept] + enter[kept, None] * delta[kept]
+    tails = start[kept] + leave[kept, None] * delta[kept]
+    breaks = np.flatnonzero(~continues[kept])
+    return [np.vstack((heads[first:first + 1], tails[first:last]))
+            for first, last in zip(breaks, np.append(breaks[1:], len(kept)))]
+
+
+def line_intersects(xy: np.ndarray, low, high) -> bool:
+    """True if any point or segment of a line lies in a box (bounds as for clip_line)."""
+    if len(xy) == 1:
+        return bool(((xy[0] >= low) & (xy[0] <= high)).all())
+    return len(xy) > 1 and bool(_clip_segments(xy, low, high)[4].any())
+
+
+def quantize(part: np.ndarray) -> np.ndarray:
+    """Rounds a part to integer tile coordinates, merging consecutive points that coincide."""
+    points = np.rint(part).astype(np.int64)
+    keep = np.concatenate(([True], (np.diff(points, axis=0) != 0).any(axis=1)))
+    return points[keep]
+
+
+def track_parts(array: np.ndarray, zoom: int, x: int, y: int) -> list:
+    """The quantized parts of a track that are visible in a tile, each of at least 2 points."""
+    # A step across the antimeridian would be drawn the long way round the world, so the
+    # line is broken there
+    breaks = np.flatnonzero(np.abs(np.diff(array[:, 1])) > 180) + 1
+    parts = [part for piece in np.split(array, breaks)
+             for part in clip_line(project(piece, zoom, x, y), -BUFFER, EXTENT + BUFFER)]
+    parts = [quantize(part) for part in parts]
+    return [part for part in parts if len(part) >= 2]
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _key(field: int, wire_type: int) -> bytes:
+    return _varint(field << 3 | wire_type)
+
+
+def _message(field: int, payload: bytes) -> bytes:
+    """A length-delimited field: an embedded message, a string or a packed repeated field."""
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+def _packed(field: int, values) -> bytes:
+    return _message(field, b''.join(_varint(value) for value in values))
+
+
+def encode_geometry(parts: list) -> list:
+    """
+    Encodes the parts of a line as MVT geometry commands.
+
+    Parameters
+    ----------
+    parts : list
+        The (n, 2) integer arrays of the parts, each of at least 2 points.
+
+    Returns
+    -------
+    list
+        The command and zigzag encoded parameter integers. Coordinates are relative to the
+        previous point, across parts.
+    """
+    commands = []
+    cursor = np.zeros(2, dtype=np.int64)
+    for part in parts:
+        deltas = np.diff(part, axis=0, prepend=cursor[None, :])
+        zigzag = np.where(deltas >= 0, deltas * 2, -deltas * 2 - 1).tolist()
+        commands.append(MOVE_TO | 1 << 3)
+        commands.extend(zigzag[0])
+        commands.append(LINE_TO | (len(part) - 1) << 3)
+        for pair in zigzag[1:]:
+            commands.extend(pair)
+        cursor = part[-1]
+    return commands
+
+
+def _value(value) -> bytes:
+    """A Value message: a string, a double or an integer."""
+    if isinstance(value, str):
+        return _message(1, value.encode('utf-8'))
+    if isinstance(value, float):
+        return _key(3, 1) + struct.pack('<d', value)
+    if value >= 0:
+        return _key(5, 0) + _varint(value)
+    return _key(6, 0) + _varint(-value * 2 - 1)
+
+
+def encode_tile(features: list) -> bytes:
+    """
+    Encodes the journeys layer of a tile.
+
+    Parameters
+    ----------
+    features : list
+        (id, properties, parts) tuples: the journey id, a dict of str, float or int properties
+        (None values are left out) and its quantized parts.
+
+    Returns
+    -------
+    bytes
+        The tile, empty when there are no features.
+    """
+    if not features:
+        return b''
+    keys, values = {}, {}
+    encoded = []
+    for journeyId, properties, parts in features:
+        tags = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault((type(value), value), len(values)))
+        encoded.append(_message(2, _key(1, 0) + _varint(journeyId) + _packed(2, tags)
+                                + _key(3, 0) + _varint(LINESTRING) + _packed(4, encode_geometry(parts))))
+
+    layer = (_key(15, 0) + _varint(2) + _message(1, LAYER_NAME.encode('utf-8')) + b''.join(encoded)
+             + b''.join(_message(3, key.encode('utf-8')) for key in keys)
+             + b''.join(_message(4, _value(value)) for _, value in values)
+             + _key(5, 0) + _varint(EXTENT))
+    return _message(3, layer)
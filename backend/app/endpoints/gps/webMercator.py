@@ -0,0 +1,48 @@
+import numpy as np
+
+"""
+Web Mercator Description:
+
+The projection and tile numbering of the standard XYZ (web mercator) tile scheme shared by the
+heatmap and vector tiles. At zoom z the world is a square of 2^z by 2^z tiles, x growing to
+the east from longitude -180 and y growing to the south from latitude MAX_LATITUDE.
+"""
+
+# Web mercator is undefined at the poles
+MAX_LATITUDE = 85.05112878
+
+
+def project(array: np.ndarray, world: float):
+    """
+    Projects the lat, lon of a track onto a square world map.
+
+    Parameters
+    ----------
+    array : np.ndarray
+        An (n, 2) or (n, 3) array of lat, lon (and ele).
+    world : float
+        The side of the map, in the units wanted (e.g. cells or tile extents times 2^zoom).
+
+    Returns
+    -------
+    (np.ndarray, np.ndarray)
+        The x (east) and y (south) coordinates of the points, from the north-west corner.
+    """
+    lat = np.radians(np.clip(array[:, 0], -MAX_LATITUDE, MAX_LATITUDE))
+    px = (array[:, 1] + 180.0) / 360.0 * world
+    py = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0 * world
+    return px, py
+
+
+def latitude(row: float) -> float:
+    """The latitude in degrees of a position between 0 (north edge) and 1 (south edge) of the map."""
+    return float(np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * row)))))
+
+
+def tile_error(z: int, x: int, y: int, min_zoom: int, max_zoom: int) -> str:
+    """Returns why a tile address is invalid for zoom levels min_zoom to max_zoom, or ''."""
+    if not min_zoom <= z <= max_zoom:
+        return f'Invalid zoom. Must be between {min_zoom} and {max_zoom}'
+    if not (0 <= x < 1 << z and 0 <= y < 1 << z):
+        return 'Invalid tile coordinates'
+    return ''
@@ -0,0 +1,77 @@
+import re
+import zipfile
+
+"""
+Zip Stream Description:
+
+Writes a ZIP archive as a generator of byte strings, so an archive of any size can be sent
+as a streamed response. zipfile.ZipFile writes into a buffer that only ever holds the bytes
+produced since they were last yielded: each member is compressed as its content is produced,
+and as the output is not seekable, sizes and checksums are written in a data descriptor after
+each member instead of being patched into its header. Zip64 records are added automatically
+when the archive grows past 4 GiB.
+"""
+
+COMPRESSION = zipfile.ZIP_DEFLATED
+
+# ZIP timestamps cannot be earlier than the MS-DOS epoch
+MIN_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+class _Output:
+    """Write-only file object that collects the bytes written by ZipFile until drained."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def safe_filename(name: str, default: str = 'journey') -> str:
+    """Turns a journey name into a file name that is safe in an archive on any platform."""
+    cleaned = re.sub(r'[^\w\- ]+', '_', name or '').strip(' ._')[:80]
+    return cleaned or default
+
+
+def stream_zip(members):
+    """
+    Builds a ZIP archive piece by piece.
+
+    Parameters
+    ----------
+    members : iterable
+        (name, date_time, chunks) tuples: the path in the archive, the modification time as a
+        date or datetime (clamped to MIN_DATE_TIME), and an iterable of the str (utf-8 encoded) or bytes parts of the content.
+        Members are consumed lazily, one at a time.
+
+    Yields
+    ------
+    bytes
+        Consecutive parts of the archive.
+    """
+    output = _Output()
+    with zipfile.ZipFile(output, mode='w', compression=COMPRESSION) as archive:
+        for name, date_time, chunks in members:
+            info = zipfile.ZipInfo(name, date_time=max(date_time.timetuple()[:6], MIN_DATE_TIME))
+            info.compress_type = COMPRESSION
+            # The size is not known in advance; allow members over 2 GiB
+            with archive.open(info, mode='w', force_zip64=True) as member:
+                for chunk in chunks:
+                    member.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+                    data = output.drain()
+                    if data:
+                        yield data
+            # Closing a member writes the rest of its compressed data and its data descriptor
+            yield output.drain()
+    # Closing the archive writes the central directory
+    yield output.drain()
@@ -3,6 +3,9 @@ from datetime import datetime, timedelta
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import create_access_token
 import pytest
+import numpy as np
+import io
+import xml.etree.ElementTree as ET
 import constants
 from app.endpoints.gps.GPS import GPSRoutes
 from app.endpoints.auth.Auth import AuthenticationRoutes
@@ -11,3 +14,7 @@ from app.endpoints.membership.Membership import MembershipRoutes
 from app.endpoints.stats.Stats import StatisticsRoutes
 from app.endpoints.Admin.revenuePrediction import generateFutureRevenueData
 from app.endpoints.TestUsers import users
+from app.endpoints.gps.polyline import encode_polyline, decode_polyline
+from app.endpoints.gps.gpxExport import generate_gpx
+from app.endpoints.gps.pointCodec import encode_points, points_to_dicts
+from app.endpoints.gps import spatialIndex
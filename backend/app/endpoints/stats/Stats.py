@@ -1,6 +1,7 @@
-from app import (app, models, get_jwt_identity, jwt_required)
+from app import (app, db, models, get_jwt_identity, jwt_required)
 from flask import request, jsonify
 from typing import Tuple
+from app.endpoints.gps import dataVersion, contentNegotiation
 
 class StatisticsRoutes():
     """
@@ -54,6 +55,8 @@ class StatisticsRoutes():
         the remaining seconds excluding both.
         These 3 essentially give the exact amount of time a journey took
         HH:MM:SS
+        The stats can also be requested as application/msgpack or application/cbor with the
+        Accept header.
 
 
         Exceptions
@@ -72,8 +75,18 @@ class StatisticsRoutes():
         if not user:
             return jsonify({'status': 404, 'message': 'User not found'}), 404
 
-        # Retrieve all journeys associated with the user
-        journeys = models.Journey.query.filter_by(userId=user.id).all()
+        # Nothing to compute if the client already has the stats for the current data version,
+        # in the format (JSON, MessagePack or CBOR) it asked for
+        media_type = contentNegotiation.negotiate()
+        etag = contentNegotiation.variant_etag(dataVersion.current_etag(user), media_type)
+        not_modified = dataVersion.not_modified(etag)
+        if not_modified:
+            return not_modified
+
+        # Retrieve all journeys associated with the user, the points themselves are not needed
+        journeys = (models.Journey.query.filter_by(userId=user.id)
+                    .options(db.defer(models.Journey.points, raiseload=True),
+                             db.defer(models.Journey.times, raiseload=True)).all())
 
         # Initialize variables to store journey data and totals for each mode
 
@@ -100,6 +113,8 @@ class StatisticsRoutes():
         total_time_taken_seconds_running = 0
         total_time_in_seconds_running = 0
 
+        total_elevation_gain = 0
+        fastest_km_pace = None
 
         # Iterate over each journey
         for journey in journeys:
@@ -176,6 +191,19 @@ class StatisticsRoutes():
             journeyID = journey.id
             temp_dictionary["journeyId"] = journeyID
 
+            # Add the distance and elevation derived from the points when the journey was saved
+            temp_dictionary["computedDistance"] = journey.computedDistance
+            temp_dictionary["elevationGain"] = journey.elevationGain
+            temp_dictionary["elevationLoss"] = journey.elevationLoss
+            total_elevation_gain += journey.elevationGain or 0
+
+            # Add the moving time and fastest kilometre derived from the point timestamps
+            # (None for journeys recorded without them)
+            temp_dictionary["movingTime"] = journey.movingTime
+            temp_dictionary["fastestKmPace"] = journey.fastestKmPace
+            if journey.fastestKmPace is not None:
+                fastest_km_pace = min(fastest_km_pace or journey.fastestKmPace, journey.fastestKmPace)
+
             # Append the journeys data to the journeysData list
             journeysData.append(temp_dictionary)
 
@@ -258,13 +286,15 @@ class StatisticsRoutes():
         data["journeysData"] = journeysData
         data["byModes"] = byModes
         data["totalDistanceCombined"] = total_distance_all_journeys
+        data["totalElevationGain"] = total_elevation_gain
+        data["fastestKmPace"] = fastest_km_pace
         data["totalCaloriesBurned"] = total_calories_burned_all_journeys
         data["totalTimeWorkingOutHours"] = total_time_taken_hours_total
         data["totalTimeWorkingOutMinutes"] = total_time_taken_minutes_total
         data["totalTimeWorkingOutSeconds"] = total_time_taken_seconds_total
 
         # Return status, indicating successful completion of Api, and the data dictionary
-        return jsonify({'status': 200, 'data': data}), 200
+        return contentNegotiation.make_response({'status': 200, 'data': data}, media_type, etag)
 
 
     @app.route("/get_friends_stats", methods=["GET"])
@@ -350,8 +380,10 @@ class StatisticsRoutes():
         if not user:
             return jsonify({'status': 404, 'message': 'User not found'}), 404
 
-        # Retrieve all journeys associated with the user
-        journeys = models.Journey.query.filter_by(userId=user.id).all()
+        # Retrieve all journeys associated with the user, the points themselves are not needed
+        journeys = (models.Journey.query.filter_by(userId=user.id)
+                    .options(db.defer(models.Journey.points, raiseload=True),
+                             db.defer(models.Journey.times, raiseload=True)).all())
 
         # Initialize variables to store journey data and totals for each mode
 
@@ -378,6 +410,8 @@ class StatisticsRoutes():
         total_time_taken_seconds_running = 0
         total_time_in_seconds_running = 0
 
+        total_elevation_gain = 0
+        fastest_km_pace = None
 
         # Iterate over each journey
         for journey in journeys:
@@ -454,6 +488,19 @@ class StatisticsRoutes():
             journeyID = journey.id
             temp_dictionary["journeyId"] = journeyID
 
+            # Add the distance and elevation derived from the points when the journey was saved
+            temp_dictionary["computedDistance"] = journey.computedDistance
+            temp_dictionary["elevationGain"] = journey.elevationGain
+            temp_dictionary["elevationLoss"] = journey.elevationLoss
+            total_elevation_gain += journey.elevationGain or 0
+
+            # Add the moving time and fastest kilometre derived from the point timestamps
+            # (None for journeys recorded without them)
+            temp_dictionary["movingTime"] = journey.movingTime
+            temp_dictionary["fastestKmPace"] = journey.fastestKmPace
+            if journey.fastestKmPace is not None:
+                fastest_km_pace = min(fastest_km_pace or journey.fastestKmPace, journey.fastestKmPace)
+
             # Append the journeys data to the journeysData list
             journeysData.append(temp_dictionary)
 
@@ -536,6 +583,8 @@ class StatisticsRoutes():
         data["journeysData"] = journeysData
         data["byModes"] = byModes
         data["totalDistanceCombined"] = total_distance_all_journeys
+        data["totalElevationGain"] = total_elevation_gain
+        data["fastestKmPace"] = fastest_km_pace
         data["totalCaloriesBurned"] = total_calories_burned_all_journeys
         data["totalTimeWorkingOutHours"] = total_time_taken_hours_total
         data["totalTimeWorkingOutMinutes"] = total_time_taken_minutes_total
@@ -87,6 +87,26 @@ class TestGetStats:
         assert response.json["data"]["totalTimeWorkingOutMinutes"] == 0
         assert response.json["data"]["totalTimeWorkingOutSeconds"] == 0
 
+    def test_stats_conditional_get(self, client, clean_db):
+
+         # get stats user token
+        token = imports.users.user1(self, client, clean_db)[0]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        # Test if an unchanged ETag is answered with 304 and no body
+        response = client.get("/getStats", headers=headers)
+        etag = response.headers["ETag"]
+        response = client.get("/getStats", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.data == b""
+
+        # Test if deleting a journey changes the ETag
+        client.delete("/delete_journey/1", headers=headers)
+        response = client.get("/getStats", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        assert response.json["data"]["totalDistanceCombined"] == 11.5
+
 
 
     def test_stats_friend_with_JWT(self, client, clean_db):
@@ -1,5 +1,8 @@
 from datetime import datetime, timedelta
 from app import db
+from app.endpoints.gps.pointCodec import PackedPoints, decode_points
+from app.endpoints.gps import spatialIndex, pointCompression, lruCache
+from sqlalchemy import event
 
 # Association table for many-to-many relationship between users and roles
 user_roles = db.Table('user_roles',
@@ -17,6 +20,8 @@ class User(db.Model):
     account_created = db.Column(db.DateTime, default=datetime.now(), nullable=False)
     hashed_password = db.Column(db.String(300), nullable=False)
     isPrivate = db.Column(db.Boolean, default=False, nullable=False)
+    # Incremented whenever the user's journeys change, used for ETags (see dataVersion.py)
+    dataVersion = db.Column(db.Integer, default=0, server_default='0', nullable=False)
     # Relationships
     roles = db.relationship('Role', secondary=user_roles, backref=db.backref('users', lazy='dynamic'))
     journeys = db.relationship('Journey', backref='user', lazy=True)
@@ -54,6 +59,15 @@ class Role(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), unique=True, nullable=False)
 
+class PointBlob(db.Model):
+    __tablename__ = 'point_blob'
+
+    # Content-addressed packed tracks shared by journeys with identical points (see pointStore.py)
+    hash = db.Column(db.String(64), primary_key=True)
+    points = db.Column(PackedPoints, nullable=False)
+    # Number of journeys referring to the blob; blobs are deleted when it drops to 0
+    refCount = db.Column(db.Integer, nullable=False, default=0)
+
 class Journey(db.Model):
     __tablename__ = 'journey'
 
@@ -67,12 +81,173 @@ class Journey(db.Model):
     minEle = db.Column(db.Float, nullable=False)
     maxEle = db.Column(db.Float, nullable=False)
 
-    points = db.Column(db.String, nullable=False)
+    # Derived from the points when they are saved (metres)
+    computedDistance = db.Column(db.Float)
+    elevationGain = db.Column(db.Float)
+    elevationLoss = db.Column(db.Float)
+
+    # Bounding box of the track, mirrored into an R*Tree on SQLite (see spatialIndex.py)
+    minLat = db.Column(db.Float)
+    maxLat = db.Column(db.Float)
+    minLon = db.Column(db.Float)
+    maxLon = db.Column(db.Float)
+
+    # Packed binary track, see app/endpoints/gps/pointCodec.py. It is stored once per distinct
+    # content in point_blob and read through pointsHash; write it with pointStore.attach.
+    # pointsHash is only null for rows pack_points.py has not moved to point_blob yet
+    pointsHash = db.Column(db.String(64), db.ForeignKey('point_blob.hash'), index=True)
+    points = db.column_property(
+        db.select(PointBlob.points).where(PointBlob.hash == pointsHash).correlate_except(PointBlob).scalar_subquery())
+    # Optional per-point timestamps, packed next to the points (see pointCodec.py)
+    times = db.Column(db.LargeBinary)
+    # Derived from the timestamps when the points are saved (seconds, seconds per km),
+    # None for tracks without timestamps
+    movingTime = db.Column(db.Float)
+    fastestKmPace = db.Column(db.Float)
+
+    # Incremented whenever the points are saved; keys the caches of images and data derived
+    # from the track
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     startTime = db.Column(db.Time, nullable=False)
     endTime = db.Column(db.Time, nullable=False)
     dateCreated = db.Column(db.DateTime, default=datetime.now(), nullable=False)
 
+    # Simplified versions of the track, rebuilt whenever the points are saved
+    lods = db.relationship('JourneyLOD', backref='journey', lazy=True, cascade='all, delete-orphan')
+    # Segment efforts matched on the track, rebuilt whenever the points are saved
+    efforts = db.relationship('SegmentEffort', backref='journey', lazy=True, cascade='all, delete-orphan')
+
+    # Serves the keyset pagination of /get_journeys_of_user
+    __table_args__ = (db.Index('ix_journey_user_date_id', 'userId', 'dateCreated', 'id'),)
+
+    @property
+    def point_array(self):
+        """The decoded track as an (n, 3) array of lat, lon, ele."""
+        return decode_points(self.points)
+
+event.listen(db.metadata, 'after_create', spatialIndex.create_index)
+event.listen(db.metadata, 'before_drop', spatialIndex.drop_index)
+
+class JourneyLOD(db.Model):
+    __tablename__ = 'journey_lod'
+
+    id = db.Column(db.Integer, primary_key=True)
+    journeyId = db.Column(db.Integer, db.ForeignKey('journey.id'), nullable=False)
+    level = db.Column(db.Integer, nullable=False)
+    tolerance = db.Column(db.Float, nullable=False)
+    points = db.Column(PackedPoints, nullable=False)
+
+    __table_args__ = (db.Index('ix_journey_lod_journey_level', 'journeyId', 'level'),)
+
+    @property
+    def point_array(self):
+        """The decoded simplified track as an (n, 3) array of lat, lon, ele."""
+        return decode_points(self.points)
+
+class Segment(db.Model):
+    __tablename__ = 'segment'
+
+    id = db.Column(db.Integer, primary_key=True)
+    creatorId = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    name = db.Column(db.String, nullable=False)
+    points = db.Column(PackedPoints, nullable=False)
+    distance = db.Column(db.Float, nullable=False)
+    createdAt = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+    # Bounding box of the path, mirrored into an R*Tree on SQLite (see spatialIndex.py)
+    minLat = db.Column(db.Float)
+    maxLat = db.Column(db.Float)
+    minLon = db.Column(db.Float)
+    maxLon = db.Column(db.Float)
+
+    efforts = db.relationship('SegmentEffort', backref='segment', lazy=True, cascade='all, delete-orphan')
+
+    @property
+    def point_array(self):
+        """The decoded path as an (n, 3) array of lat, lon, ele."""
+        return decode_points(self.points)
+
+class SegmentEffort(db.Model):
+    __tablename__ = 'segment_effort'
+
+    id = db.Column(db.Integer, primary_key=True)
+    segmentId = db.Column(db.Integer, db.ForeignKey('segment.id'), nullable=False, index=True)
+    journeyId = db.Column(db.Integer, db.ForeignKey('journey.id'), nullable=False, index=True)
+    # Indices of the first and last journey points of the effort
+    startIndex = db.Column(db.Integer, nullable=False)
+    endIndex = db.Column(db.Integer, nullable=False)
+    distance = db.Column(db.Float, nullable=False)
+
+class PointDictionary(db.Model):
+    __tablename__ = 'point_dictionary'
+
+    id = db.Column(db.Integer, primary_key=True)
+    # pointCompression.CODEC_ZLIB or CODEC_ZSTD
+    codec = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+    createdAt = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+    # Blobs refer to dictionaries by id, so ids of deleted dictionaries are never reused
+    __table_args__ = {'sqlite_autoincrement': True}
+
+event.listen(db.metadata, 'before_drop', pointCompression.clear_dictionary_cache)
+event.listen(db.metadata, 'before_drop', lruCache.clear_all)
+
+class Recording(db.Model):
+    __tablename__ = 'recording'
+
+    id = db.Column(db.Integer, primary_key=True)
+    userId = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    name = db.Column(db.String, nullable=False)
+    type = db.Column(db.String, nullable=False)
+    startedAt = db.Column(db.DateTime, nullable=False)
+    pointCount = db.Column(db.Integer, nullable=False, default=0)
+
+    # Appended chunks of points, concatenated in seq order when the recording is finished
+    chunks = db.relationship('RecordingChunk', backref='recording', lazy=True, cascade='all, delete-orphan',
+                             order_by='RecordingChunk.seq')
+
+class RecordingChunk(db.Model):
+    __tablename__ = 'recording_chunk'
+
+    id = db.Column(db.Integer, primary_key=True)
+    recordingId = db.Column(db.Integer, db.ForeignKey('recording.id'), nullable=False)
+    seq = db.Column(db.Integer, nullable=False)
+    points = db.Column(PackedPoints, nullable=False)
+    # Packed timestamps of the chunk's points, if the client sends them
+    times = db.Column(db.LargeBinary)
+
+    __table_args__ = (db.Index('ix_recording_chunk_recording_seq', 'recordingId', 'seq', unique=True),)
+
+class HeatmapTile(db.Model):
+    __tablename__ = 'heatmap_tile'
+
+    id = db.Column(db.Integer, primary_key=True)
+    userId = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    zoom = db.Column(db.Integer, nullable=False)
+    x = db.Column(db.Integer, nullable=False)
+    y = db.Column(db.Integer, nullable=False)
+    # (cell, count) pairs of the cells with journeys, heatmap.CELL_DTYPE (see heatmap.py)
+    counts = db.Column(db.LargeBinary, nullable=False)
+
+    __table_args__ = (db.Index('ix_heatmap_tile_user_zxy', 'userId', 'zoom', 'x', 'y', unique=True),)
+
+class IdempotencyKey(db.Model):
+    __tablename__ = 'idempotency_key'
+
+    id = db.Column(db.Integer, primary_key=True)
+    userId = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # The Idempotency-Key header of a request, and the SHA-256 of its body (see idempotency.py)
+    key = db.Column(db.String(255), nullable=False)
+    requestHash = db.Column(db.String(64), nullable=False)
+    # The response sent the first time, replayed to retries
+    status = db.Column(db.Integer, nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    createdAt = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+    __table_args__ = (db.Index('ix_idempotency_key_user_key', 'userId', 'key', unique=True),)
+
 class Admin(db.Model):
     __tablename__ = 'admin'
 
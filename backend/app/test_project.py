@@ -2,6 +2,21 @@ from app.endpoints.imports import imports
 from app.endpoints.auth.tests.Signup_tests import TestSignup
 from app.endpoints.auth.tests.Login_tests import TestLogin
 from app.endpoints.gps.tests.GPS_tests import TestGPSRoutes
+from app.endpoints.gps.tests.PointCodec_tests import TestPointCodec
+from app.endpoints.gps.tests.PointCompression_tests import TestPointCompression
+from app.endpoints.gps.tests.TrackProcessing_tests import TestTrackProcessing
+from app.endpoints.gps.tests.Heatmap_tests import TestHeatmap
+from app.endpoints.gps.tests.Recording_tests import TestRecordingRoutes
+from app.endpoints.gps.tests.Segments_tests import TestSegmentRoutes
+from app.endpoints.gps.tests.Thumbnails_tests import TestThumbnails
+from app.endpoints.gps.tests.Splits_tests import TestSplits
+from app.endpoints.gps.tests.Resampling_tests import TestResampling
+from app.endpoints.gps.tests.Export_tests import TestExport
+from app.endpoints.gps.tests.VectorTiles_tests import TestVectorTiles
+from app.endpoints.gps.tests.ContentNegotiation_tests import TestContentNegotiation
+from app.endpoints.gps.tests.ElevationProfile_tests import TestElevationProfile
+from app.endpoints.gps.tests.PointStore_tests import TestPointStore
+from app.endpoints.gps.tests.LRUCache_tests import TestLRUCache
 from app.endpoints.friends.tests.Friendship_tests import TestFriendshipRoutes
 from app.endpoints.membership.tests.Membership_tests import TestMembershipRoutes
 from app.endpoints.Admin.tests.FutureRevenue_tests import TestGenerateFutureRevenueData
@@ -20,6 +35,51 @@ class TestAllBackend:
         # call functions from TestGPSRoutes class to test GPS routes API's
         test_GPS = TestGPSRoutes()
 
+        # call functions from TestPointCodec class to test the packed journey point storage
+        test_point_codec = TestPointCodec()
+
+        # call functions from TestPointCompression class to test the compressed point storage
+        test_point_compression = TestPointCompression()
+
+        # call functions from TestTrackProcessing class to test the journey track processing
+        test_track_processing = TestTrackProcessing()
+
+        # call functions from TestHeatmap class to test the journey heatmap tiles
+        test_heatmap = TestHeatmap()
+
+        # call functions from TestRecordingRoutes class to test the live recording API's
+        test_recording = TestRecordingRoutes()
+
+        # call functions from TestSegmentRoutes class to test the segment matching API's
+        test_segments = TestSegmentRoutes()
+
+        # call functions from TestThumbnails class to test the journey thumbnail images
+        test_thumbnails = TestThumbnails()
+
+        # call functions from TestSplits class to test the per-point timestamps and splits
+        test_splits = TestSplits()
+
+        # call functions from TestResampling class to test the fixed-spacing track resampling
+        test_resampling = TestResampling()
+
+        # call functions from TestExport class to test the streamed export of journeys
+        test_export = TestExport()
+
+        # call functions from TestVectorTiles class to test the GeoJSON and vector tile output
+        test_vector_tiles = TestVectorTiles()
+
+        # call functions from TestContentNegotiation class to test the MessagePack and CBOR responses
+        test_content_negotiation = TestContentNegotiation()
+
+        # call functions from TestElevationProfile class to test the downsampled elevation profiles
+        test_elevation_profile = TestElevationProfile()
+
+        # call functions from TestPointStore class to test the content-addressed point storage and idempotent uploads
+        test_point_store = TestPointStore()
+
+        # call functions from TestLRUCache class to test the in-process cache of derived responses
+        test_lru_cache = TestLRUCache()
+
         # call functions from TestFriendshipRoutes class to test Friendship routes API's
         test_friends = TestFriendshipRoutes()
 
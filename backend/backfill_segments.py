@@ -0,0 +1,51 @@
+import argparse
+from app import db, app
+from app.models import Segment, SegmentEffort
+from app.endpoints.gps.segmentMatching import backfill_segment
+
+"""
+Rebuilds the segment efforts of the stored journeys (see app/endpoints/gps/segmentMatching.py).
+
+    python backfill_segments.py [--segment ID]
+
+Journeys are matched when they are stored and new segments are matched against the
+existing journeys when they are created, so this is only needed for journeys stored before
+segment matching existed, or after the matching rules change. The efforts of each segment
+are replaced and committed one segment at a time, so it can be stopped and re-run safely.
+"""
+
+
+def backfill(segment_id=None):
+    """
+    Replaces the efforts of one segment, or of every segment, by matching them against
+    all the journeys.
+
+    Returns
+    -------
+    tuple
+        The number of segments processed and of efforts found.
+    """
+    query = Segment.query.order_by(Segment.id)
+    if segment_id is not None:
+        query = query.filter(Segment.id == segment_id)
+
+    segments, efforts = 0, 0
+    for (current_id,) in query.with_entities(Segment.id).all():
+        segment = db.session.get(Segment, current_id)
+        SegmentEffort.query.filter_by(segmentId=current_id).delete(synchronize_session=False)
+        efforts += sum(backfill_segment(db.session, segment).values())
+        db.session.commit()
+        db.session.expunge_all()
+        segments += 1
+    return segments, efforts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Match the stored journeys against the segments.')
+    parser.add_argument('--segment', type=int, help='only rebuild the efforts of this segment')
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        segments, efforts = backfill(args.segment)
+        print(f'Matched {segments} segments: {efforts} efforts')
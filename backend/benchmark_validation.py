@@ -0,0 +1,60 @@
+import random
+import timeit
+from app.endpoints.gps.pointValidation import validate_point_array
+from app.endpoints.gps.pointCodec import points_to_array
+
+"""
+Benchmark comparing the batched points validator used by /create_journey with the
+original per-point loop it replaced. The per-point version below is kept only for
+comparison. The batched validator also returns the points as an array, so the loop is
+timed both on its own and followed by the conversion the save path then needs.
+
+Usage: python benchmark_validation.py
+"""
+
+SIZES = (10_000, 100_000, 1_000_000)
+
+
+def loop_validate_points(points):
+    """The original per-point validator (key set and isinstance checks for every point)."""
+    if points != []:
+        required_keys = {'lat', 'lon', 'ele'}
+        for point in points:
+            point_keys = set(point.keys())
+            if point_keys != required_keys:
+                return False, "Invalid keys"
+            for key in required_keys:
+                value = point[key]
+                if not isinstance(value, (int, float)):
+                    return False, f"Invalid value for {key}: {value}. Must be a numerical value."
+        return True, ""
+    return False, "No data provided"
+
+
+def make_points(n):
+    """Builds a payload of n points shaped like the JSON body of /create_journey."""
+    rng = random.Random(0)
+    return [{'lat': 51.5 + rng.random(), 'lon': -0.1 + rng.random(), 'ele': rng.uniform(0, 200)}
+            for _ in range(n)]
+
+
+def loop_validate_and_convert(points):
+    """The original validator followed by the array conversion done when saving the track."""
+    valid, error_message = loop_validate_points(points)
+    return points_to_array(points) if valid else None, error_message
+
+
+def best_of(function, points, repeat):
+    return min(timeit.repeat(lambda: function(points), number=1, repeat=repeat))
+
+
+if __name__ == '__main__':
+    print(f"{'points':>10} {'loop (s)':>10} {'loop+array (s)':>15} {'batched (s)':>12} {'speedup':>8}")
+    for n in SIZES:
+        points = make_points(n)
+        repeat = 5 if n < 1_000_000 else 3
+        loop = best_of(loop_validate_points, points, repeat)
+        loop_and_convert = best_of(loop_validate_and_convert, points, repeat)
+        batched = best_of(validate_point_array, points, repeat)
+        print(f"{n:>10} {loop:>10.4f} {loop_and_convert:>15.4f} {batched:>12.4f} "
+              f"{loop_and_convert / batched:>7.1f}x")
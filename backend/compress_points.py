@@ -0,0 +1,122 @@
+import argparse
+from sqlalchemy import select, type_coerce, LargeBinary
+from app import db, app
+from app.models import Journey, JourneyLOD, RecordingChunk, PointBlob, Segment
+from app.endpoints.gps import pointCompression
+from app.endpoints.gps.pointCodec import is_packed
+
+"""
+Maintenance script for compressed journey point storage (see
+app/endpoints/gps/pointCompression.py).
+
+    python compress_points.py train [--codec zstd|zlib] [--samples N] [--size BYTES]
+        Trains a dictionary from the most recent journeys and stores it. Blobs written from
+        then on use it; existing blobs keep the dictionary they were written with.
+
+    python compress_points.py reencode [--batch-size N]
+        Rewrites every stored track that is not in the configured format (POINTS_COMPRESSION)
+        with the newest dictionary: compresses packed rows, re-encodes rows written with an
+        older dictionary or another codec, and decompresses rows if compression is turned off.
+        Rows are processed in id order and committed in batches, so it can be stopped and
+        re-run safely. Legacy JSON rows are left to pack_points.py.
+"""
+
+BATCH_SIZE = 500
+SAMPLE_JOURNEYS = 1000
+
+# Tables whose points column uses the PackedPoints type
+TABLES = (PointBlob, JourneyLOD, RecordingChunk, Segment)
+
+
+def train(codec_name='zstd', samples=SAMPLE_JOURNEYS, size=pointCompression.DICTIONARY_SIZE):
+    """
+    Trains and stores a new dictionary from the points of the most recent journeys.
+
+    Returns
+    -------
+    int
+        The id of the new dictionary, or 0 if there were no journeys to train on.
+    """
+    codec = pointCompression.available_codec(codec_name)
+    blobs = [points for (points,) in db.session.execute(
+        select(Journey.points).select_from(Journey).order_by(Journey.id.desc()).limit(samples))]
+    blobs = [blob for blob in blobs if is_packed(blob)]
+    if not blobs:
+        return 0
+
+    dictionary = pointCompression.train_dictionary(blobs, codec, size)
+    dictionary_id = pointCompression.store_dictionary(db.session.connection(), codec, dictionary)
+    db.session.commit()
+    return dictionary_id
+
+
+def reencode(batch_size=BATCH_SIZE):
+    """
+    Rewrites the stored tracks that are not in the configured format.
+
+    Returns
+    -------
+    tuple
+        The number of rows rewritten, and their total size in bytes before and after.
+    """
+    codec = pointCompression.compression_codec()
+    target_id = pointCompression.current_dictionary_id(db.session.connection(), codec) if codec else 0
+
+    rewritten, before, after = 0, 0, 0
+    for model in TABLES:
+        table = model.__table__
+        # point_blob is keyed by hash, the other tables by id
+        key = table.primary_key.columns.values()[0]
+        raw_points = type_coerce(table.c.points, LargeBinary)
+        last_id = None
+        while True:
+            query = select(key, raw_points).order_by(key).limit(batch_size)
+            if last_id is not None:
+                query = query.where(key > last_id)
+            rows = db.session.execute(query).all()
+            if not rows:
+                break
+
+            for row_id, blob in rows:
+                if pointCompression.is_compressed(blob):
+                    header = pointCompression.PTZ_HEADER.unpack_from(blob, 0)
+                    if codec == header[2] and target_id == header[3]:
+                        continue
+                    packed = pointCompression.decompress_from_storage(blob)
+                elif is_packed(blob) and codec:
+                    packed = bytes(blob)
+                else:
+                    continue
+
+                # The column type compresses the packed blob with the configured codec
+                db.session.execute(table.update().where(key == row_id).values(points=packed))
+                stored = db.session.execute(select(raw_points).where(key == row_id)).scalar()
+                rewritten += 1
+                before += len(blob)
+                after += len(stored)
+
+            last_id = rows[-1][0]
+            db.session.commit()
+
+    return rewritten, before, after
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Train the points dictionary and re-encode stored tracks.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    train_parser = commands.add_parser('train')
+    train_parser.add_argument('--codec', choices=('zstd', 'zlib'), default='zstd')
+    train_parser.add_argument('--samples', type=int, default=SAMPLE_JOURNEYS)
+    train_parser.add_argument('--size', type=int, default=pointCompression.DICTIONARY_SIZE)
+    reencode_parser = commands.add_parser('reencode')
+    reencode_parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        if args.command == 'train':
+            dictionary_id = train(args.codec, args.samples, args.size)
+            print(f'Stored dictionary {dictionary_id}' if dictionary_id else 'No journeys to train on')
+        else:
+            rewritten, before, after = reencode(args.batch_size)
+            print(f'Re-encoded {rewritten} tracks: {before} bytes -> {after} bytes')
@@ -4,3 +4,12 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(basedir, 'app.db')
 SECRET_KEY = "MY_SECRET_KEY"
 SQLALCHEMY_TRACK_MODIFICATIONS = True
+
+# Compressed storage for journey points: None (off), 'zstd' (falls back to zlib when the
+# zstandard package is not installed) or 'zlib'. See app/endpoints/gps/pointCompression.py
+POINTS_COMPRESSION = None
+
+# On-disk cache of the PNG journey thumbnails (see app/endpoints/gps/thumbnails.py), and the
+# size in bytes past which the least recently used images are deleted
+THUMBNAIL_CACHE_DIR = os.path.join(basedir, 'thumbnail_cache')
+THUMBNAIL_CACHE_BYTES = 64 * 1024 * 1024
@@ -0,0 +1,78 @@
+from app import db, app
+from app.models import Journey, User
+from app.endpoints.gps.pointCodec import decode_points, decode_times, is_packed
+from app.endpoints.gps.GPS import GPSRoutes
+from app.endpoints.gps.spatialIndex import rebuild_index
+from app.endpoints.gps.schemaMigration import add_missing_columns, move_points_to_blobs, BATCH_SIZE
+from app.endpoints.gps import heatmap
+
+"""
+Migration script that rewrites legacy JSON `Journey.points` rows into the packed binary
+format in place, deriving their distance, elevation summary and bounding box and building
+their simplified LOD levels at the same time. Rows are processed in id order and committed in
+batches, so the script can be stopped and re-run safely; rows that are already fully
+processed are skipped. The spatial index is refilled from the bounding boxes at the end, and
+the heatmap tiles of every user are rebuilt from their journeys.
+
+New tables, columns and indexes are added first, and tracks still stored in the old
+`journey.points` column are moved into the content-addressed `point_blob` table (see
+app/endpoints/gps/schemaMigration.py, which the app also runs on its first request).
+
+Usage: python pack_points.py
+"""
+
+
+def pack_legacy_points(batch_size=BATCH_SIZE):
+    """
+    Converts every journey whose points are still JSON text into the packed format.
+
+    Returns
+    -------
+    int
+        The number of journeys that were converted.
+    """
+    converted = 0
+    last_id = 0
+    while True:
+        journeys = (Journey.query.filter(Journey.id > last_id)
+                    .order_by(Journey.id).limit(batch_size).all())
+        if not journeys:
+            break
+
+        for journey in journeys:
+            if (not is_packed(journey.points) or not journey.lods or journey.computedDistance is None
+                    or journey.minLat is None):
+                GPSRoutes.store_points(journey, decode_points(journey.points), decode_times(journey.times))
+                converted += 1
+
+        last_id = journeys[-1].id
+        db.session.commit()
+
+    with db.engine.begin() as connection:
+        rebuild_index(connection)
+
+    return converted
+
+
+def rebuild_heatmaps():
+    """
+    Recomputes the heatmap tiles of every user from their journeys, one user per commit.
+
+    Returns
+    -------
+    int
+        The number of journeys rasterized.
+    """
+    rasterized = 0
+    for (userId,) in db.session.query(User.id).order_by(User.id).all():
+        rasterized += heatmap.rebuild_user(db.session, userId)
+        db.session.commit()
+    return rasterized
+
+
+if __name__ == '__main__':
+    with app.app_context():
+        add_missing_columns()
+        print(f'Moved {move_points_to_blobs()} tracks to point_blob')
+        print(f'Packed {pack_legacy_points()} journeys')
+        print(f'Rasterized {rebuild_heatmaps()} journeys into heatmaps')